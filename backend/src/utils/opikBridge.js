@@ -1,15 +1,43 @@
 const { spawn } = require('child_process');
+const { EventEmitter } = require('events');
 const fs = require('fs');
+const net = require('net');
 const path = require('path');
+const zlib = require('zlib');
 
-class OpikBridge {
+const FRAME_HEADER_BYTES = 5;
+const FRAME_FLAG_ZLIB = 0x02;
+const PROGRESS_KEYS = new Set(['id', 'function', 'progress']);
+
+// Progress lines carry only routing keys next to the event; anything else
+// (result, error, status, results) is a final answer.
+function isProgressMessage(message) {
+  return Boolean(message) && typeof message === 'object' && message.progress !== undefined
+    && Object.keys(message).every((key) => PROGRESS_KEYS.has(key));
+}
+
+class OpikBridge extends EventEmitter {
   constructor() {
+    super();
     this.pythonPath = path.normalize(process.env.OPIK_PYTHON_BIN || process.env.PYTHON_PATH || 'python');
     this.runnerPath = path.join(__dirname, 'opik_runner.py');
     this.disabled = false;
     this.disableReason = null;
     this._warned = false;
     this.fallbackPath = path.join(__dirname, '..', '..', 'logs', 'opik_fallback.jsonl');
+    this.socketPath = process.env.OPIK_RUNNER_SOCKET || null;
+    this.socketConnections = Number(process.env.OPIK_RUNNER_SOCKET_CONNECTIONS) || 4;
+    this.persistent = process.env.OPIK_RUNNER_PERSISTENT === 'true' || Boolean(this.socketPath);
+    this.argvPayloadLimit = Number(process.env.OPIK_ARGV_PAYLOAD_LIMIT) || 8000;
+    // Framed results travel on fd 3, which cmd.exe does not pass through on Windows.
+    this.framedResults = process.env.OPIK_RUNNER_FRAMED === 'true' && process.platform !== 'win32';
+    this.compressResults = process.env.OPIK_RUNNER_COMPRESS === 'zlib';
+    this._daemon = null;
+    this._socketChannels = [];
+    this._socketWorkers = null;
+    this._nextSocketChannel = 0;
+    this._pending = new Map();
+    this._nextRequestId = 1;
     this._checkPaths();
   }
 
@@ -35,7 +63,9 @@ class OpikBridge {
     console.log('[Opik] Bridge:', {
       enabled: !this.disabled,
       python: this.pythonPath,
-      runner: this.runnerPath
+      runner: this.runnerPath,
+      persistent: this.persistent,
+      socket: this.socketPath
     });
   }
   _writeFallback(functionName, payload = {}, reason = null) {
@@ -54,33 +84,286 @@ class OpikBridge {
     }
   }
 
-  _run(functionName, payload = {}) {
-    return new Promise((resolve, reject) => {
-      if (this.disabled) {
-        this._writeFallback(functionName, payload, this.disableReason || 'disabled');
-        return resolve({ status: 'ok', mode: 'fallback', reason: this.disableReason || 'disabled' });
+  _spawnRunner(args, options = {}) {
+    const isWindows = process.platform === 'win32';
+    const command = isWindows ? 'C:\\\\Windows\\\\System32\\\\cmd.exe' : this.pythonPath;
+    const commandArgs = isWindows ? ['/c', this.pythonPath, this.runnerPath, ...args] : [this.runnerPath, ...args];
+    return spawn(command, commandArgs, { cwd: __dirname, windowsHide: true, ...options });
+  }
+
+  _wantsProgress(onProgress) {
+    return Boolean(onProgress) || this.listenerCount('progress') > 0;
+  }
+
+  _reportProgress(functionName, message, onProgress = null) {
+    const update = { function: message.function || functionName, event: message.progress };
+    try {
+      if (onProgress) {
+        onProgress(update);
+      }
+      this.emit('progress', update);
+    } catch (error) {
+      console.warn('[Opik] Progress handler failed:', error.message || error);
+    }
+  }
+
+  // Decodes every complete frame in `buffer` and returns the unread tail.
+  _readFrames(buffer, onMessage) {
+    let offset = 0;
+    while (buffer.length - offset >= FRAME_HEADER_BYTES) {
+      const length = buffer.readUInt32BE(offset);
+      const flags = buffer.readUInt8(offset + 4);
+      const end = offset + FRAME_HEADER_BYTES + length;
+      if (buffer.length < end) {
+        break;
+      }
+      let body = buffer.subarray(offset + FRAME_HEADER_BYTES, end);
+      if (flags & FRAME_FLAG_ZLIB) {
+        body = zlib.inflateSync(body);
+      }
+      onMessage(JSON.parse(body.toString('utf8')));
+      offset = end;
+    }
+    return buffer.subarray(offset);
+  }
+
+  _createChannel(readable, writable) {
+    const channel = { writable, buffer: '', pending: new Set(), closed: false, recycled: false };
+
+    readable.on('data', (data) => {
+      channel.buffer += data.toString();
+      let newline = channel.buffer.indexOf('\n');
+      while (newline !== -1) {
+        const line = channel.buffer.slice(0, newline).trim();
+        channel.buffer = channel.buffer.slice(newline + 1);
+        newline = channel.buffer.indexOf('\n');
+        if (!line) {
+          continue;
+        }
+        let response = null;
+        try {
+          response = JSON.parse(line);
+        } catch (error) {
+          console.warn('[Opik] Ignoring malformed runner response:', error.message);
+          continue;
+        }
+        if (response.workers !== undefined && response.id === undefined) {
+          // Prefork greeting: keep no more connections than there are workers.
+          this._socketWorkers = response.workers;
+          continue;
+        }
+        if (response.closing) {
+          // A recycling prefork worker answered everything it read.
+          channel.recycled = true;
+          continue;
+        }
+        const pending = this._pending.get(response.id);
+        if (!pending) {
+          continue;
+        }
+        if (isProgressMessage(response)) {
+          this._reportProgress(pending.functionName, response, pending.onProgress);
+          continue;
+        }
+        if (!('result' in response || 'error' in response || 'status' in response)) {
+          continue;
+        }
+        this._pending.delete(response.id);
+        channel.pending.delete(response.id);
+        if (response.backpressure) {
+          // Saturated lane: reject so invoke() records the call in the fallback log.
+          pending.reject(new Error(response.error));
+        } else if (response.error) {
+          pending.resolve({ error: response.error });
+        } else {
+          pending.resolve(response.result || { status: 'ok' });
+        }
       }
-      const args = [this.runnerPath, functionName, JSON.stringify(payload)];
-      const isWindows = process.platform === 'win32';
-      const command = isWindows ? 'C:\\\\Windows\\\\System32\\\\cmd.exe' : this.pythonPath;
-      const commandArgs = isWindows ? ['/c', this.pythonPath, ...args] : args;
+    });
+
+    return channel;
+  }
+
+  _closeChannel(channel, error) {
+    if (channel.closed) {
+      return;
+    }
+    channel.closed = true;
+    const unanswered = [...channel.pending];
+    channel.pending.clear();
+    for (const id of unanswered) {
+      const pending = this._pending.get(id);
+      this._pending.delete(id);
+      if (!pending) {
+        continue;
+      }
+      // Resending a request the worker may have read could run it twice, so
+      // only retry what never left this process, or everything the worker
+      // announced it left unread when it recycled (a recycle always answers
+      // at least one request, so those resends are not capped).
+      if (this.socketPath && (channel.recycled || (!pending.written && pending.attempts < 3))) {
+        this._send(pending);
+      } else {
+        pending.reject(error);
+      }
+    }
+  }
+
+  _ensureDaemon() {
+    if (this._daemon && !this._daemon.closed) {
+      return this._daemon;
+    }
+
+    const child = this._spawnRunner(['--serve']);
+    const channel = this._createChannel(child.stdout, child.stdin);
+    let stderr = '';
+    this._daemon = channel;
+
+    child.stderr.on('data', (data) => {
+      stderr = (stderr + data.toString()).slice(-4096);
+    });
+    child.on('error', (error) => this._closeChannel(channel, error));
+    // A runner that died before reading its input fails our writes with EPIPE.
+    child.stdin.on('error', (error) => this._closeChannel(channel, error));
+    child.on('close', (code) => {
+      this._closeChannel(channel, new Error(stderr || `Opik runner exited with code ${code}`));
+    });
+
+    return channel;
+  }
+
+  _ensureSocketChannel() {
+    // Until a worker has reported the pool size, one connection is all that is
+    // known to be served: a worker owns a connection, so requests on a
+    // connection no worker accepts would wait forever.
+    const limit = Math.max(1, Math.min(this.socketConnections, this._socketWorkers || 1));
+    const slot = this._nextSocketChannel % limit;
+    this._nextSocketChannel = (slot + 1) % limit;
+
+    const existing = this._socketChannels[slot];
+    if (existing && !existing.closed) {
+      return existing;
+    }
+
+    // Spread requests over several connections so each prefork worker gets work;
+    // a recycled worker closes its connection and the slot reconnects lazily.
+    const connection = net.createConnection(this.socketPath);
+    const channel = this._createChannel(connection, connection);
+    this._socketChannels[slot] = channel;
+
+    connection.on('error', (error) => this._closeChannel(channel, error));
+    connection.on('close', () => {
+      this._closeChannel(channel, new Error('Opik runner socket closed'));
+    });
+
+    return channel;
+  }
+
+  _send(request) {
+    let channel = null;
+    try {
+      channel = this.socketPath ? this._ensureSocketChannel() : this._ensureDaemon();
+    } catch (error) {
+      return request.reject(error);
+    }
+
+    const id = this._nextRequestId++;
+    request.attempts += 1;
+    request.written = false;
+    this._pending.set(id, request);
+    channel.pending.add(id);
+    const message = { id, function: request.functionName, payload: request.payload };
+    if (this._wantsProgress(request.onProgress)) {
+      message.progress = true;
+    }
+    const line = `${JSON.stringify(message)}\n`;
+    channel.writable.write(line, (error) => {
+      if (!channel.pending.has(id)) {
+        return;
+      }
+      if (error) {
+        this._closeChannel(channel, error);
+      } else {
+        request.written = true;
+      }
+    });
+    return undefined;
+  }
+
+  _runPersistent(functionName, payload = {}, onProgress = null) {
+    return new Promise((resolve, reject) => {
+      this._send({ functionName, payload, onProgress, resolve, reject, attempts: 0 });
+    });
+  }
+
+  _runOnce(args, input = null, functionName = null, onProgress = null) {
+    return new Promise((resolve, reject) => {
+      const framed = this.framedResults;
+      const progressArgs = this._wantsProgress(onProgress) ? ['--progress'] : [];
+      const runnerArgs = framed
+        ? ['--frame', '--result-fd', '3', ...(this.compressResults ? ['--compress', 'zlib'] : []), ...progressArgs, ...args]
+        : [...progressArgs, ...args];
       let child = null;
       try {
-        child = spawn(command, commandArgs, { cwd: __dirname, windowsHide: true });
+        child = this._spawnRunner(runnerArgs, framed ? { stdio: ['pipe', 'pipe', 'pipe', 'pipe'] } : {});
       } catch (error) {
         return reject(error);
       }
 
       let stdout = '';
       let stderr = '';
+      let frames = Buffer.alloc(0);
+      let result = null;
+
+      // Progress messages stream in before the answer; the last other message wins.
+      const onMessage = (message) => {
+        if (isProgressMessage(message)) {
+          this._reportProgress(functionName, message, onProgress);
+        } else {
+          result = message;
+        }
+      };
+      const onLine = (line) => {
+        if (!line.trim()) {
+          return;
+        }
+        let message = null;
+        try {
+          message = JSON.parse(line);
+        } catch (error) {
+          return; // not one of ours (a library printing to stdout)
+        }
+        if (message && typeof message === 'object') {
+          onMessage(message);
+        }
+      };
 
       child.on('error', (error) => {
         reject(error);
       });
 
-      child.stdout.on('data', (data) => {
-        stdout += data.toString();
-      });
+      if (framed) {
+        // Decode frames as they arrive; stdout only carries library noise.
+        child.stdio[3].on('data', (data) => {
+          try {
+            frames = this._readFrames(Buffer.concat([frames, data]), onMessage);
+          } catch (error) {
+            child.kill();
+            reject(error);
+          }
+        });
+        child.stdout.on('data', () => {});
+      } else {
+        child.stdout.on('data', (data) => {
+          stdout += data.toString();
+          let newline = stdout.indexOf('\n');
+          while (newline !== -1) {
+            onLine(stdout.slice(0, newline));
+            stdout = stdout.slice(newline + 1);
+            newline = stdout.indexOf('\n');
+          }
+        });
+      }
 
       child.stderr.on('data', (data) => {
         stderr += data.toString();
@@ -90,18 +373,61 @@ class OpikBridge {
         if (code !== 0) {
           return reject(new Error(stderr || `Opik logger exited with code ${code}`));
         }
-        try {
-          const parsed = stdout ? JSON.parse(stdout) : { status: 'ok' };
-          resolve(parsed);
-        } catch (error) {
-          reject(error);
+        if (framed && frames.length) {
+          return reject(new Error('Truncated result frame from Opik runner'));
         }
+        onLine(stdout);
+        resolve(result || { status: 'ok' });
+      });
+
+      if (input !== null) {
+        // A runner that exits before reading (say, failing at import) makes
+        // this write fail with EPIPE; without a listener that kills node.
+        child.stdin.on('error', reject);
+        child.stdin.end(input);
+      }
+    });
+  }
+
+  _run(functionName, payload = {}, onProgress = null) {
+    if (this.disabled) {
+      this._writeFallback(functionName, payload, this.disableReason || 'disabled');
+      return Promise.resolve({ status: 'ok', mode: 'fallback', reason: this.disableReason || 'disabled' });
+    }
+    if (this.persistent) {
+      return this._runPersistent(functionName, payload, onProgress);
+    }
+    const serialized = JSON.stringify(payload);
+    if (serialized.length > this.argvPayloadLimit) {
+      // Keep large payloads (inline datasets, example pools) out of argv.
+      return this._runOnce([functionName, '-'], serialized, functionName, onProgress);
+    }
+    return this._runOnce([functionName, serialized], null, functionName, onProgress);
+  }
+
+  // `options.onProgress({ function, event })` receives the runner's progress
+  // events; listeners on the bridge's 'progress' event get them as well.
+  invokeBatch(calls = [], options = {}) {
+    if (!calls.length) {
+      return Promise.resolve({ results: [] });
+    }
+    if (this.disabled) {
+      const reason = this.disableReason || 'disabled';
+      calls.forEach((call) => this._writeFallback(call.function, call.payload, reason));
+      return Promise.resolve({
+        results: calls.map((call) => ({ function: call.function, result: { status: 'ok', mode: 'fallback', reason } }))
       });
+    }
+    return this._runOnce(['--batch', '-'], JSON.stringify(calls), null, options.onProgress).catch((error) => {
+      const message = error?.message || String(error);
+      console.error('[Opik] batch invoke failed:', message);
+      calls.forEach((call) => this._writeFallback(call.function, call.payload, message));
+      return null;
     });
   }
 
-  invoke(functionName, payload = {}) {
-    return this._run(functionName, payload).catch((error) => {
+  invoke(functionName, payload = {}, options = {}) {
+    return this._run(functionName, payload, options.onProgress).catch((error) => {
       const message = error?.message || String(error);
       if (message.includes('EPERM') || message.includes('spawn')) {
         this.disabled = true;
@@ -0,0 +1,314 @@
+"""Wall-time, model-call and token budgets for optimizer runs.
+
+A `RunBudget` sits in front of ``litellm.completion`` and ``acompletion`` for
+the duration of a run (see `opik_llm_cache.cached_completions`):
+
+* ``guard`` runs before every model call. Once the deadline has passed, the
+  call/token caps are used up, or the score has plateaued, it raises
+  `BudgetExhausted`, which unwinds the optimizer at its next model call
+  (cooperative cancellation).
+* ``meter`` wraps the real model (behind the response cache) and counts calls
+  and tokens that were actually paid for.
+* ``track_metric`` wraps the run's metric and keeps a running mean per
+  candidate prompt, which yields the best-so-far candidate and drives
+  plateau detection: if ``plateau_patience`` new candidates appear without the
+  best mean improving by ``plateau_min_delta``, the run is stopped. Scores are
+  attributed to the candidate the evaluation call site names with
+  `evaluating` or `mark_candidate`; reflection and mutation calls never do, so
+  they cannot take the credit.
+
+Both wrappers return a coroutine function when given one, so async model
+calls are checked and charged the same way.
+
+``snapshot``/``restore`` carry the per-candidate scores and the spend across
+processes (see `opik_checkpoint`). A restored run starts with fresh caps by
+default -- resubmitting an interrupted job with the same ``max_calls`` gives it
+another ``max_calls`` -- unless ``carry_spend`` makes earlier attempts count
+against them. The ``on_record`` callbacks run after every recorded score so
+progress can be persisted and reported as it happens.
+"""
+
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from opik_llm_cache import is_async_completion
+
+# The candidate prompt whose output is being evaluated in this context.
+_CANDIDATE: 'contextvars.ContextVar[Optional[str]]' = contextvars.ContextVar('opik_budget_candidate', default=None)
+
+
+class BudgetExhausted(RuntimeError):
+    """Raised at a model-call boundary once a run's budget is used up."""
+
+    def __init__(self, reason: str):
+        super().__init__(f'Optimizer budget exhausted ({reason})')
+        self.reason = reason
+
+
+def _env_optional(key: str, cast: Callable[[str], Any]) -> Any:
+    value = os.environ.get(key)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def mark_candidate(prompt: Optional[str]) -> None:
+    """Attribute the metric scores computed next in this context to ``prompt``.
+
+    For evaluation call sites that cannot wrap the metric call in `evaluating`,
+    such as an agent that produces the output a metric is scored on afterwards.
+    """
+    _CANDIDATE.set(prompt)
+
+
+@contextlib.contextmanager
+def evaluating(prompt: str) -> Iterator[None]:
+    """Attribute the metric scores computed inside the block to ``prompt``."""
+    token = _CANDIDATE.set(prompt)
+    try:
+        yield
+    finally:
+        _CANDIDATE.reset(token)
+
+
+def _usage_tokens(response: Any) -> int:
+    usage = response.get('usage') if isinstance(response, dict) else getattr(response, 'usage', None)
+    if usage is None:
+        return 0
+    total = usage.get('total_tokens') if isinstance(usage, dict) else getattr(usage, 'total_tokens', None)
+    try:
+        return int(total or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class RunBudget:
+    """Limits and best-so-far bookkeeping for one optimizer run."""
+
+    def __init__(
+        self,
+        max_seconds: Optional[float] = None,
+        max_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        plateau_patience: Optional[int] = None,
+        plateau_min_delta: float = 0.0
+    ):
+        self.max_seconds = max_seconds
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.plateau_patience = plateau_patience
+        self.plateau_min_delta = plateau_min_delta
+        self.started = time.monotonic()
+        self.calls = 0
+        self.tokens = 0
+        # Spend of earlier attempts that does not count against the caps.
+        self.previous_calls = 0
+        self.previous_tokens = 0
+        self.exhausted_reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._scores: Dict[str, Dict[str, float]] = {}
+        self._restored: Dict[str, Dict[str, float]] = {}
+        self._best_mean: Optional[float] = None
+        self._candidates_since_improvement = 0
+        self.on_record: List[Callable[['RunBudget', str], None]] = []
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]] = None) -> Optional['RunBudget']:
+        """Build a budget from a job's ``budget`` dict, falling back to OPIK_OPTIMIZER_* env vars."""
+        options = options or {}
+        settings = {
+            'max_seconds': options.get('max_seconds', _env_optional('OPIK_OPTIMIZER_MAX_SECONDS', float)),
+            'max_calls': options.get('max_calls', _env_optional('OPIK_OPTIMIZER_MAX_CALLS', int)),
+            'max_tokens': options.get('max_tokens', _env_optional('OPIK_OPTIMIZER_MAX_TOKENS', int)),
+            'plateau_patience': options.get(
+                'plateau_patience', _env_optional('OPIK_OPTIMIZER_PLATEAU_PATIENCE', int)
+            ),
+        }
+        if all(value is None for value in settings.values()):
+            return None
+        return cls(plateau_min_delta=float(options.get('plateau_min_delta', 0.0)), **settings)
+
+    # ------------------------------------------------------------- enforcement
+
+    @property
+    def exhausted(self) -> bool:
+        return self.exhausted_reason is not None
+
+    def check(self) -> None:
+        with self._lock:
+            if self.exhausted_reason is None:
+                if self.max_seconds is not None and time.monotonic() - self.started >= self.max_seconds:
+                    self.exhausted_reason = 'max_seconds'
+                elif self.max_calls is not None and self.calls >= self.max_calls:
+                    self.exhausted_reason = 'max_calls'
+                elif self.max_tokens is not None and self.tokens >= self.max_tokens:
+                    self.exhausted_reason = 'max_tokens'
+            reason = self.exhausted_reason
+        if reason is not None:
+            raise BudgetExhausted(reason)
+
+    def guard(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        if is_async_completion(completion):
+            @functools.wraps(completion)
+            async def _aguarded(*args: Any, **kwargs: Any) -> Any:
+                self.check()
+                return await completion(*args, **kwargs)
+
+            return _aguarded
+
+        @functools.wraps(completion)
+        def _guarded(*args: Any, **kwargs: Any) -> Any:
+            self.check()
+            return completion(*args, **kwargs)
+
+        return _guarded
+
+    def _charge(self, response: Any) -> None:
+        tokens = _usage_tokens(response)
+        with self._lock:
+            self.calls += 1
+            self.tokens += tokens
+
+    def meter(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        if is_async_completion(completion):
+            @functools.wraps(completion)
+            async def _ametered(*args: Any, **kwargs: Any) -> Any:
+                response = await completion(*args, **kwargs)
+                self._charge(response)
+                return response
+
+            return _ametered
+
+        @functools.wraps(completion)
+        def _metered(*args: Any, **kwargs: Any) -> Any:
+            response = completion(*args, **kwargs)
+            self._charge(response)
+            return response
+
+        return _metered
+
+    # ------------------------------------------------------------- attribution
+
+    def track_metric(self, metric_fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(metric_fn)
+        def _metric(*args: Any, **kwargs: Any) -> Any:
+            result = metric_fn(*args, **kwargs)
+            prompt = _CANDIDATE.get()
+            if prompt is not None:
+                try:
+                    self.record(prompt, float(getattr(result, 'value', result) or 0.0))
+                except (TypeError, ValueError):
+                    pass
+            return result
+
+        return _metric
+
+    def record(self, prompt: str, score: float) -> None:
+        with self._lock:
+            entry = self._scores.get(prompt)
+            if entry is None:
+                entry = self._scores[prompt] = {'sum': 0.0, 'count': 0}
+                self._candidates_since_improvement += 1
+            entry['sum'] += score
+            entry['count'] += 1
+
+            mean = entry['sum'] / entry['count']
+            if self._best_mean is None or mean > self._best_mean + self.plateau_min_delta:
+                self._best_mean = mean
+                self._candidates_since_improvement = 0
+            elif (
+                self.plateau_patience is not None
+                and self._candidates_since_improvement > self.plateau_patience
+                and self.exhausted_reason is None
+            ):
+                self.exhausted_reason = 'plateau'
+        for callback in self.on_record:
+            callback(self, prompt)
+
+    @property
+    def candidate_count(self) -> int:
+        return len(self._scores)
+
+    def _merged_scores_locked(self) -> Dict[str, Dict[str, float]]:
+        # A resumed run replays earlier evaluations, so per candidate the entry
+        # with more evaluations (restored or live) is the complete one.
+        merged = {prompt: dict(entry) for prompt, entry in self._restored.items()}
+        for prompt, entry in self._scores.items():
+            if prompt not in merged or entry['count'] >= merged[prompt]['count']:
+                merged[prompt] = dict(entry)
+        return merged
+
+    def candidate_score(self, prompt: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._scores.get(prompt) or {'sum': 0.0, 'count': 0}
+        count = int(entry['count'])
+        return {'prompt': prompt, 'score': round(entry['sum'] / count, 6) if count else None, 'evaluations': count}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable spend (over all attempts) and per-candidate scores, for checkpoints."""
+        with self._lock:
+            return {
+                'calls': self.previous_calls + self.calls,
+                'tokens': self.previous_tokens + self.tokens,
+                'scores': self._merged_scores_locked()
+            }
+
+    def restore(self, snapshot: Dict[str, Any], carry_spend: bool = False) -> None:
+        """Continue from a `snapshot` taken by an earlier process running the same job.
+
+        Candidate scores always carry over. The earlier spend only counts
+        against ``max_calls``/``max_tokens`` with ``carry_spend``; otherwise it
+        is kept aside (and still reported) so the caps apply to this attempt.
+        """
+        calls = int(snapshot.get('calls') or 0)
+        tokens = int(snapshot.get('tokens') or 0)
+        with self._lock:
+            if carry_spend:
+                self.calls += calls
+                self.tokens += tokens
+            else:
+                self.previous_calls += calls
+                self.previous_tokens += tokens
+            self._restored = {
+                prompt: {'sum': float(entry['sum']), 'count': int(entry['count'])}
+                for prompt, entry in (snapshot.get('scores') or {}).items()
+                if int(entry.get('count') or 0) > 0
+            }
+
+    def best_so_far(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            scores = self._merged_scores_locked()
+        if not scores:
+            return None
+        prompt, entry = max(scores.items(), key=lambda pair: pair[1]['sum'] / pair[1]['count'])
+        return {
+            'prompt': prompt,
+            'score': round(entry['sum'] / entry['count'], 6),
+            'evaluations': int(entry['count']),
+            'candidates_scored': len(scores)
+        }
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'budget_exhausted': self.exhausted,
+            'reason': self.exhausted_reason,
+            'elapsed_seconds': round(time.monotonic() - self.started, 3),
+            'model_calls': self.calls,
+            'tokens': self.tokens,
+            'previous_attempts': {'model_calls': self.previous_calls, 'tokens': self.previous_tokens},
+            'limits': {
+                'max_seconds': self.max_seconds,
+                'max_calls': self.max_calls,
+                'max_tokens': self.max_tokens,
+                'plateau_patience': self.plateau_patience
+            },
+            'best_so_far': self.best_so_far()
+        }
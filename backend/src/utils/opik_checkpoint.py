@@ -0,0 +1,196 @@
+"""Local checkpoints for long optimizer jobs, keyed by the caller's job id.
+
+A checkpoint is one JSON file per job under ``OPIK_OPTIMIZER_CHECKPOINT_DIR``
+holding what is needed to pick the job up after the runner process dies:
+
+* the entry point and a digest of the parameters that define the search
+  (re-submitting a job id with a different search is an error),
+* the dataset version (the dataset cache's content digest of the materialized
+  items) -- if the dataset changed in between, the old progress is discarded,
+* the RNG seed the job started with (``OPIK_OPTIMIZER_SEED`` at that time),
+* every candidate prompt scored so far with its running score, plus the spend,
+  taken from the run's `RunBudget` and written whenever a new candidate shows
+  up (at most every ``save_interval`` seconds otherwise),
+* the final response once the job completed.
+
+The optimizers themselves cannot be restarted mid-generation, so a resumed job
+re-runs with the persisted seed behind the model response cache: trials that
+finished before the crash replay from the cache at no model cost, and the
+persisted candidate scores keep counting towards the best-so-far result.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from opik_budget import RunBudget
+
+DEFAULT_SAVE_INTERVAL = 5.0
+_BEST_CANDIDATES = 5
+
+
+def _env_number(key: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+def params_digest(params: Dict[str, Any]) -> str:
+    canonical = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _checkpoint_filename(job_id: str) -> str:
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', job_id)[:64]
+    suffix = hashlib.sha1(job_id.encode('utf-8')).hexdigest()[:10]
+    return f'{safe}-{suffix}.json'
+
+
+def _best_candidates(scores: Dict[str, Dict[str, float]]) -> List[Dict[str, Any]]:
+    ranked = sorted(
+        ((entry['sum'] / entry['count'], prompt, entry['count']) for prompt, entry in scores.items() if entry['count']),
+        reverse=True
+    )
+    return [
+        {'prompt': prompt, 'score': round(mean, 6), 'evaluations': int(count)}
+        for mean, prompt, count in ranked[:_BEST_CANDIDATES]
+    ]
+
+
+class JobCheckpoint:
+    """Persisted progress of one optimizer job."""
+
+    def __init__(self, path: str, state: Dict[str, Any], resumed: bool, save_interval: Optional[float] = None):
+        self.path = path
+        self.state = state
+        self.resumed = resumed
+        self.save_interval = save_interval if save_interval is not None else _env_number(
+            'OPIK_OPTIMIZER_CHECKPOINT_INTERVAL', DEFAULT_SAVE_INTERVAL
+        )
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._saved_candidates = 0
+
+    @classmethod
+    def open(
+        cls,
+        directory: str,
+        job_id: str,
+        function: str,
+        params: Dict[str, Any],
+        version: str,
+        seed: int
+    ) -> 'JobCheckpoint':
+        """Load the checkpoint for ``job_id`` or start a new one.
+
+        Raises ``ValueError`` when the job id was used for a different entry
+        point or different search parameters.
+        """
+        path = os.path.join(os.path.abspath(directory), _checkpoint_filename(job_id))
+        digest = params_digest(params)
+        previous: Optional[Dict[str, Any]] = None
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                previous = json.load(handle)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            previous = None  # a torn or unreadable checkpoint is treated as absent
+
+        if previous is not None:
+            if previous.get('function') != function or previous.get('params_digest') != digest:
+                raise ValueError(
+                    f'job_id "{job_id}" was already used for a different {previous.get("function")} job'
+                )
+            if previous.get('dataset_version') == version:
+                return cls(path, previous, resumed=True)
+
+        state = {
+            'job_id': job_id,
+            'function': function,
+            'params_digest': digest,
+            'dataset_version': version,
+            'seed': seed,
+            'status': 'running',
+            'attempts': 0,
+            'progress': {},
+            'created_at': time.time()
+        }
+        if previous is not None:
+            state['discarded'] = 'dataset_changed'
+        return cls(path, state, resumed=False)
+
+    @property
+    def seed(self) -> int:
+        return int(self.state['seed'])
+
+    @property
+    def completed(self) -> bool:
+        return self.state.get('status') == 'completed' and isinstance(self.state.get('response'), dict)
+
+    def attach(self, budget: RunBudget, carry_spend: bool = False) -> None:
+        """Restore ``budget`` from the checkpoint and persist its progress from now on.
+
+        See `RunBudget.restore` for ``carry_spend``.
+        """
+        if self.resumed:
+            budget.restore(self.state.get('progress') or {}, carry_spend=carry_spend)
+        self.state['attempts'] = int(self.state.get('attempts') or 0) + 1
+        self.state['status'] = 'running'
+        budget.on_record.append(self._on_record)
+        self.save()
+
+    def _on_record(self, budget: RunBudget, _prompt: str) -> None:
+        candidates = budget.candidate_count
+        if candidates == self._saved_candidates and time.monotonic() - self._last_save < self.save_interval:
+            return
+        self.save(budget)
+
+    def update(self, **fields: Any) -> None:
+        with self._lock:
+            self.state.update(fields)
+        self.save()
+
+    def save(self, budget: Optional[RunBudget] = None) -> None:
+        with self._lock:
+            if budget is not None:
+                progress = budget.snapshot()
+                progress['best_candidates'] = _best_candidates(progress['scores'])
+                self.state['progress'] = progress
+                self._saved_candidates = budget.candidate_count
+            self.state['updated_at'] = time.time()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(self.state, handle, default=str)
+            os.replace(tmp_path, self.path)
+            self._last_save = time.monotonic()
+
+    def finish(self, response: Dict[str, Any], budget: Optional[RunBudget], status: str) -> None:
+        """Record the outcome; only ``completed`` jobs are answered from the checkpoint later."""
+        with self._lock:
+            self.state['status'] = status
+            if status == 'completed':
+                self.state['response'] = response
+        self.save(budget)
+
+    def summary(self) -> Dict[str, Any]:
+        progress = self.state.get('progress') or {}
+        return {
+            'job_id': self.state['job_id'],
+            'path': self.path,
+            'status': self.state.get('status'),
+            'resumed': self.resumed,
+            'attempts': self.state.get('attempts', 0),
+            'seed': self.seed,
+            'dataset_version': self.state.get('dataset_version'),
+            'candidates_scored': len(progress.get('scores') or {}),
+            'best_candidates': progress.get('best_candidates', []),
+            'discarded': self.state.get('discarded')
+        }
@@ -0,0 +1,83 @@
+"""Process-wide registry of Opik clients shared by the helper modules.
+
+`opik_logger`, `opik_wrapper` and `opik_optimizer_helpers` all ask this module
+for their client, so one ``Opik`` instance (and its HTTP connection pool and
+authentication) is reused per ``(project, workspace, host, api key)`` for the
+lifetime of the process; the registry keys on a digest of the API key rather
+than the key itself. Clients are flushed and closed once at interpreter exit; a
+forked worker starts with an empty registry instead of sharing the parent's
+connections.
+"""
+
+import atexit
+import hashlib
+import os
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+_ClientKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+_clients: Dict[_ClientKey, Any] = {}
+_owner_pid = os.getpid()
+_lock = threading.Lock()
+
+
+def get_client(
+    project_name: Optional[str] = None,
+    workspace: Optional[str] = None,
+    host: Optional[str] = None,
+    api_key: Optional[str] = None
+) -> Any:
+    """Return the shared client for these settings, creating it on first use.
+
+    Callers passing different ``api_key`` values get different clients.
+    """
+    global _owner_pid
+    host = host or os.environ.get('OPIK_HOST') or None
+    key_digest = hashlib.sha256(api_key.encode('utf-8')).hexdigest() if api_key else None
+    key = (project_name, workspace, host, key_digest)
+
+    with _lock:
+        if _owner_pid != os.getpid():
+            # HTTP connections must not be shared across fork.
+            _clients.clear()
+            _owner_pid = os.getpid()
+
+        client = _clients.get(key)
+        if client is None:
+            from opik import Opik
+
+            kwargs: Dict[str, Any] = {'project_name': project_name, 'workspace': workspace}
+            if host:
+                kwargs['host'] = host
+            if api_key:
+                kwargs['api_key'] = api_key
+            client = Opik(**kwargs)
+            _clients[key] = client
+        return client
+
+
+def close_clients() -> None:
+    """Flush and close every client created by this process."""
+    with _lock:
+        if _owner_pid != os.getpid():
+            _clients.clear()
+            return
+        clients = list(_clients.values())
+        _clients.clear()
+
+    for client in clients:
+        for method in ('flush', 'end'):
+            handler = getattr(client, method, None)
+            if not callable(handler):
+                continue
+            try:
+                handler()
+            except Exception as exc:  # pragma: no cover - shutdown is best effort
+                sys.stderr.write(f'[opik] client {method} failed: {exc}\n')
+
+
+# Registered at import time, before any trace sink, so it runs after the sinks
+# have flushed (atexit handlers run in reverse registration order).
+atexit.register(close_clients)
@@ -0,0 +1,345 @@
+"""Adaptive concurrency and rate limiting for optimizer model calls.
+
+`ConcurrencyController` sits in front of the model (behind the response cache,
+so cache hits are never throttled) and keeps one `ModelLimiter` per model
+name. Every call first takes a token from the model's token bucket
+(``requests_per_second`` with ``burst`` capacity) and then a slot from an
+AIMD window of in-flight calls:
+
+* each success grows the window additively, by one slot per window's worth of
+  successful calls,
+* a throttled call (HTTP 429 / ``RateLimitError``) halves the window, pauses
+  the bucket for the retry-after (or backoff) delay and is retried up to
+  ``max_retries`` times with jittered exponential backoff,
+* a call slower than ``latency_tolerance`` times the moving average latency
+  shrinks the window gently (``latency_decrease``), since queueing at the
+  provider shows up as latency before it shows up as 429s.
+
+The window stays within ``[min_in_flight, max_in_flight]``; optimizers are
+given ``max_in_flight`` worker threads and the controller decides how many of
+them may talk to the model at once. Settings come from a job's
+``concurrency`` dict, falling back to OPIK_OPTIMIZER_* env vars. Concurrent
+jobs on the same model share its limiter; each registers its settings under
+its own key and the limiter enforces the strictest of them until the job
+unregisters them. Async calls (``litellm.acompletion``) go through the same
+bucket and window.
+"""
+
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from opik_llm_cache import is_async_completion
+
+DEFAULT_MIN_IN_FLIGHT = 1
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_LATENCY_TOLERANCE = 3.0
+DEFAULT_LATENCY_DECREASE = 0.9
+_BACKOFF_BASE_SECONDS = 0.5
+_BACKOFF_CAP_SECONDS = 30.0
+_LATENCY_SMOOTHING = 0.1
+
+
+def _env_optional(key: str, cast: Callable[[str], Any]) -> Any:
+    value = os.environ.get(key)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def default_max_in_flight() -> int:
+    # Model calls are I/O bound, so the ceiling scales past the core count.
+    return max(4, min(32, (os.cpu_count() or 2) * 4))
+
+
+def resolve_settings(options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge a job's ``concurrency`` options over the OPIK_OPTIMIZER_* env defaults."""
+    options = options or {}
+    max_in_flight = options.get('max_in_flight', _env_optional('OPIK_OPTIMIZER_MAX_IN_FLIGHT', int))
+    max_in_flight = max(1, int(max_in_flight or default_max_in_flight()))
+    min_in_flight = max(1, min(max_in_flight, int(options.get('min_in_flight', DEFAULT_MIN_IN_FLIGHT))))
+    initial = options.get('initial_in_flight', _env_optional('OPIK_OPTIMIZER_INITIAL_IN_FLIGHT', int))
+    rate = options.get('requests_per_second', _env_optional('OPIK_OPTIMIZER_REQUESTS_PER_SECOND', float))
+    burst = options.get('burst', _env_optional('OPIK_OPTIMIZER_REQUEST_BURST', float))
+    return {
+        'max_in_flight': max_in_flight,
+        'min_in_flight': min_in_flight,
+        'initial_in_flight': max(min_in_flight, min(max_in_flight, int(initial))) if initial else None,
+        'requests_per_second': float(rate) if rate else None,
+        'burst': float(burst) if burst else None,
+        'max_retries': int(options.get('max_retries', DEFAULT_MAX_RETRIES)),
+        'latency_tolerance': float(options.get('latency_tolerance', DEFAULT_LATENCY_TOLERANCE)),
+        'latency_decrease': float(options.get('latency_decrease', DEFAULT_LATENCY_DECREASE))
+    }
+
+
+def merge_settings(base: Dict[str, Any], jobs: Dict[Hashable, Dict[str, Any]]) -> Dict[str, Any]:
+    """The strictest of the jobs' settings (``base`` when no job has registered any)."""
+    if not jobs:
+        return base
+    every = list(jobs.values())
+    strictest = lambda key: min(settings[key] for settings in every)
+    present = lambda key: [settings[key] for settings in every if settings[key] is not None]
+    max_in_flight = strictest('max_in_flight')
+    return {
+        'max_in_flight': max_in_flight,
+        'min_in_flight': min(max_in_flight, strictest('min_in_flight')),
+        'initial_in_flight': None,
+        'requests_per_second': min(present('requests_per_second'), default=None),
+        'burst': min(present('burst'), default=None),
+        'max_retries': strictest('max_retries'),
+        'latency_tolerance': strictest('latency_tolerance'),
+        'latency_decrease': strictest('latency_decrease')
+    }
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    status = getattr(exc, 'status_code', None) or getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status == 429 or 'RateLimit' in type(exc).__name__
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        return float(value) if value else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Blocking token bucket refilled at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill_locked(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available; returns the time waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill_locked(now)
+                if now >= self._paused_until and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = max(self._paused_until - now, (1.0 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` (the provider asked us to back off)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class ModelLimiter:
+    """Token bucket plus AIMD in-flight window for one model."""
+
+    def __init__(self, model: str, settings: Dict[str, Any], job: Optional[Hashable] = None):
+        self.model = model
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+        self._successes = 0
+        self._latency: Optional[float] = None
+        self.bucket: Optional[TokenBucket] = None
+        self._bucket_spec: Optional[tuple] = None
+        self.limit = float(settings['initial_in_flight'] or settings['max_in_flight'])
+        # A limiter created for a job falls back to the env defaults once every job is gone.
+        self._base_settings = settings if job is None else resolve_settings()
+        self._job_settings: Dict[Hashable, Dict[str, Any]] = {}
+        self.configure(settings, job)
+
+    def configure(self, settings: Dict[str, Any], job: Optional[Hashable] = None) -> None:
+        """Set the limiter's settings, or (with ``job``) register that job's settings."""
+        with self._cond:
+            if job is None:
+                self._base_settings = settings
+            else:
+                self._job_settings[job] = settings
+            self._apply_locked()
+
+    def unregister(self, job: Hashable) -> None:
+        """Forget ``job``'s settings once it no longer calls the model."""
+        with self._cond:
+            if self._job_settings.pop(job, None) is not None:
+                self._apply_locked()
+
+    def _apply_locked(self) -> None:
+        settings = merge_settings(self._base_settings, self._job_settings)
+        self.settings = settings
+        self.max_in_flight = settings['max_in_flight']
+        self.min_in_flight = settings['min_in_flight']
+        self.limit = max(float(self.min_in_flight), min(float(self.max_in_flight), self.limit))
+        spec = (settings['requests_per_second'], settings['burst'])
+        if spec != self._bucket_spec:
+            self.bucket = TokenBucket(spec[0], spec[1]) if spec[0] else None
+            self._bucket_spec = spec
+        self._cond.notify_all()
+
+    def acquire(self) -> None:
+        started = time.monotonic()
+        if self.bucket is not None:
+            self.bucket.acquire()
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            self.wait_seconds += time.monotonic() - started
+
+    def release(self, latency: Optional[float], throttled: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self.calls += 1
+            if throttled:
+                self.throttled += 1
+                self._successes = 0
+                self.limit = max(float(self.min_in_flight), self.limit / 2.0)
+            elif latency is not None:
+                average = self._latency if self._latency is not None else latency
+                self._latency = average + _LATENCY_SMOOTHING * (latency - average)
+                if latency > average * self.settings['latency_tolerance']:
+                    self.limit = max(float(self.min_in_flight), self.limit * self.settings['latency_decrease'])
+                else:
+                    self._successes += 1
+                    if self._successes >= int(self.limit):
+                        self._successes = 0
+                        self.limit = min(float(self.max_in_flight), self.limit + 1.0)
+            self._cond.notify_all()
+
+    def _throttle_delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Record a failed call; returns the delay before retrying it, or ``None`` to raise."""
+        if not is_throttle_error(exc):
+            self.release(None)
+            return None
+        self.release(None, throttled=True)
+        if attempt >= self.settings['max_retries']:
+            return None
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = min(_BACKOFF_CAP_SECONDS, _BACKOFF_BASE_SECONDS * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.5)
+        if self.bucket is not None:
+            self.bucket.pause(delay)
+        with self._cond:
+            self.retries += 1
+        return delay
+
+    def call(self, completion: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            self.acquire()
+            started = time.monotonic()
+            try:
+                response = completion(*args, **kwargs)
+            except Exception as exc:
+                delay = self._throttle_delay(exc, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.release(time.monotonic() - started)
+            return response
+
+    async def acall(self, completion: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """`call` for coroutine functions; waits for the bucket and window off the event loop."""
+        attempt = 0
+        while True:
+            await asyncio.to_thread(self.acquire)
+            started = time.monotonic()
+            try:
+                response = await completion(*args, **kwargs)
+            except Exception as exc:
+                delay = self._throttle_delay(exc, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.release(time.monotonic() - started)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'limit': round(self.limit, 2),
+                'max_in_flight': self.max_in_flight,
+                'requests_per_second': self.settings['requests_per_second'],
+                'calls': self.calls,
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'wait_seconds': round(self.wait_seconds, 3)
+            }
+
+
+class ConcurrencyController:
+    """Process-wide registry of per-model limiters."""
+
+    def __init__(self):
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(
+        self,
+        model: Optional[str],
+        settings: Optional[Dict[str, Any]] = None,
+        job: Optional[Hashable] = None
+    ) -> ModelLimiter:
+        """Return ``model``'s limiter, applying ``settings`` (as ``job``'s, if given)."""
+        name = model or 'default'
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = self._limiters[name] = ModelLimiter(
+                    name, settings or resolve_settings(), job if settings is not None else None
+                )
+            elif settings is not None:
+                limiter.configure(settings, job)
+        return limiter
+
+    def unregister(self, model: Optional[str], job: Hashable) -> None:
+        with self._lock:
+            limiter = self._limiters.get(model or 'default')
+        if limiter is not None:
+            limiter.unregister(job)
+
+    def wrap(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        if is_async_completion(completion):
+            @functools.wraps(completion)
+            async def _alimited(*args: Any, **kwargs: Any) -> Any:
+                return await self.limiter(kwargs.get('model')).acall(completion, *args, **kwargs)
+
+            return _alimited
+
+        @functools.wraps(completion)
+        def _limited(*args: Any, **kwargs: Any) -> Any:
+            return self.limiter(kwargs.get('model')).call(completion, *args, **kwargs)
+
+        return _limited
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.model: limiter.stats() for limiter in limiters}
@@ -0,0 +1,263 @@
+"""Local cache for Opik datasets fetched by the optimizer helpers.
+
+Dataset items are stored as content-addressed JSON files under
+``<cache>/objects/<sha256>.json`` and described by a small ``index.json`` keyed
+by ``identifier`` and item limit. Entries younger than the TTL are served
+directly. Stale entries are revalidated against a cheap fingerprint of the
+remote dataset (its item count / update stamp) and only re-downloaded when that
+changed; if the backend is unreachable a stale entry is served instead. The
+total size is capped with least-recently-used eviction.
+
+Several runner processes may share one cache directory, so every
+read-modify-write of the index holds an exclusive ``flock`` on
+``index.lock`` (plus a thread lock within the process).
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: processes are not coordinated
+    fcntl = None
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _env_number(key: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+def content_digest(items: List[Dict[str, Any]]) -> str:
+    """sha256 of the items' compact JSON encoding; names the cached object file."""
+    return hashlib.sha256(_encode(items)).hexdigest()
+
+
+def _encode(items: List[Dict[str, Any]]) -> bytes:
+    return json.dumps(items, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def _entry_key(identifier: str, limit: Optional[int]) -> str:
+    return f'{identifier}::{limit if limit else "all"}'
+
+
+class DatasetCache:
+    """Content-addressed dataset store with TTL, revalidation and LRU eviction."""
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        self.directory = os.path.abspath(directory)
+        self._objects = os.path.join(self.directory, 'objects')
+        self._index_path = os.path.join(self.directory, 'index.json')
+        self._lock_path = os.path.join(self.directory, 'index.lock')
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_number(
+            'OPIK_DATASET_CACHE_TTL', DEFAULT_TTL_SECONDS
+        )
+        self.max_bytes = max_bytes or int(_env_number('OPIK_DATASET_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self._lock = threading.Lock()
+        os.makedirs(self._objects, exist_ok=True)
+
+    # ------------------------------------------------------------------ index
+
+    @contextlib.contextmanager
+    def _index_locked(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as handle:
+                index = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _write_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        tmp_path = f'{self._index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(index, handle)
+        os.replace(tmp_path, self._index_path)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects, f'{digest}.json')
+
+    def _read_object(self, digest: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._object_path(digest), 'rb') as handle:
+                return json.loads(handle.read())
+        except (OSError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------ public
+
+    def lookup(self, identifier: str, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Return the index entry that can serve ``(identifier, limit)``, if any.
+
+        A cached full download also serves any smaller limit.
+        """
+        index = self._read_index()
+        entry = index.get(_entry_key(identifier, limit))
+        if entry is None and limit:
+            full = index.get(_entry_key(identifier, None))
+            if full is not None:
+                entry = full
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get('fetched_at', 0) < self.ttl_seconds
+
+    def load(self, entry: Dict[str, Any], limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        items = self._read_object(entry['digest'])
+        if items is None:
+            return None
+        self._touch(entry['key'])
+        return items[:limit] if limit else items
+
+    def store(
+        self,
+        identifier: str,
+        limit: Optional[int],
+        items: List[Dict[str, Any]],
+        fingerprint: Optional[str] = None
+    ) -> Dict[str, Any]:
+        data = _encode(items)
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = self._object_path(digest)
+        key = _entry_key(identifier, limit)
+        now = time.time()
+        entry = {
+            'key': key,
+            'identifier': identifier,
+            'limit': limit,
+            'digest': digest,
+            'size': len(data),
+            'count': len(items),
+            'fingerprint': fingerprint,
+            'fetched_at': now,
+            'last_access': now
+        }
+        # Write the object under the lock too, so another process's eviction
+        # cannot delete it between the write and the index update.
+        with self._index_locked():
+            if not os.path.exists(object_path):
+                tmp_path = f'{object_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as handle:
+                    handle.write(data)
+                os.replace(tmp_path, object_path)
+            index = self._read_index()
+            index[key] = entry
+            self._evict(index)
+            self._write_index(index)
+        return entry
+
+    def revalidated(self, entry: Dict[str, Any]) -> None:
+        """Mark ``entry`` fresh again after its fingerprint matched the remote dataset."""
+        with self._index_locked():
+            index = self._read_index()
+            current = index.get(entry['key'])
+            if current is not None:
+                current['fetched_at'] = time.time()
+                self._write_index(index)
+
+    def count(self, identifier: str) -> Optional[int]:
+        """Item count of a cached full download of ``identifier``."""
+        entry = self._read_index().get(_entry_key(identifier, None))
+        return entry.get('count') if entry else None
+
+    # --------------------------------------------------------------- internals
+
+    def _touch(self, key: str) -> None:
+        with self._index_locked():
+            index = self._read_index()
+            if key in index:
+                index[key]['last_access'] = time.time()
+                self._write_index(index)
+
+    def _evict(self, index: Dict[str, Dict[str, Any]]) -> None:
+        sizes: Dict[str, int] = {}
+        for entry in index.values():
+            sizes[entry['digest']] = entry.get('size', 0)
+        total = sum(sizes.values())
+
+        for key, entry in sorted(index.items(), key=lambda pair: pair[1].get('last_access', 0)):
+            if total <= self.max_bytes:
+                break
+            del index[key]
+            digest = entry['digest']
+            if any(other['digest'] == digest for other in index.values()):
+                continue
+            total -= sizes.get(digest, 0)
+            try:
+                os.unlink(self._object_path(digest))
+            except OSError:
+                pass
+
+    def fetch(
+        self,
+        identifier: str,
+        limit: Optional[int],
+        download: Callable[[], List[Dict[str, Any]]],
+        fingerprint: Callable[[], Optional[str]]
+    ) -> List[Dict[str, Any]]:
+        """Serve ``(identifier, limit)`` from the cache, revalidating or downloading as needed."""
+        entry = self.lookup(identifier, limit)
+        if entry is not None and self.is_fresh(entry):
+            items = self.load(entry, limit)
+            if items is not None:
+                return items
+
+        remote_fingerprint = None
+        if entry is not None:
+            try:
+                remote_fingerprint = fingerprint()
+            except Exception as exc:  # backend unreachable: serve stale data
+                items = self.load(entry, limit)
+                if items is not None:
+                    sys.stderr.write(f'[opik] serving cached dataset "{identifier}" ({exc})\n')
+                    return items
+                raise
+            if remote_fingerprint is not None and remote_fingerprint == entry.get('fingerprint'):
+                items = self.load(entry, limit)
+                if items is not None:
+                    self.revalidated(entry)
+                    return items
+
+        try:
+            items = download()
+        except Exception:
+            stale = self.load(entry, limit) if entry is not None else None
+            if stale is None:
+                raise
+            sys.stderr.write(f'[opik] dataset "{identifier}" download failed; serving cached copy\n')
+            return stale
+
+        if remote_fingerprint is None:
+            try:
+                remote_fingerprint = fingerprint()
+            except Exception:
+                remote_fingerprint = None
+        self.store(identifier, limit, list(items), remote_fingerprint)
+        return items
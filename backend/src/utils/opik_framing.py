@@ -0,0 +1,102 @@
+"""Result channel used by opik_runner to send responses back to Node.
+
+By default every response is one JSON line, exactly as before. In framed mode
+each response is a length-prefixed frame so large optimizer results can be
+collected as raw buffers and decoded once:
+
+    4 bytes  big-endian payload length
+    1 byte   flags (FLAG_MSGPACK, FLAG_ZLIB)
+    N bytes  payload
+
+The payload is JSON unless FLAG_MSGPACK is set (requires the optional
+``msgpack`` package) and is zlib-compressed when FLAG_ZLIB is set.
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, BinaryIO, Optional
+
+try:
+    import msgpack  # optional compact encoding
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+FRAME_HEADER = struct.Struct('>IB')
+FLAG_MSGPACK = 0x01
+FLAG_ZLIB = 0x02
+
+# Payloads smaller than this are sent uncompressed even when zlib is enabled.
+MIN_COMPRESS_BYTES = 1024
+
+
+def _json_bytes(payload: Any) -> bytes:
+    return json.dumps(payload, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def encode_frame(payload: Any, encoding: str = 'json', compress: Optional[str] = None) -> bytes:
+    flags = 0
+    if encoding == 'msgpack':
+        if msgpack is None:
+            raise RuntimeError('msgpack encoding requested but the msgpack package is not installed')
+        body = msgpack.packb(payload, default=str, use_bin_type=True)
+        flags |= FLAG_MSGPACK
+    else:
+        body = _json_bytes(payload)
+
+    if compress == 'zlib' and len(body) >= MIN_COMPRESS_BYTES:
+        body = zlib.compress(body, 6)
+        flags |= FLAG_ZLIB
+
+    return FRAME_HEADER.pack(len(body), flags) + body
+
+
+def read_frame(stream: BinaryIO) -> Optional[Any]:
+    """Read and decode the next frame from ``stream``; returns None at EOF."""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    length, flags = FRAME_HEADER.unpack(header)
+    body = stream.read(length)
+    if len(body) < length:
+        raise ValueError('truncated result frame')
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError('received a msgpack frame but the msgpack package is not installed')
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+class ResultChannel:
+    """Write runner responses as JSON lines or length-prefixed frames."""
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        framed: bool = False,
+        encoding: str = 'json',
+        compress: Optional[str] = None
+    ):
+        if encoding not in ('json', 'msgpack'):
+            raise ValueError(f'Unsupported result encoding "{encoding}"')
+        if compress not in (None, 'zlib'):
+            raise ValueError(f'Unsupported result compression "{compress}"')
+        if encoding == 'msgpack' and msgpack is None:
+            raise RuntimeError('msgpack encoding requested but the msgpack package is not installed')
+        if not framed and (encoding != 'json' or compress):
+            raise ValueError('Binary encoding and compression require framed output (--frame)')
+
+        self._stream = stream
+        self.framed = framed
+        self.encoding = encoding
+        self.compress = compress
+
+    def send(self, payload: Any) -> None:
+        if self.framed:
+            data = encode_frame(payload, self.encoding, self.compress)
+        else:
+            data = (json.dumps(payload, default=str) + '\n').encode('utf-8')
+        self._stream.write(data)
+        self._stream.flush()
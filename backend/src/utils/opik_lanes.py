@@ -0,0 +1,117 @@
+"""Execution lanes that keep slow optimizer jobs from starving trace logging.
+
+Every registered runner function belongs to a lane. Each lane owns a bounded
+thread pool plus a bounded queue; when both are full the lane rejects new work
+immediately so the caller can back off instead of waiting behind a long
+optimizer run.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LOGGING_LANE = 'logging'
+OPTIMIZER_LANE = 'optimizer'
+METRICS_LANE = 'metrics'
+
+# lane -> (workers, queue depth)
+DEFAULT_LANE_LIMITS: Dict[str, Tuple[int, int]] = {
+    LOGGING_LANE: (4, 1000),
+    OPTIMIZER_LANE: (1, 8),
+    METRICS_LANE: (2, 64)
+}
+
+
+class LaneSaturated(RuntimeError):
+    """Raised when a lane has no free worker and its queue is full."""
+
+    def __init__(self, lane: str, in_flight: int, capacity: int):
+        super().__init__(f"Lane '{lane}' is saturated ({in_flight}/{capacity} requests in flight)")
+        self.lane = lane
+        self.in_flight = in_flight
+        self.capacity = capacity
+
+
+def parse_lane_limits(spec: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """Parse ``"logging=4:1000,optimizer=1:8"`` overrides on top of the defaults."""
+    limits = dict(DEFAULT_LANE_LIMITS)
+    if not spec:
+        return limits
+
+    for chunk in spec.split(','):
+        if '=' not in chunk:
+            continue
+        name, value = chunk.split('=', 1)
+        workers, _, depth = value.partition(':')
+        try:
+            worker_count = max(1, int(workers))
+            queue_depth = max(0, int(depth)) if depth else limits.get(name.strip(), (0, 0))[1]
+        except ValueError:
+            continue
+        limits[name.strip()] = (worker_count, queue_depth)
+
+    return limits
+
+
+class _Lane:
+    def __init__(self, name: str, workers: int, queue_depth: int):
+        self.name = name
+        self.workers = workers
+        self.capacity = workers + queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'opik-{name}')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise LaneSaturated(self.name, self._in_flight, self.capacity)
+            self._in_flight += 1
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'capacity': self.capacity,
+                'in_flight': self._in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+class LaneScheduler:
+    """Route callables to per-lane pools with bounded queue depth."""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        limits = limits or parse_lane_limits(os.environ.get('OPIK_RUNNER_LANES'))
+        self._lanes = {
+            name: _Lane(name, workers, depth)
+            for name, (workers, depth) in limits.items()
+        }
+
+    def submit(self, lane: str, fn: Callable[..., Any], *args: Any) -> Future:
+        target = self._lanes.get(lane) or self._lanes[LOGGING_LANE]
+        return target.submit(fn, *args)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: lane.stats() for name, lane in self._lanes.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        for lane in self._lanes.values():
+            lane.shutdown(wait=wait)
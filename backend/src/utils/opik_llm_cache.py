@@ -0,0 +1,389 @@
+"""Content-addressed cache of model responses for optimizer runs.
+
+While `cached_completions` is active, ``litellm.completion`` and
+``litellm.acompletion`` (which the Opik optimizers call for every candidate
+evaluation, reflection and root-cause step) are routed through a wrapper that
+looks the request up in a SQLite file first. The key is a
+sha256 of the model name, messages and the sampling parameters that change the
+answer, so a rerun after a crash -- or with unrelated parameters tweaked --
+replays already-answered requests instead of paying for them again.
+
+Entries expire after ``ttl_seconds``; when the file grows past ``max_bytes``
+the least recently used responses are removed. Streaming calls are passed
+through untouched.
+
+``OPIK_LLM_STUB_COMPLETION=module:function`` swaps the real model for a local
+callable with the ``litellm.completion`` signature, which makes runs testable
+without network access.
+"""
+
+import contextlib
+import contextvars
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+Wrapper = Callable[[Callable[..., Any]], Callable[..., Any]]
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# litellm.completion keyword arguments that influence the response.
+_KEY_PARAMS = (
+    'temperature', 'top_p', 'n', 'max_tokens', 'max_completion_tokens', 'stop', 'seed',
+    'response_format', 'tools', 'tool_choice', 'presence_penalty', 'frequency_penalty', 'logit_bias'
+)
+
+
+def _env_number(key: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+def request_key(model: Optional[str], messages: Any, params: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {
+            'model': model,
+            'messages': messages,
+            'params': {name: params[name] for name in _KEY_PARAMS if params.get(name) is not None}
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _dump_response(response: Any) -> Any:
+    for method in ('model_dump', 'dict', 'to_dict'):
+        dump = getattr(response, method, None)
+        if callable(dump):
+            return dump()
+    return response
+
+
+def _load_response(data: Any) -> Any:
+    if not isinstance(data, dict):
+        return data
+    try:
+        from litellm import ModelResponse
+    except ImportError:
+        return data
+    try:
+        return ModelResponse(**data)
+    except Exception:  # pragma: no cover - fall back to the raw payload
+        return data
+
+
+def is_async_completion(completion: Callable[..., Any]) -> bool:
+    """Whether ``completion`` (or the function it wraps) is a coroutine function."""
+    return inspect.iscoroutinefunction(inspect.unwrap(completion))
+
+
+def load_stub_completion(spec: Optional[str]) -> Optional[Callable[..., Any]]:
+    """Resolve a ``module:function`` spec to a completion callable."""
+    if not spec:
+        return None
+    module_name, _, attr = spec.partition(':')
+    if not module_name or not attr:
+        raise ValueError(f'Invalid stub completion "{spec}"; expected "module:function"')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LLMResponseCache:
+    """SQLite-backed response store with TTL and size-based LRU eviction."""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.path = os.path.abspath(path)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_number(
+            'OPIK_LLM_CACHE_TTL', DEFAULT_TTL_SECONDS
+        )
+        self.max_bytes = max_bytes or int(_env_number('OPIK_LLM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._owner_pid: Optional[int] = None
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None or self._owner_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS llm_responses ('
+                'key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'created REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS llm_responses_access ON llm_responses (last_access)')
+            self._owner_pid = os.getpid()
+        return self._db
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            db = self._connection()
+            row = db.execute('SELECT value, created FROM llm_responses WHERE key = ?', (key,)).fetchone()
+            if row is None or time.time() - row[1] > self.ttl_seconds:
+                return None
+            with db:
+                db.execute('UPDATE llm_responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, model: Optional[str], value: Any) -> None:
+        data = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute(
+                    'INSERT OR REPLACE INTO llm_responses (key, model, value, size, created, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, model, data, len(data), now, now)
+                )
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 64:
+                self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        self._writes_since_evict = 0
+        db = self._connection()
+        with db:
+            db.execute('DELETE FROM llm_responses WHERE created < ?', (time.time() - self.ttl_seconds,))
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM llm_responses').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes
+            freed = 0
+            doomed = []
+            for key, size in db.execute('SELECT key, size FROM llm_responses ORDER BY last_access'):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            db.executemany('DELETE FROM llm_responses WHERE key = ?', doomed)
+
+    def wrap(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        """Return ``completion`` with lookups in front of it (async if it is)."""
+
+        def _lookup(args: Any, kwargs: Dict[str, Any]) -> Any:
+            if kwargs.get('stream') or args:
+                self.bypassed += 1
+                return None, None
+            key = request_key(kwargs.get('model'), kwargs.get('messages'), kwargs)
+            return key, self.get(key)
+
+        def _store(key: str, model: Optional[str], response: Any) -> None:
+            try:
+                self.put(key, model, _dump_response(response))
+            except (sqlite3.Error, TypeError, ValueError) as exc:  # pragma: no cover - caching is best effort
+                sys.stderr.write(f'[opik] LLM cache write failed: {exc}\n')
+
+        if is_async_completion(completion):
+            async def _cached_acompletion(*args: Any, **kwargs: Any) -> Any:
+                key, cached = _lookup(args, kwargs)
+                if key is None:
+                    return await completion(*args, **kwargs)
+                if cached is not None:
+                    self.hits += 1
+                    return _load_response(cached)
+                self.misses += 1
+                response = await completion(*args, **kwargs)
+                _store(key, kwargs.get('model'), response)
+                return response
+
+            _cached_acompletion.__wrapped__ = completion
+            return _cached_acompletion
+
+        def _cached_completion(*args: Any, **kwargs: Any) -> Any:
+            key, cached = _lookup(args, kwargs)
+            if key is None:
+                return completion(*args, **kwargs)
+            if cached is not None:
+                self.hits += 1
+                return _load_response(cached)
+            self.misses += 1
+            response = completion(*args, **kwargs)
+            _store(key, kwargs.get('model'), response)
+            return response
+
+        _cached_completion.__wrapped__ = completion
+        return _cached_completion
+
+    def stats(self) -> Dict[str, Any]:
+        return {'hits': self.hits, 'misses': self.misses, 'bypassed': self.bypassed, 'path': self.path}
+
+
+# One dispatcher is installed as ``litellm.completion`` (and one as
+# ``litellm.acompletion``) while any scope is active; it routes each call to
+# the completion chain of the scope whose context the call runs in, so
+# concurrent runs never share budgets or caches.
+_ROUTE: 'contextvars.ContextVar[Optional[Tuple[Callable[..., Any], Callable[..., Any]]]]' = (
+    contextvars.ContextVar('opik_llm_route', default=None)
+)
+_patch_lock = threading.Lock()
+_patch_depth = 0
+_original_completion: Optional[Callable[..., Any]] = None
+_original_acompletion: Optional[Callable[..., Any]] = None
+_original_executor_submit: Optional[Callable[..., Any]] = None
+
+
+def _call_original(*args: Any, **kwargs: Any) -> Any:
+    return _original_completion(*args, **kwargs)
+
+
+async def _acall_original(*args: Any, **kwargs: Any) -> Any:
+    return await _original_acompletion(*args, **kwargs)
+
+
+def _dispatch_completion(*args: Any, **kwargs: Any) -> Any:
+    route = _ROUTE.get()
+    if route is None:
+        return _original_completion(*args, **kwargs)
+    return route[0](*args, **kwargs)
+
+
+async def _dispatch_acompletion(*args: Any, **kwargs: Any) -> Any:
+    route = _ROUTE.get()
+    if route is None:
+        return await _original_acompletion(*args, **kwargs)
+    return await route[1](*args, **kwargs)
+
+
+def routed_completion(*args: Any, **kwargs: Any) -> Any:
+    """Call the model through the active scope's chain, or ``litellm.completion`` outside one.
+
+    For helpers that call the model directly rather than through an optimizer,
+    so their calls share the run's cache, budget and rate limits.
+    """
+    route = _ROUTE.get()
+    if route is not None:
+        return route[0](*args, **kwargs)
+    import litellm
+
+    return litellm.completion(*args, **kwargs)
+
+
+def in_scope(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind ``fn`` to the caller's context, so a pool worker running it uses this scope.
+
+    Threads do not inherit context variables; wrap callables handed to a thread
+    pool at the call site (``pool.submit(in_scope(fn), ...)``).
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def _run(*args: Any, **kwargs: Any) -> Any:
+        # A Context can only be entered by one thread at a time.
+        return context.copy().run(fn, *args, **kwargs)
+
+    return _run
+
+
+def _submit_in_scope(executor: Any, task: Callable[..., Any]) -> Any:
+    # Opik's evaluation engine runs each optimizer candidate evaluation on its
+    # own thread pool; bind the tasks to the submitting run's scope.
+    return _original_executor_submit(executor, in_scope(task))
+
+
+def _evaluation_executor() -> Any:
+    try:
+        from opik.evaluation.engine.evaluation_tasks_executor import StreamingExecutor
+    except ImportError:
+        return None
+    return StreamingExecutor
+
+
+def _build_route(
+    cache: Optional[LLMResponseCache],
+    outer: Optional[Wrapper],
+    inner: Optional[Wrapper],
+    base: Callable[..., Any]
+) -> Callable[..., Any]:
+    completion = base
+    if inner is not None:
+        completion = inner(completion)
+    if cache is not None:
+        completion = cache.wrap(completion)
+    if outer is not None:
+        completion = outer(completion)
+    return completion
+
+
+def _async_stub(stub: Callable[..., Any]) -> Callable[..., Any]:
+    if is_async_completion(stub):
+        return stub
+
+    async def _stub(*args: Any, **kwargs: Any) -> Any:
+        return stub(*args, **kwargs)
+
+    return _stub
+
+
+@contextlib.contextmanager
+def cached_completions(
+    cache: Optional[LLMResponseCache],
+    stub: Optional[Callable[..., Any]] = None,
+    outer: Optional[Wrapper] = None,
+    inner: Optional[Wrapper] = None
+) -> Iterator[Optional[LLMResponseCache]]:
+    """Route ``litellm.completion``/``acompletion`` through ``cache`` (and/or ``stub``) for the block.
+
+    ``outer`` wraps every call, cache hits included; ``inner`` only wraps calls
+    that reach the model. Both are applied to a synchronous and to an async
+    chain, and get an async function to wrap for the latter. The chain applies
+    to calls made from the block's context, including the tasks it submits to
+    Opik's evaluation executor and callables wrapped with `in_scope`; calls from
+    other scopes or unrelated code get their own chain or the original function.
+    """
+    global _patch_depth, _original_completion, _original_acompletion, _original_executor_submit
+    if cache is None and stub is None and outer is None and inner is None:
+        yield None
+        return
+
+    try:
+        import litellm
+    except ImportError:
+        yield cache
+        return
+
+    executor = _evaluation_executor()
+    with _patch_lock:
+        if _patch_depth == 0:
+            if litellm.completion is not _dispatch_completion:
+                _original_completion = litellm.completion
+            if litellm.acompletion is not _dispatch_acompletion:
+                _original_acompletion = litellm.acompletion
+            litellm.completion = _dispatch_completion
+            litellm.acompletion = _dispatch_acompletion
+            if executor is not None:
+                _original_executor_submit = executor.submit
+                executor.submit = _submit_in_scope
+        _patch_depth += 1
+    route = (
+        _build_route(cache, outer, inner, stub or _call_original),
+        _build_route(cache, outer, inner, _async_stub(stub) if stub else _acall_original)
+    )
+    token = _ROUTE.set(route)
+    try:
+        yield cache
+    finally:
+        _ROUTE.reset(token)
+        with _patch_lock:
+            _patch_depth -= 1
+            if _patch_depth == 0:
+                litellm.completion = _original_completion
+                litellm.acompletion = _original_acompletion
+                if executor is not None:
+                    executor.submit = _original_executor_submit
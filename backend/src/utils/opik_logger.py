@@ -3,17 +3,205 @@ Comprehensive Opik Logger for Tenax Agent
 Ensures EVERY agent action is traced with behavioral metrics
 """
 
-from opik import track, Opik
+from opik import id_helpers, track
 from datetime import datetime
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
 import os
+import sys
+import traceback
+
+from opik_clients import get_client
+from opik_spool import TraceSpool
+from opik_trace_sink import TraceSink
 
 PROJECT_NAME = os.getenv("OPIK_PROJECT_NAME", "Tenax")
 WORKSPACE_NAME = os.getenv("OPIK_WORKSPACE", "Tenax")
-client = Opik(project_name=PROJECT_NAME, workspace=WORKSPACE_NAME)
 
 AGENT_VERSION = "v1.0"
 
-@track(name="morning_summary_generated", project_name=PROJECT_NAME)
+
+# Buffered tracing returns to the caller as soon as the trace is queued and
+# ships batches in the background. Set OPIK_TRACE_BUFFERED=false to fall back
+# to synchronous @track tracing.
+TRACE_BUFFERED = os.getenv("OPIK_TRACE_BUFFERED", "true").lower() != "false"
+# Buffered traces are written to an on-disk spool before shipping so a slow or
+# unavailable Opik backend never blocks (or loses) logging.
+TRACE_SPOOL_ENABLED = os.getenv("OPIK_TRACE_SPOOL", "true").lower() != "false"
+TRACE_SPOOL_DIR = os.getenv(
+    "OPIK_TRACE_SPOOL_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "logs", "opik_spool")
+)
+# Seconds to wait for Opik to store a shipped batch before retrying it.
+TRACE_SHIP_TIMEOUT = int(os.getenv("OPIK_TRACE_SHIP_TIMEOUT", "30"))
+_trace_sink = None
+_trace_spool = None
+_RECORDED_AT = contextvars.ContextVar("opik_trace_recorded_at", default=None)
+# Traces the sink refused: written straight to the spool, or lost without one.
+_overflow = {"spooled": 0, "lost": 0}
+
+
+def _get_client():
+    """Return the shared Opik client, created on first use so importing this module stays cheap."""
+    return get_client(PROJECT_NAME, WORKSPACE_NAME)
+
+
+def _trace_payload(value):
+    """JSON-safe trace input/output; the REST schema takes objects, lists or strings."""
+    if value is None or isinstance(value, str):
+        return value
+    value = json.loads(json.dumps(value, default=str))
+    return value if isinstance(value, (dict, list)) else {"output": value}
+
+
+def _trace_time(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.astimezone()  # naive stamps are local time
+    return value
+
+
+def _ship_traces(batch):
+    """Write ``batch`` to Opik with one synchronous REST call.
+
+    ``client.trace`` only enqueues, and ``client.flush`` reports success even
+    when its background sender failed, so neither proves delivery. The REST
+    ``traces`` batch create returns once the backend stored the traces and
+    raises otherwise, which keeps the records in the spool for a retry. Traces
+    carry a stable id, so a retried batch updates rather than duplicates what
+    already arrived.
+    """
+    from opik.rest_api.types.trace_write import TraceWrite
+
+    traces = []
+    for trace in batch:
+        fields = dict(trace)
+        for key in ("start_time", "end_time"):
+            if fields.get(key) is not None:
+                fields[key] = _trace_time(fields[key])
+        for key in ("input", "output", "metadata"):
+            if key in fields:
+                fields[key] = _trace_payload(fields[key])
+        traces.append(TraceWrite(**fields))
+    _get_client().rest_client.traces.create_traces(
+        traces=traces,
+        request_options={"timeout_in_seconds": TRACE_SHIP_TIMEOUT}
+    )
+
+
+def _get_trace_spool():
+    global _trace_spool
+    if _trace_spool is None and TRACE_SPOOL_ENABLED:
+        _trace_spool = TraceSpool(TRACE_SPOOL_DIR, _ship_traces)
+    return _trace_spool
+
+
+def _get_trace_sink():
+    global _trace_sink
+    if _trace_sink is None:
+        spool = _get_trace_spool()
+        _trace_sink = TraceSink(spool.append if spool is not None else _ship_traces)
+    return _trace_sink
+
+
+@contextlib.contextmanager
+def recorded_at(at):
+    """Stamp traces logged inside the block with ``at`` (an ISO time) instead of now.
+
+    Used when replaying the bridge's fallback log, so replayed traces keep the
+    time the event actually happened.
+    """
+    try:
+        stamp = datetime.fromisoformat(at) if isinstance(at, str) else None
+    except ValueError:
+        stamp = None
+    token = _RECORDED_AT.set(stamp)
+    try:
+        yield
+    finally:
+        _RECORDED_AT.reset(token)
+
+
+def _submit_trace(trace):
+    """Queue ``trace``; if the sink is full or closed, write it to the spool directly."""
+    if _get_trace_sink().submit(trace):
+        return
+    spool = _get_trace_spool()
+    if spool is not None:
+        try:
+            spool.append([trace])
+            _overflow["spooled"] += 1
+            return
+        except OSError as exc:
+            sys.stderr.write(f"[opik] trace spool append failed: {exc}\n")
+    _overflow["lost"] += 1
+    sys.stderr.write(f"[opik] dropped trace {trace.get('name')}: trace queue is full or closed\n")
+
+
+def _traced(name):
+    """Trace the decorated logger through the buffered sink (or @track when disabled)."""
+    if not TRACE_BUFFERED:
+        return track(name=name, project_name=PROJECT_NAME)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stamp = _RECORDED_AT.get()
+            trace = {
+                "id": id_helpers.generate_id(),
+                "name": name,
+                "project_name": PROJECT_NAME,
+                "input": dict(signature.bind_partial(*args, **kwargs).arguments),
+                "start_time": stamp or datetime.now()
+            }
+            try:
+                result = func(*args, **kwargs)
+            except Exception as exc:
+                # Failed calls are traced too (as @track does), then re-raised.
+                trace["error_info"] = {
+                    "exception_type": type(exc).__name__,
+                    "message": str(exc),
+                    "traceback": traceback.format_exc()
+                }
+                trace["end_time"] = stamp or datetime.now()
+                _submit_trace(trace)
+                raise
+            trace["output"] = result
+            trace["end_time"] = stamp or datetime.now()
+            _submit_trace(trace)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def trace_sink_stats():
+    """Report queue depth and drop/ship counters for the buffered trace sink."""
+    if _trace_sink is None:
+        stats = {"buffered": TRACE_BUFFERED, "queue_depth": 0, "submitted": 0, "dropped": 0}
+    else:
+        stats = {"buffered": TRACE_BUFFERED, **_trace_sink.stats()}
+    stats["overflow"] = dict(_overflow)
+    if _trace_spool is not None:
+        stats["spool"] = _trace_spool.stats()
+    return stats
+
+
+def flush_traces(timeout=5.0):
+    """Block until queued traces are shipped (or ``timeout`` seconds pass)."""
+    flushed = _trace_sink.flush(timeout) if _trace_sink is not None else True
+    if _trace_spool is not None:
+        flushed = _trace_spool.drain(timeout) and flushed
+    return {"flushed": flushed}
+
+@_traced("morning_summary_generated")
 def log_morning_summary(user_id, task_count, summary, tokens_used):
     """Log morning summary generation with full context"""
     return {
@@ -25,7 +213,7 @@ def log_morning_summary(user_id, task_count, summary, tokens_used):
         "timestamp": datetime.now().isoformat()
     }
 
-@track(name="morning_summary_dispatched", project_name=PROJECT_NAME)
+@_traced("morning_summary_dispatched")
 def log_morning_summary_dispatch(user_id, task_count, message_preview):
     """Log the sending of morning summaries via WhatsApp."""
     return {
@@ -36,7 +224,7 @@ def log_morning_summary_dispatch(user_id, task_count, message_preview):
         "dispatched_at": datetime.now().isoformat()
     }
 
-@track(name="reminder_sent", project_name=PROJECT_NAME)
+@_traced("reminder_sent")
 def log_reminder_sent(user_id, task_id, task_title, reminder_type, message):
     """Log reminder with tracking for effectiveness measurement"""
     return {
@@ -51,7 +239,7 @@ def log_reminder_sent(user_id, task_id, task_title, reminder_type, message):
     }
 
 
-@track(name="reminder_generated", project_name=PROJECT_NAME)
+@_traced("reminder_generated")
 def log_reminder_generated(user_id, task_id, task_title, reminder_type, message_preview):
     """Trace reminder content creation before delivery."""
     return {
@@ -64,7 +252,7 @@ def log_reminder_generated(user_id, task_id, task_title, reminder_type, message_
         "generated_at": datetime.now().isoformat()
     }
 
-@track(name="task_completed", project_name=PROJECT_NAME)
+@_traced("task_completed")
 def log_task_completion(user_id, task_id, task_title, completed_via, reminder_was_sent, latency_minutes=None):
     """
     Log task completion with behavioral metrics
@@ -81,7 +269,7 @@ def log_task_completion(user_id, task_id, task_title, completed_via, reminder_wa
         "completed_at": datetime.now().isoformat()
     }
 
-@track(name="intent_parsed", project_name=PROJECT_NAME)
+@_traced("intent_parsed")
 def log_intent_parsing(user_id, message, intent, confidence, slots, channel=None):
     """Log WhatsApp intent parsing for accuracy tracking"""
     return {
@@ -96,7 +284,7 @@ def log_intent_parsing(user_id, message, intent, confidence, slots, channel=None
     }
 
 
-@track(name="completion_stats_calculated", project_name=PROJECT_NAME)
+@_traced("completion_stats_calculated")
 def log_completion_stats(user_id, total, completed, pending, completion_rate):
     """Capture daily completion stats for dashboards."""
     return {
@@ -109,7 +297,7 @@ def log_completion_stats(user_id, total, completed, pending, completion_rate):
         "calculated_at": datetime.now().isoformat()
     }
 
-@track(name="eod_summary_draft", project_name=PROJECT_NAME)
+@_traced("eod_summary_draft")
 def log_eod_summary_draft(user_id, tone, completion_rate, message_preview):
     """Trace EOD draft content before messaging."""
     return {
@@ -121,7 +309,7 @@ def log_eod_summary_draft(user_id, tone, completion_rate, message_preview):
         "drafted_at": datetime.now().isoformat()
     }
 
-@track(name="eod_summary_sent", project_name=PROJECT_NAME)
+@_traced("eod_summary_sent")
 def log_eod_summary(user_id, completed, total, completion_rate, tone, message):
     """Log end-of-day summary with performance metrics"""
     return {
@@ -135,7 +323,7 @@ def log_eod_summary(user_id, completed, total, completion_rate, tone, message):
         "sent_at": datetime.now().isoformat()
     }
 
-@track(name="agent_effectiveness_calculated", project_name=PROJECT_NAME)
+@_traced("agent_effectiveness_calculated")
 def log_agent_effectiveness(user_id, period, metrics):
     """
     Log overall agent effectiveness
@@ -166,7 +354,7 @@ def calculate_reminder_effectiveness(reminders_sent, tasks_completed_after_remin
     effectiveness = (tasks_completed_after_reminder / reminders_sent) * 100
     
     # Log to Opik
-    client.log_metric("reminder_effectiveness", {
+    _get_client().log_metric("reminder_effectiveness", {
         "value": effectiveness,
         "reminders_sent": reminders_sent,
         "completed_after_reminder": tasks_completed_after_reminder,
@@ -176,7 +364,7 @@ def calculate_reminder_effectiveness(reminders_sent, tasks_completed_after_remin
     return {"value": effectiveness}
 
 
-@track(name="llm_call", project_name=PROJECT_NAME)
+@_traced("llm_call")
 def log_llm_call(action, model, success, tokens_used, latency_ms, attempt, prompt_preview,
                  user_id=None, error_message=None, metadata=None):
     """Trace every LLM invocation to tie model quality back to behavior."""
@@ -197,7 +385,7 @@ def log_llm_call(action, model, success, tokens_used, latency_ms, attempt, promp
 
 def log_experiment_variant(user_id, experiment_id, variant, outcome):
     """Log A/B test variant and outcome"""
-    client.log_metric("experiment_result", {
+    _get_client().log_metric("experiment_result", {
         "user_id": user_id,
         "experiment_id": experiment_id,
         "variant": variant,
@@ -207,7 +395,7 @@ def log_experiment_variant(user_id, experiment_id, variant, outcome):
     })
 
 
-@track(name="daily_plan", project_name=PROJECT_NAME)
+@_traced("daily_plan")
 def log_daily_plan_trace(input_context, output, metadata):
     """Generic trace for daily plan generation with structured context."""
     return {
@@ -218,7 +406,7 @@ def log_daily_plan_trace(input_context, output, metadata):
     }
 
 
-@track(name="reminder", project_name=PROJECT_NAME)
+@_traced("reminder")
 def log_reminder_trace(input_context, output, metadata):
     """Generic trace for reminder messages so LLM-as-judge can score tone."""
     return {
@@ -229,7 +417,7 @@ def log_reminder_trace(input_context, output, metadata):
     }
 
 
-@track(name="eod_summary", project_name=PROJECT_NAME)
+@_traced("eod_summary")
 def log_eod_summary_trace(input_context, output, metadata):
     """Generic trace for end-of-day summaries."""
     return {
@@ -239,7 +427,7 @@ def log_eod_summary_trace(input_context, output, metadata):
         "logged_at": datetime.now().isoformat()
     }
 
-@track(name="conversation", project_name=PROJECT_NAME)
+@_traced("conversation")
 def log_conversation_trace(input_context, output, metadata):
     """Generic trace for chat/intent responses."""
     return {
@@ -267,5 +455,7 @@ __all__ = [
     'log_daily_plan_trace',
     'log_reminder_trace',
     'log_eod_summary_trace',
-    'log_conversation_trace'
+    'log_conversation_trace',
+    'trace_sink_stats',
+    'flush_traces'
 ]
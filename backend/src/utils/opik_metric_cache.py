@@ -0,0 +1,136 @@
+"""Memo cache for metric evaluations shared across optimizer trials and runs.
+
+GEPA generations and HRPO trials re-score many identical outputs. `MetricMemo`
+remembers each score under a blake2b digest of ``(metric name, dataset item,
+output text)`` in a bounded in-memory LRU. When a ``path`` is configured the
+scores are also written to a small SQLite file, so later runner processes start
+warm. Disk writes are batched and committed every ``COMMIT_EVERY`` new scores
+and at exit; the file is trimmed to ``max_disk_entries`` when it is opened.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_MAX_DISK_ENTRIES = 1000000
+COMMIT_EVERY = 256
+
+
+def memo_key(metric_name: str, item_key: str, output: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (metric_name, item_key, output):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class MetricMemo:
+    """Bounded LRU of metric scores with optional SQLite persistence."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[str] = None,
+        max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES
+    ):
+        self.max_entries = max_entries
+        self.path = os.path.abspath(path) if path else None
+        self.max_disk_entries = max_disk_entries
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._pending: List[Tuple[str, str, float]] = []
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._owner_pid: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        if self.path:
+            atexit.register(self.flush)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._db is None or self._owner_pid != os.getpid():
+            # SQLite connections must not be reused across fork.
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS metric_memo ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)'
+            )
+            # Trim the oldest scores once per connection rather than on every commit.
+            with self._db:
+                self._db.execute(
+                    'DELETE FROM metric_memo WHERE key IN ('
+                    'SELECT key FROM metric_memo ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                    (self.max_disk_entries,)
+                )
+            self._owner_pid = os.getpid()
+            self._pending = []
+        return self._db
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return ``(found, value)`` for ``key``."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+
+            db = self._connection()
+            row = db.execute('SELECT value FROM metric_memo WHERE key = ?', (key,)).fetchone() if db else None
+            if row is None:
+                self.misses += 1
+                return False, None
+
+            value = json.loads(row[0])
+            self._remember(key, value)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self._connection() is None:
+                return
+            self._pending.append((key, json.dumps(value, default=str), time.time()))
+            if len(self._pending) >= COMMIT_EVERY:
+                self._commit_locked()
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _commit_locked(self) -> None:
+        if not self._pending or self._db is None or self._owner_pid != os.getpid():
+            return
+        with self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO metric_memo (key, value, created) VALUES (?, ?, ?)',
+                self._pending
+            )
+        self._pending = []
+
+    def flush(self) -> None:
+        with self._lock:
+            try:
+                self._commit_locked()
+            except sqlite3.Error:  # pragma: no cover - persistence is best effort
+                self._pending = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'path': self.path
+        }
@@ -5,36 +5,67 @@ import os
 import sys
 import io
 import contextlib
-from difflib import SequenceMatcher
-from typing import Any, Callable, Dict, List, Optional
+import functools
+import itertools
+import mmap
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from opik_budget import BudgetExhausted, RunBudget, evaluating, mark_candidate
+from opik_checkpoint import JobCheckpoint
+from opik_clients import get_client
+from opik_concurrency import ConcurrencyController, resolve_settings
+from opik_dataset_cache import DatasetCache, content_digest
+from opik_llm_cache import LLMResponseCache, cached_completions, in_scope, load_stub_completion, routed_completion
+from opik_metric_cache import DEFAULT_MAX_ENTRIES, MetricMemo, memo_key
+from opik_progress import ProgressReporter, current_reporter
+from opik_racing import DEFAULT_DELTA, DEFAULT_GROWTH, DEFAULT_INITIAL_ITEMS, DEFAULT_SAMPLE_FRACTION, race
+from opik_reference_index import ReferenceIndex
+from opik_scoring import rank_candidates, score_matrix, score_pair
+from opik_similarity import scorer_name_for
 
 _OPTIMIZER_IMPORT_ERROR = None
 
-try:
-    from opik_optimizer import (
-        GepaOptimizer,
-        HierarchicalReflectiveOptimizer,
-        FewShotBayesianOptimizer,
-        ChatPrompt
-    )
+# The optimizer stack (GEPA, HRPO, FewShot and their reporting modules) is heavy,
+# so it is imported by `_load_optimizer_stack` only when an optimizer entry point
+# actually runs. Dataset fetches and metric snapshots never pay for it.
+GEPAOptimizer = HRPOptimizer = FewShotOptimizer = ChatPrompt = None
+ScoreResult = None
+MetricValue = None
+_opik_reporting = None
+_hrpo_reporting = None
+_gepa_reporting = None
+_fewshot_reporting = None
+OPTIMIZER_AVAILABLE = None
+
+
+def _load_optimizer_stack() -> bool:
+    global GEPAOptimizer, HRPOptimizer, FewShotOptimizer, ChatPrompt, ScoreResult, MetricValue
+    global _opik_reporting, _hrpo_reporting, _gepa_reporting, _fewshot_reporting
+    global OPTIMIZER_AVAILABLE, _OPTIMIZER_IMPORT_ERROR
+
+    if OPTIMIZER_AVAILABLE is not None:
+        return OPTIMIZER_AVAILABLE
+
+    try:
+        from opik_optimizer import (
+            GepaOptimizer,
+            HierarchicalReflectiveOptimizer,
+            FewShotBayesianOptimizer,
+            ChatPrompt as _ChatPrompt
+        )
+    except ImportError as exc:  # pragma: no cover - environment setup issue
+        OPTIMIZER_AVAILABLE = False
+        _OPTIMIZER_IMPORT_ERROR = exc
+        return OPTIMIZER_AVAILABLE
 
     HRPOptimizer = HierarchicalReflectiveOptimizer
     GEPAOptimizer = GepaOptimizer
     FewShotOptimizer = FewShotBayesianOptimizer
+    ChatPrompt = _ChatPrompt
     OPTIMIZER_AVAILABLE = True
-except ImportError as exc:  # pragma: no cover - environment setup issue
-    GEPAOptimizer = HRPOptimizer = FewShotOptimizer = ChatPrompt = None
-    _opik_reporting = None
-    _hrpo_reporting = None
-    _gepa_reporting = None
-    _fewshot_reporting = None
-    OPTIMIZER_AVAILABLE = False
-    _OPTIMIZER_IMPORT_ERROR = exc
-else:
-    _opik_reporting = None
-    _hrpo_reporting = None
-    _gepa_reporting = None
-    _fewshot_reporting = None
 
     try:
         from opik_optimizer import reporting_utils as _opik_reporting
@@ -56,18 +87,49 @@ else:
     except ImportError:
         _fewshot_reporting = None
 
-try:
-    from opik_optimizer.core.score_result import ScoreResult
-except ImportError:
-    ScoreResult = None
-try:
-    from opik_optimizer.metrics.metric_value import MetricValue
-except ImportError:
-    MetricValue = None
+    try:
+        from opik_optimizer.core.score_result import ScoreResult
+    except ImportError:
+        ScoreResult = None
+    try:
+        from opik_optimizer.metrics.metric_value import MetricValue
+    except ImportError:
+        MetricValue = None
+
+    return OPTIMIZER_AVAILABLE
 
 
 MOCK_MODE = os.environ.get('OPIK_OPTIMIZER_MOCK_MODE', 'true').lower() != 'false'
 
+DATASET_CACHE_ENABLED = os.environ.get('OPIK_DATASET_CACHE', 'true').lower() != 'false'
+DATASET_CACHE_DIR = os.environ.get(
+    'OPIK_DATASET_CACHE_DIR',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'opik_dataset_cache')
+)
+_dataset_cache: Optional[DatasetCache] = None
+
+METRIC_CACHE_ENABLED = os.environ.get('OPIK_METRIC_CACHE', 'true').lower() != 'false'
+_metric_memo: Optional[MetricMemo] = None
+
+# Default for the per-job ``llm_cache`` switch of the real-mode optimizer runs.
+LLM_CACHE_ENABLED = os.environ.get('OPIK_LLM_CACHE', 'true').lower() != 'false'
+LLM_CACHE_PATH = os.environ.get(
+    'OPIK_LLM_CACHE_PATH',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'opik_llm_cache.sqlite')
+)
+_llm_cache: Optional[LLMResponseCache] = None
+
+# Model calls of real-mode runs go through one process-wide controller, so
+# concurrent jobs against the same model share its rate limit and window.
+CONCURRENCY_ENABLED = os.environ.get('OPIK_OPTIMIZER_CONCURRENCY', 'true').lower() != 'false'
+_concurrency = ConcurrencyController()
+
+# Real-mode runs submitted with a ``job_id`` persist their progress here.
+CHECKPOINT_DIR = os.environ.get(
+    'OPIK_OPTIMIZER_CHECKPOINT_DIR',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'opik_checkpoints')
+)
+
 _DEFAULT_FEWSHOT_PROMPT = (
     'You are Tenax\'s structured-output generator. For each incoming `input` JSON payload, return the '
     'JSON object Tenax should emit to downstream agents. Preserve keys such as `message_preview`, '
@@ -143,12 +205,52 @@ def _capture_stdout():
             print(captured, file=sys.stderr)
 
 
-def _build_opik_client():
+def _get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(LLM_CACHE_PATH)
+    return _llm_cache
+
+
+@contextlib.contextmanager
+def _llm_cache_scope(
+    enabled: Optional[bool] = None,
+    budget: Optional[RunBudget] = None,
+    concurrency: Optional[ConcurrencyController] = None
+):
+    """Serve repeated model calls of one optimizer run from the response cache.
+
+    With a ``budget``, every model call is also checked against (and charged to)
+    it; with ``concurrency``, calls that miss the cache are rate limited.
+    """
+    use_cache = LLM_CACHE_ENABLED if enabled is None else bool(enabled)
+    cache = _get_llm_cache() if use_cache else None
+    stub = load_stub_completion(os.environ.get('OPIK_LLM_STUB_COMPLETION'))
+    report: Dict[str, Any] = {'enabled': cache is not None}
+    before = cache.stats() if cache is not None else None
+    inner = None
+    if budget is not None and concurrency is not None:
+        inner = lambda completion: budget.meter(concurrency.wrap(completion))
+    elif budget is not None:
+        inner = budget.meter
+    elif concurrency is not None:
+        inner = concurrency.wrap
     try:
-        from opik import Opik
-    except ImportError as exc:  # pragma: no cover - runtime dependency issue
-        raise RuntimeError('opik SDK is required for optimizer dataset ingestion') from exc
+        with cached_completions(
+            cache,
+            stub,
+            outer=budget.guard if budget is not None else None,
+            inner=inner
+        ):
+            yield report
+    finally:
+        if cache is not None:
+            after = cache.stats()
+            report['hits'] = after['hits'] - before['hits']
+            report['misses'] = after['misses'] - before['misses']
+
 
+def _build_opik_client():
     project_name = os.environ.get('OPIK_PROJECT_NAME')
     workspace = os.environ.get('OPIK_WORKSPACE')
     api_key = os.environ.get('OPIK_API_KEY')
@@ -157,7 +259,10 @@ def _build_opik_client():
     if not api_key:
         raise RuntimeError('Missing OPIK_API_KEY for remote dataset loading')
 
-    return Opik(project_name=project_name, workspace=workspace, api_key=api_key, host=host)
+    try:
+        return get_client(project_name, workspace, host, api_key=api_key)
+    except ImportError as exc:  # pragma: no cover - runtime dependency issue
+        raise RuntimeError('opik SDK is required for optimizer dataset ingestion') from exc
 
 
 def _load_opik_dataset(dataset_identifier: str):
@@ -220,10 +325,140 @@ def fetch_opik_metrics_snapshot(
     }
 
 
-def _load_remote_entries(dataset_identifier: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+def _get_dataset_cache() -> Optional[DatasetCache]:
+    global _dataset_cache
+    if _dataset_cache is None and DATASET_CACHE_ENABLED:
+        _dataset_cache = DatasetCache(DATASET_CACHE_DIR)
+    return _dataset_cache
+
+
+def _dataset_fingerprint(dataset_obj: Any) -> Optional[str]:
+    """Cheap version stamp of a remote dataset, used to revalidate cached items."""
+    parts = []
+    for attr in ('id', 'dataset_items_count', 'total_items', 'last_updated_at', 'updated_at', 'version'):
+        value = getattr(dataset_obj, attr, None)
+        if value is not None and not callable(value):
+            parts.append(f'{attr}={value}')
+    # A bare id says nothing about the items, so it cannot validate a cache entry.
+    if not parts or (len(parts) == 1 and parts[0].startswith('id=')):
+        return None
+    return ';'.join(parts)
+
+
+# Dataset identifier -> (items, content digest) handed to this process by `run_optimizer_suite`.
+_PRELOADED_DATASETS: Dict[str, Tuple[List[Dict[str, Any]], Optional[str]]] = {}
+
+
+class _DatasetItems:
+    """Items of one Opik dataset, fetched once and shared for the whole run.
+
+    `_load_materialized_dataset` installs ``get_items`` and the SDK's streaming
+    accessor on the dataset instance itself, so the optimizer (which requires a
+    real ``opik.Dataset``), ``_dataset_length`` and few-shot example resolution
+    are all served from a single in-memory list loaded through the dataset cache.
+    """
+
+    def __init__(self, dataset_identifier: str, dataset_obj: Any):
+        self._identifier = dataset_identifier
+        self._download = dataset_obj.get_items
+        self._fingerprint = lambda: _dataset_fingerprint(dataset_obj)
+        self._items: Optional[List[Dict[str, Any]]] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._items is not None
+
+    @property
+    def version(self) -> str:
+        """Content digest of the items, as named by the dataset cache."""
+        items = self.load()
+        if self._version is None:
+            self._version = content_digest(items)
+        return self._version
+
+    def preload(self, items: List[Dict[str, Any]], version: Optional[str] = None) -> None:
+        """Use ``items`` (already fetched elsewhere) instead of downloading them."""
+        with self._lock:
+            self._items = list(items)
+            self._version = version
+            _REFERENCE_INDEX.add(self._items)
+
+    def load(self) -> List[Dict[str, Any]]:
+        if self._items is None:
+            with self._lock:
+                if self._items is None:
+                    cache = _get_dataset_cache()
+                    if cache is None:
+                        items = self._download()
+                    else:
+                        items = cache.fetch(self._identifier, None, self._download, self._fingerprint)
+                        entry = cache.lookup(self._identifier)
+                        if entry is not None and entry.get('count') == len(items or []):
+                            self._version = entry.get('digest')
+                    self._items = list(items or [])
+                    _REFERENCE_INDEX.add(self._items)
+        return self._items
+
+    def get_items(self, nb_samples: Optional[int] = None) -> List[Dict[str, Any]]:
+        items = self.load()
+        return items[:nb_samples] if nb_samples else list(items)
+
+    def stream(
+        self,
+        nb_samples: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        dataset_item_ids: Optional[List[str]] = None
+    ) -> Iterator[Any]:
+        from opik.api_objects.dataset.dataset_item import DatasetItem
+
+        wanted = set(dataset_item_ids) if dataset_item_ids else None
+        yielded = 0
+        for item in self.load():
+            if nb_samples is not None and yielded >= nb_samples:
+                break
+            if wanted is not None and item.get('id') not in wanted:
+                continue
+            yield DatasetItem(**item)
+            yielded += 1
+
+
+def _dataset_items(dataset_obj: Any) -> Optional[_DatasetItems]:
+    return getattr(dataset_obj, '_opik_items', None)
+
+
+def _load_materialized_dataset(dataset_identifier: str) -> Any:
     dataset = _load_opik_dataset(dataset_identifier)
+    items = _DatasetItems(dataset_identifier, dataset)
+    preloaded = _PRELOADED_DATASETS.get(dataset_identifier)
+    if preloaded is not None:
+        items.preload(*preloaded)
+    # Shadow the SDK accessors on this instance only; the object stays an
+    # ``opik.Dataset`` for the optimizer's input validation.
+    dataset._opik_items = items
+    dataset.get_items = items.get_items
+    setattr(dataset, '__internal_api__stream_items_as_dataclasses__', items.stream)
+    return dataset
+
+
+def _load_remote_entries(dataset_identifier: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
     nb_samples = limit if isinstance(limit, int) and limit > 0 else None
-    items = dataset.get_items(nb_samples)
+    dataset_ref: Dict[str, Any] = {}
+
+    def _dataset():
+        if 'dataset' not in dataset_ref:
+            dataset_ref['dataset'] = _load_opik_dataset(dataset_identifier)
+        return dataset_ref['dataset']
+
+    def _download() -> List[Dict[str, Any]]:
+        return _dataset().get_items(nb_samples)
+
+    cache = _get_dataset_cache()
+    if cache is None:
+        items = _download()
+    else:
+        items = cache.fetch(dataset_identifier, nb_samples, _download, lambda: _dataset_fingerprint(_dataset()))
 
     if not items:
         raise RuntimeError(f'Opik dataset "{dataset_identifier}" returned no items')
@@ -232,7 +467,7 @@ def _load_remote_entries(dataset_identifier: str, limit: Optional[int] = None) -
 
 
 def _ensure_optimizer_installed():
-    if not OPTIMIZER_AVAILABLE:
+    if not _load_optimizer_stack():
         detail = f" Import error: {_OPTIMIZER_IMPORT_ERROR}" if _OPTIMIZER_IMPORT_ERROR else ""
         raise RuntimeError(
             'Missing dependency: opik-optimizer is not installed. '
@@ -241,18 +476,111 @@ def _ensure_optimizer_installed():
     _ensure_reporting_patch()
 
 
-def _load_json_file(dataset_path: str) -> Any:
-    with open(dataset_path, 'r', encoding='utf-8') as handle:
-        if dataset_path.endswith('.jsonl'):
-            return [json.loads(line) for line in handle if line.strip()]
-        return json.load(handle)
+def _iter_jsonl_lines(dataset_path: str) -> Iterator[bytes]:
+    """Yield the raw non-blank lines of a JSONL file by scanning a memory map."""
+    with open(dataset_path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            start = 0
+            while start < size:
+                end = mapped.find(b'\n', start)
+                if end == -1:
+                    end = size
+                line = mapped[start:end]
+                start = end + 1
+                if line.strip():
+                    yield line
+
+
+def _iter_json_entries(dataset_path: str) -> Iterator[Any]:
+    """Yield entries from a ``.json`` list (or ``{"entries": [...]}``) file."""
+    try:
+        import ijson  # optional: stream large JSON arrays instead of loading them whole
+    except ImportError:
+        ijson = None
+
+    if ijson is None:
+        with open(dataset_path, 'r', encoding='utf-8') as handle:
+            data = json.load(handle)
+        if isinstance(data, dict) and 'entries' in data:
+            data = data['entries']
+        if not isinstance(data, list):
+            raise ValueError('Loaded dataset must be a list of entries')
+        yield from data
+        return
+
+    with open(dataset_path, 'rb') as handle:
+        first = b''
+        while first in (b'', b' ', b'\n', b'\r', b'\t'):
+            first = handle.read(1)
+            if not first:
+                return
+        handle.seek(0)
+        if first == b'[':
+            prefix = 'item'
+        elif first == b'{':
+            prefix = 'entries.item'
+        else:
+            raise ValueError('Loaded dataset must be a list of entries')
+        yield from ijson.items(handle, prefix, use_float=True)
+
+
+def _reservoir_sample(rng: random.Random, limit: int, stream: Iterator[Any]) -> List[Any]:
+    """Uniformly sample ``limit`` items from ``stream`` in one pass (reservoir, Algorithm R)."""
+    reservoir: List[Any] = []
+    for seen, item in enumerate(stream):
+        if seen < limit:
+            reservoir.append(item)
+            continue
+        slot = rng.randint(0, seen)
+        if slot < limit:
+            reservoir[slot] = item
+    return reservoir
+
+
+def _load_local_entries(
+    dataset_path: str,
+    limit: Optional[int] = None,
+    sample: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Load at most ``limit`` entries from a local JSON/JSONL dataset.
+
+    JSONL files are scanned through a memory map and only the selected lines
+    are decoded, so memory stays proportional to ``limit`` rather than file
+    size. ``sample='reservoir'`` picks a uniform random subset (seeded by
+    OPIK_OPTIMIZER_SEED) instead of the first ``limit`` entries; the default
+    comes from OPIK_DATASET_SAMPLE.
+    """
+    nb_samples = limit if isinstance(limit, int) and limit > 0 else None
+    if dataset_path.endswith('.jsonl'):
+        raw = _iter_jsonl_lines(dataset_path)
+        decode = json.loads
+    else:
+        raw = _iter_json_entries(dataset_path)
+        decode = None
+
+    strategy = (sample or os.environ.get('OPIK_DATASET_SAMPLE') or 'head').lower()
+    if nb_samples is None:
+        selected = list(raw)
+    elif strategy == 'reservoir':
+        rng = random.Random(int(os.environ.get('OPIK_OPTIMIZER_SEED', '42')))
+        selected = _reservoir_sample(rng, nb_samples, raw)
+    elif strategy == 'head':
+        selected = list(itertools.islice(raw, nb_samples))
+    else:
+        raise ValueError(f'Unknown dataset_sample "{sample}"; use "head" or "reservoir"')
+
+    return [decode(line) for line in selected] if decode else selected
 
 
 def _resolve_dataset(
     dataset_path: Optional[str] = None,
     dataset_entries: Optional[List[Dict[str, Any]]] = None,
     dataset_identifier: Optional[str] = None,
-    dataset_limit: Optional[int] = None
+    dataset_limit: Optional[int] = None,
+    dataset_sample: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     if dataset_entries is not None:
         if not isinstance(dataset_entries, list):
@@ -269,14 +597,7 @@ def _resolve_dataset(
     if not os.path.exists(resolved_path):
         raise FileNotFoundError(f'Dataset file not found at {resolved_path}')
 
-    data = _load_json_file(resolved_path)
-    if isinstance(data, dict) and 'entries' in data:
-        data = data['entries']
-
-    if not isinstance(data, list):
-        raise ValueError('Loaded dataset must be a list of entries')
-
-    return data
+    return _load_local_entries(resolved_path, dataset_limit, dataset_sample)
 
 
 def _resolve_project_name() -> str:
@@ -318,43 +639,98 @@ def _extract_expected_text(dataset_item: Dict[str, Any]) -> str:
     return ''
 
 
+# Parsed expected text / feedback scores per dataset item, shared by all metrics.
+_REFERENCE_INDEX = ReferenceIndex(_extract_expected_text)
+
+
 def _feedback_metric(metric_name: str) -> Callable[..., Any]:
     def _metric(dataset_item: Dict[str, Any], llm_output: str, **_kwargs: Any) -> Any:
-        scores = dataset_item.get('feedback_scores') or []
-        for score in scores:
-            if not isinstance(score, dict):
-                continue
-            if score.get('name') == metric_name:
-                try:
-                    value = float(score.get('value') or 0)
-                except (TypeError, ValueError):
-                    value = 0.0
-                # Normalize common 1-5 rubric to 0-1
-                normalized = max(0.0, min(1.0, value / 5.0 if value > 1 else value))
-                reason = score.get('reason') or f'Auto reason for {metric_name}'
-                if ScoreResult is not None:
-                    return ScoreResult(name=metric_name, value=normalized, reason=reason)
-                return normalized
-        return 0.0
+        prepared = _REFERENCE_INDEX.get(dataset_item)
+        value = prepared.feedback_scores.get(metric_name)
+        if value is None:
+            return 0.0
+        # Normalize common 1-5 rubric to 0-1
+        normalized = max(0.0, min(1.0, value / 5.0 if value > 1 else value))
+        reason = prepared.feedback_reasons.get(metric_name) or f'Auto reason for {metric_name}'
+        if ScoreResult is not None:
+            return ScoreResult(name=metric_name, value=normalized, reason=reason)
+        return normalized
 
     _metric.__name__ = metric_name
     return _metric
 
 
 def _lexical_similarity_metric(metric_name: str) -> Callable[..., float]:
+    method = scorer_name_for(metric_name)
+
     def _metric(dataset_item: Dict[str, Any], llm_output: str, **_kwargs: Any) -> float:
-        reference = _extract_expected_text(dataset_item)
+        reference = _REFERENCE_INDEX.get(dataset_item)
         candidate = llm_output or ''
-        if not reference or not candidate:
+        if not reference.text or not candidate:
             return 0.0
-        ratio = SequenceMatcher(None, reference.lower(), candidate.lower()).ratio()
+        ratio = score_pair(candidate, reference, method)
         return max(0.0, min(1.0, float(ratio)))
 
     _metric.__name__ = metric_name or 'lexical_similarity'
     return _metric
 
 
+def _get_metric_memo() -> Optional[MetricMemo]:
+    global _metric_memo
+    if _metric_memo is None and METRIC_CACHE_ENABLED:
+        _metric_memo = MetricMemo(
+            max_entries=int(os.environ.get('OPIK_METRIC_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+            path=os.environ.get('OPIK_METRIC_CACHE_PATH') or None
+        )
+    return _metric_memo
+
+
+def _memoized_metric(metric_fn: Callable[..., Any]) -> Callable[..., Any]:
+    memo = _get_metric_memo()
+    if memo is None:
+        return metric_fn
+    metric_name = metric_fn.__name__
+
+    @functools.wraps(metric_fn)
+    def _metric(dataset_item: Dict[str, Any], llm_output: str, **kwargs: Any) -> Any:
+        key = memo_key(metric_name, _REFERENCE_INDEX.get(dataset_item).digest, llm_output or '')
+        found, cached = memo.get(key)
+        if found:
+            if isinstance(cached, dict):
+                if ScoreResult is not None:
+                    return ScoreResult(name=metric_name, value=cached['value'], reason=cached.get('reason'))
+                return cached['value']
+            return cached
+
+        result = metric_fn(dataset_item, llm_output, **kwargs)
+        if hasattr(result, 'value'):
+            memo.put(key, {'value': result.value, 'reason': getattr(result, 'reason', None)})
+        elif isinstance(result, (int, float)):
+            memo.put(key, result)
+        return result
+
+    return _metric
+
+
+def _metric_cache_counters() -> Dict[str, int]:
+    memo = _get_metric_memo()
+    return {'hits': memo.hits, 'misses': memo.misses} if memo is not None else {'hits': 0, 'misses': 0}
+
+
+def _metric_cache_report(before: Dict[str, int]) -> Dict[str, Any]:
+    after = _metric_cache_counters()
+    return {
+        'enabled': _get_metric_memo() is not None,
+        'hits': after['hits'] - before['hits'],
+        'misses': after['misses'] - before['misses']
+    }
+
+
 def _resolve_metric(metric_name: Optional[str]) -> Callable[..., float]:
+    return _memoized_metric(_build_metric(metric_name))
+
+
+def _build_metric(metric_name: Optional[str]) -> Callable[..., float]:
     if not metric_name:
         return _lexical_similarity_metric('lexical_similarity')
 
@@ -377,15 +753,70 @@ def _resolve_metric(metric_name: Optional[str]) -> Callable[..., float]:
     return _lexical_similarity_metric(normalized)
 
 
-def _dataset_length(dataset_obj: Any) -> int:
+def score_candidate_outputs(
+    candidate_outputs: List[str],
+    dataset_path: Optional[str] = None,
+    dataset_identifier: Optional[str] = None,
+    dataset_limit: Optional[int] = None,
+    metric: str = 'cosine',
+    length_penalty: float = 0.0,
+    dataset_entries: Optional[List[Dict[str, Any]]] = None,
+    dataset_sample: Optional[str] = None,
+    include_matrix: bool = False
+) -> Dict[str, Any]:
+    """Score every candidate output against every dataset reference in one batch."""
+
+    if not candidate_outputs:
+        raise ValueError('candidate_outputs must contain at least one string')
+
+    dataset = _resolve_dataset(
+        dataset_path=dataset_path,
+        dataset_entries=dataset_entries,
+        dataset_identifier=dataset_identifier,
+        dataset_limit=dataset_limit,
+        dataset_sample=dataset_sample
+    )
+    references = [reference for reference in _REFERENCE_INDEX.add(dataset) if reference.text]
+    if not references:
+        raise ValueError('Dataset has no reference outputs to score against')
+
+    matrix = score_matrix(
+        [text or '' for text in candidate_outputs],
+        references,
+        scorer_name_for(metric),
+        length_penalty=length_penalty
+    )
+    ranking = rank_candidates(matrix)
+    response = {
+        'metric': metric,
+        'candidates': len(candidate_outputs),
+        'references': len(references),
+        'ranking': [{'index': idx, 'mean_score': round(score, 6)} for idx, score in ranking]
+    }
+    if include_matrix:
+        response['scores'] = matrix.tolist() if hasattr(matrix, 'tolist') else matrix
+    return response
+
+
+def _dataset_length(dataset_obj: Any, dataset_identifier: Optional[str] = None) -> int:
     if dataset_obj is None:
         return 0
 
+    items = _dataset_items(dataset_obj)
+    if items is not None and items.loaded:
+        return len(items.load())
+
     for attr in ('dataset_items_count', 'total_items', 'count'):
         value = getattr(dataset_obj, attr, None)
         if isinstance(value, int) and value >= 0:
             return value
 
+    cache = _get_dataset_cache()
+    if cache is not None and dataset_identifier:
+        cached_count = cache.count(dataset_identifier)
+        if cached_count is not None:
+            return cached_count
+
     try:
         preview = dataset_obj.get_items(1)
         if isinstance(preview, list):
@@ -478,6 +909,106 @@ def _mock_fewshot_selection(example_pool: List[Dict[str, Any]], num_shots: int,
     }
 
 
+def _configure_concurrency(
+    model: str,
+    options: Optional[Dict[str, Any]],
+    initial_in_flight: int,
+    job: Optional[Hashable] = None
+) -> int:
+    """Register a job's ``concurrency`` options with ``model``'s limiter; returns the worker thread count.
+
+    The limiter is shared by every job on the model and enforces the strictest
+    registered settings, so the caller unregisters ``job`` when it finishes.
+    """
+    settings = resolve_settings(options)
+    if settings['initial_in_flight'] is None:
+        settings['initial_in_flight'] = min(initial_in_flight, settings['max_in_flight'])
+    if not CONCURRENCY_ENABLED:
+        return initial_in_flight
+    _concurrency.limiter(model, settings, job=job)
+    return settings['max_in_flight']
+
+
+def _concurrency_report(model: str) -> Optional[Dict[str, Any]]:
+    return _concurrency.stats().get(model) if CONCURRENCY_ENABLED else None
+
+
+def _racing_enabled(racing: Optional[bool]) -> bool:
+    if racing is not None:
+        return bool(racing)
+    return os.environ.get('OPIK_OPTIMIZER_RACING', 'false').lower() == 'true'
+
+
+def _item_field(item: Dict[str, Any], dotted_path: str) -> Any:
+    value: Any = item
+    for part in dotted_path.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value if isinstance(value, (str, int, float, bool)) or value is None else json.dumps(value, sort_keys=True)
+
+
+def _complete_prompt(prompt_text: str, dataset_item: Dict[str, Any], model: str) -> str:
+    # Same route as the optimizer's own calls: cache, budget and rate limiter.
+    user_input = dataset_item.get('input', dataset_item)
+    if not isinstance(user_input, str):
+        user_input = json.dumps(user_input, default=str)
+    response = routed_completion(
+        model=model,
+        messages=[{'role': 'system', 'content': prompt_text}, {'role': 'user', 'content': user_input}],
+        temperature=0
+    )
+    choice = response['choices'][0]
+    message = choice['message'] if isinstance(choice, dict) else choice.message
+    content = message['content'] if isinstance(message, dict) else message.content
+    return content or ''
+
+
+def _screen_seed_prompts(
+    prompts: List[str],
+    items: List[Dict[str, Any]],
+    model: str,
+    metric_fn: Callable[..., Any],
+    options: Optional[Dict[str, Any]] = None,
+    seed: Optional[int] = None,
+    workers: int = 6
+) -> Dict[str, Any]:
+    """Race the seed ``prompts`` on growing stratified subsets and keep the contenders.
+
+    This only screens the prompts GEPA starts from; the candidates GEPA
+    generates afterwards are evaluated in full. The report therefore counts
+    what the screening cost and how many seeds it dropped, not evaluations
+    saved across the run, which depend on how GEPA uses its population.
+    """
+    options = dict(options or {})
+    stratify_by = options.pop('stratify_by', None)
+
+    def _evaluate(candidate: int, dataset_item: Dict[str, Any]) -> float:
+        output = _complete_prompt(prompts[candidate], dataset_item, model)
+        with evaluating(prompts[candidate]):
+            score = metric_fn(dataset_item, output)
+        return float(getattr(score, 'value', score) or 0.0)
+
+    report = race(
+        len(prompts),
+        items,
+        # The race's pool threads must call the model through this run's scope.
+        in_scope(_evaluate),
+        initial_items=int(options.get('initial_items', DEFAULT_INITIAL_ITEMS)),
+        growth=float(options.get('growth', DEFAULT_GROWTH)),
+        delta=float(options.get('delta', DEFAULT_DELTA)),
+        min_survivors=int(options.get('min_survivors', 1)),
+        halve=bool(options.get('halve', False)),
+        stratify=(lambda item: _item_field(item, stratify_by)) if stratify_by else None,
+        seed=seed if seed is not None else _optimizer_seed(24),
+        workers=int(options.get('workers', workers)),
+        sample_fraction=float(options.get('sample_fraction', DEFAULT_SAMPLE_FRACTION))
+    )
+    for key in ('followup_evaluations', 'exhaustive_evaluations', 'evaluations_saved'):
+        report.pop(key, None)
+    report['means'] = [round(mean, 6) for mean in report['means']]
+    report['seeds_dropped'] = len(prompts) - len(report['survivors'])
+    return report
+
+
 def _serialize_optimizer_result(result: Any) -> Dict[str, Any]:
     if result is None:
         return {'status': 'ok'}
@@ -503,6 +1034,177 @@ def _serialize_optimizer_result(result: Any) -> Dict[str, Any]:
     return summary
 
 
+def _optimizer_seed(default: int) -> int:
+    return int(os.environ.get('OPIK_OPTIMIZER_SEED', str(default)))
+
+
+def _open_checkpoint(
+    job_id: Optional[str],
+    function: str,
+    params: Dict[str, Any],
+    dataset_obj: Any,
+    default_seed: int
+) -> Optional[JobCheckpoint]:
+    if not job_id:
+        return None
+    return JobCheckpoint.open(
+        CHECKPOINT_DIR,
+        str(job_id),
+        function,
+        params,
+        _dataset_version(dataset_obj),
+        _optimizer_seed(default_seed)
+    )
+
+
+def _dataset_version(dataset_obj: Any) -> str:
+    items = _dataset_items(dataset_obj)
+    return items.version if items is not None else content_digest(dataset_obj.get_items())
+
+
+def _replay_checkpoint(checkpoint: JobCheckpoint) -> Dict[str, Any]:
+    response = dict(checkpoint.state['response'])
+    response['checkpoint'] = dict(checkpoint.summary(), replayed=True)
+    return response
+
+
+_candidate_agent_class = None
+
+
+def _candidate_text(prompts: Dict[str, Any]) -> Optional[str]:
+    prompt = next(iter(prompts.values()), None) if isinstance(prompts, dict) else prompts
+    system = getattr(prompt, 'system', None)
+    if system is None and hasattr(prompt, 'get_messages'):
+        system = next((m.get('content') for m in prompt.get_messages() if m.get('role') == 'system'), None)
+    return system if isinstance(system, str) else None
+
+
+def _candidate_agent() -> Any:
+    """An optimizer agent that names the candidate prompt of every evaluation it runs.
+
+    The optimizers pass each candidate they score to the agent, so the metric
+    call that follows is attributed to it (see `opik_budget.mark_candidate`).
+    """
+    global _candidate_agent_class
+    if _candidate_agent_class is None:
+        from opik_optimizer.agents import LiteLLMAgent
+
+        class _CandidateAgent(LiteLLMAgent):
+            def invoke_agent(self, prompts, dataset_item, *args, **kwargs):
+                mark_candidate(_candidate_text(prompts))
+                return super().invoke_agent(prompts, dataset_item, *args, **kwargs)
+
+            def invoke_agent_candidates(self, prompts, dataset_item, *args, **kwargs):
+                mark_candidate(_candidate_text(prompts))
+                return super().invoke_agent_candidates(prompts, dataset_item, *args, **kwargs)
+
+        _candidate_agent_class = _CandidateAgent
+    return _candidate_agent_class(project_name=_resolve_project_name())
+
+
+class _RunControl:
+    """Budget, checkpoint and progress reporting of one real-mode optimizer run.
+
+    The progress listener is captured when the run starts, so events from the
+    optimizer's worker threads still reach the request that started it.
+    """
+
+    def __init__(
+        self,
+        function: str,
+        budget: Optional[Dict[str, Any]] = None,
+        checkpoint: Optional[JobCheckpoint] = None,
+        job_id: Optional[str] = None
+    ):
+        self.checkpoint = checkpoint
+        self.limited_model: Optional[str] = None
+        self.progress: Optional[ProgressReporter] = current_reporter(function, job_id)
+        self.budget = RunBudget.from_options(budget)
+        if self.budget is None and (checkpoint is not None or self.progress is not None):
+            # Checkpoints and progress events need candidate scores even without limits.
+            self.budget = RunBudget()
+        if checkpoint is not None:
+            # ``budget.carry_spend`` makes a resumed job's earlier spend count against its caps.
+            checkpoint.attach(self.budget, carry_spend=bool((budget or {}).get('carry_spend')))
+        if self.progress is not None:
+            self.progress.attach(self.budget)
+
+    def track(self, metric_fn: Callable[..., Any]) -> Callable[..., Any]:
+        return self.budget.track_metric(metric_fn) if self.budget is not None else metric_fn
+
+    def limit_concurrency(self, model: str, options: Optional[Dict[str, Any]], initial_in_flight: int) -> int:
+        """Apply this run's ``concurrency`` options to ``model`` until the run ends."""
+        self.limited_model = model
+        return _configure_concurrency(model, options, initial_in_flight, job=self)
+
+    def release_concurrency(self) -> None:
+        if self.limited_model is not None and CONCURRENCY_ENABLED:
+            _concurrency.unregister(self.limited_model, self)
+        self.limited_model = None
+
+    def agent(self) -> Any:
+        """The agent to run candidates with; ``None`` keeps the optimizer's default."""
+        return _candidate_agent() if self.budget is not None else None
+
+    def failed(self, error: BaseException) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint.finish({}, self.budget, 'failed')
+        if self.progress is not None:
+            self.progress.fail(error)
+
+    def finish(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        response = _apply_budget(response, self.budget)
+        if self.checkpoint is not None:
+            # A spent budget leaves the job resumable rather than done.
+            status = 'interrupted' if response.get('budget_exhausted') else 'completed'
+            self.checkpoint.finish(response, self.budget, status)
+            response['checkpoint'] = self.checkpoint.summary()
+        if self.progress is not None:
+            self.progress.finish(response)
+        return response
+
+
+def _run_optimizer(
+    run: Callable[[], Any],
+    llm_cache: Optional[bool],
+    control: _RunControl
+) -> Tuple[Any, Dict[str, Any]]:
+    """Run ``run()`` under the response cache and budget; a spent budget yields ``None``.
+
+    Checkpointed jobs use the response cache unless it is explicitly disabled,
+    since that is what makes a resumed run replay finished trials for free.
+    """
+    if control.checkpoint is not None and llm_cache is None:
+        llm_cache = True
+    result = None
+    concurrency = _concurrency if CONCURRENCY_ENABLED else None
+    with _llm_cache_scope(llm_cache, control.budget, concurrency) as llm_cache_report:
+        try:
+            with _capture_stdout():
+                result = run()
+        except BudgetExhausted as exc:
+            sys.stderr.write(f'[opik] {exc}; returning the best candidate so far\n')
+        except Exception as exc:
+            control.failed(exc)
+            raise
+        finally:
+            control.release_concurrency()
+    return result, llm_cache_report
+
+
+def _apply_budget(response: Dict[str, Any], budget: Optional[RunBudget]) -> Dict[str, Any]:
+    if budget is None:
+        return response
+    report = budget.report()
+    response['budget_exhausted'] = report['budget_exhausted']
+    response['budget'] = report
+    best = report['best_so_far']
+    if report['budget_exhausted'] and best is not None:
+        response['result']['best_candidate'] = best['prompt']
+        response['result']['best_score'] = best['score']
+    return response
+
+
 def run_hrpo_optimization(
     prompt: str,
     dataset_path: Optional[str] = None,
@@ -512,19 +1214,26 @@ def run_hrpo_optimization(
     model: str = 'gpt-4o-mini',
     num_trials: int = 5,
     metadata: Optional[Dict[str, Any]] = None,
-    dataset_entries: Optional[List[Dict[str, Any]]] = None
+    dataset_entries: Optional[List[Dict[str, Any]]] = None,
+    dataset_sample: Optional[str] = None,
+    llm_cache: Optional[bool] = None,
+    budget: Optional[Dict[str, Any]] = None,
+    job_id: Optional[str] = None,
+    concurrency: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """Run a hierarchical reflective optimization job for reminder prompts."""
 
     _ensure_optimizer_installed()
     metric_fn = _resolve_metric(metric)
+    metric_cache_before = _metric_cache_counters()
 
     if MOCK_MODE:
         dataset = _resolve_dataset(
             dataset_path=dataset_path,
             dataset_entries=dataset_entries,
             dataset_identifier=dataset_identifier,
-            dataset_limit=dataset_limit
+            dataset_limit=dataset_limit,
+            dataset_sample=dataset_sample
         )
         return _mock_hrpo_result(prompt, dataset, metric, num_trials)
 
@@ -532,33 +1241,52 @@ def run_hrpo_optimization(
     if not identifier:
         raise RuntimeError('Real HRPO runs require an Opik dataset identifier; set `dataset_identifier` or OPIK_REMINDER_DATASET_ID.')
 
-    dataset_obj = _load_opik_dataset(identifier)
+    dataset_obj = _load_materialized_dataset(identifier)
+    checkpoint = _open_checkpoint(job_id, 'run_hrpo_optimization', {
+        'prompt': prompt,
+        'dataset_identifier': identifier,
+        'dataset_limit': dataset_limit,
+        'metric': metric,
+        'model': model,
+        'num_trials': num_trials
+    }, dataset_obj, 42)
+    if checkpoint is not None and checkpoint.completed:
+        return _replay_checkpoint(checkpoint)
+
+    prompt_obj = _build_chat_prompt(prompt, 'Tenax-Reminder-Baseline', model)
+    control = _RunControl('run_hrpo_optimization', budget, checkpoint, job_id)
     optimizer = HRPOptimizer(
         model=model,
-        n_threads=8,
+        n_threads=control.limit_concurrency(model, concurrency, 8),
         verbose=0,
-        seed=int(os.environ.get('OPIK_OPTIMIZER_SEED', '42')),
+        seed=checkpoint.seed if checkpoint is not None else _optimizer_seed(42),
         name='TenaxReminderHRPO'
     )
+    metric_fn = control.track(metric_fn)
 
-    prompt_obj = _build_chat_prompt(prompt, 'Tenax-Reminder-Baseline', model)
-
-    with _capture_stdout():
-        result = optimizer.optimize_prompt(
+    result, llm_cache_report = _run_optimizer(
+        lambda: optimizer.optimize_prompt(
             prompt=prompt_obj,
             dataset=dataset_obj,
             metric=metric_fn,
+            agent=control.agent(),
             n_samples=dataset_limit,
             max_trials=num_trials,
             project_name=_resolve_project_name(),
             experiment_config=metadata or {}
-        )
+        ),
+        llm_cache,
+        control
+    )
 
-    return {
+    return control.finish({
         'mode': 'hrpo',
-        'dataset_size': _dataset_length(dataset_obj),
-        'result': _serialize_optimizer_result(result)
-    }
+        'dataset_size': _dataset_length(dataset_obj, identifier),
+        'result': _serialize_optimizer_result(result),
+        'metric_cache': _metric_cache_report(metric_cache_before),
+        'llm_cache': llm_cache_report,
+        'concurrency': _concurrency_report(model)
+    })
 
 
 def run_gepa_optimization(
@@ -570,22 +1298,35 @@ def run_gepa_optimization(
     model: str = 'gpt-4o-mini',
     generations: int = 3,
     population_size: int = 6,
-    dataset_entries: Optional[List[Dict[str, Any]]] = None
+    dataset_entries: Optional[List[Dict[str, Any]]] = None,
+    dataset_sample: Optional[str] = None,
+    llm_cache: Optional[bool] = None,
+    racing: Optional[bool] = None,
+    racing_options: Optional[Dict[str, Any]] = None,
+    budget: Optional[Dict[str, Any]] = None,
+    job_id: Optional[str] = None,
+    concurrency: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
-    """Run the evolutionary GEPA optimizer across prompt variants."""
+    """Run the evolutionary GEPA optimizer across prompt variants.
+
+    With ``racing`` on, the initial prompts are raced first and only the
+    survivors seed GEPA (see ``_screen_seed_prompts``).
+    """
 
     _ensure_optimizer_installed()
     if not initial_prompts:
         raise ValueError('initial_prompts must contain at least one prompt string')
 
     metric_fn = _resolve_metric(metric)
+    metric_cache_before = _metric_cache_counters()
 
     if MOCK_MODE:
         dataset = _resolve_dataset(
             dataset_path=dataset_path,
             dataset_entries=dataset_entries,
             dataset_identifier=dataset_identifier,
-            dataset_limit=dataset_limit
+            dataset_limit=dataset_limit,
+            dataset_sample=dataset_sample
         )
         return _mock_gepa_result(initial_prompts, dataset, metric)
 
@@ -593,39 +1334,86 @@ def run_gepa_optimization(
     if not identifier:
         raise RuntimeError('Real GEPA runs require an Opik dataset identifier; set `dataset_identifier` or OPIK_TONE_DATASET_ID.')
 
-    dataset_obj = _load_opik_dataset(identifier)
+    dataset_obj = _load_materialized_dataset(identifier)
+    checkpoint = _open_checkpoint(job_id, 'run_gepa_optimization', {
+        'initial_prompts': initial_prompts,
+        'dataset_identifier': identifier,
+        'dataset_limit': dataset_limit,
+        'metric': metric,
+        'model': model,
+        'generations': generations,
+        'population_size': population_size
+    }, dataset_obj, 24)
+    if checkpoint is not None and checkpoint.completed:
+        return _replay_checkpoint(checkpoint)
+
+    seed = checkpoint.seed if checkpoint is not None else _optimizer_seed(24)
+    control = _RunControl('run_gepa_optimization', budget, checkpoint, job_id)
+    n_threads = control.limit_concurrency(model, concurrency, 6)
     optimizer = GEPAOptimizer(
         model=model,
-        n_threads=6,
+        n_threads=n_threads,
         verbose=0,
-        seed=int(os.environ.get('OPIK_OPTIMIZER_SEED', '24')),
+        seed=seed,
         name='TenaxToneGEPA'
     )
 
-    prompt_variants = [
-        _build_chat_prompt(text, f'Tenax-Tone-Variant-{idx + 1}', model)
-        for idx, text in enumerate(initial_prompts)
-    ]
-    base_prompt = prompt_variants[0]
-    extra_prompts = prompt_variants[1:]
-
-    with _capture_stdout():
-        result = optimizer.optimize_prompt(
-            prompt=base_prompt,
+    metric_fn = control.track(metric_fn)
+    screening: Dict[str, Any] = {}
+    if checkpoint is not None:
+        # Checkpoints written before the rename stored the report as ``racing``.
+        saved_screening = checkpoint.state.get('seed_screening') or checkpoint.state.get('racing')
+        if saved_screening:
+            screening['report'] = saved_screening
+
+    def _run() -> Any:
+        variant_indices = list(range(len(initial_prompts)))
+        if 'report' in screening:
+            variant_indices = screening['report']['survivors']
+        elif _racing_enabled(racing) and len(initial_prompts) > 1:
+            screening['report'] = _screen_seed_prompts(
+                initial_prompts, dataset_obj.get_items(dataset_limit), model, metric_fn, racing_options, seed, n_threads
+            )
+            variant_indices = screening['report']['survivors']
+            if checkpoint is not None:
+                checkpoint.update(seed_screening=screening['report'])
+            if control.progress is not None:
+                control.progress.emit(
+                    'seed_screening',
+                    survivors=[initial_prompts[idx] for idx in variant_indices],
+                    seeds_dropped=screening['report']['seeds_dropped'],
+                    screening_evaluations=screening['report']['evaluations']
+                )
+
+        prompt_variants = [
+            _build_chat_prompt(initial_prompts[idx], f'Tenax-Tone-Variant-{idx + 1}', model)
+            for idx in variant_indices
+        ]
+        return optimizer.optimize_prompt(
+            prompt=prompt_variants[0],
             dataset=dataset_obj,
             metric=metric_fn,
+            agent=control.agent(),
             generations=generations,
             population_size=population_size,
-            extra_prompts=extra_prompts,
+            extra_prompts=prompt_variants[1:],
             n_samples=dataset_limit,
             project_name=_resolve_project_name()
         )
 
-    return {
+    result, llm_cache_report = _run_optimizer(_run, llm_cache, control)
+
+    response = {
         'mode': 'gepa',
-        'dataset_size': _dataset_length(dataset_obj),
-        'result': _serialize_optimizer_result(result)
+        'dataset_size': _dataset_length(dataset_obj, identifier),
+        'result': _serialize_optimizer_result(result),
+        'metric_cache': _metric_cache_report(metric_cache_before),
+        'llm_cache': llm_cache_report,
+        'concurrency': _concurrency_report(model)
     }
+    if 'report' in screening:
+        response['seed_screening'] = screening['report']
+    return control.finish(response)
 
 
 def run_fewshot_selection(
@@ -636,12 +1424,18 @@ def run_fewshot_selection(
     metric: str = 'levenshtein_distance',
     model: str = 'gpt-4o-mini',
     num_shots: int = 5,
-    task: str = 'intent_parsing'
+    task: str = 'intent_parsing',
+    dataset_sample: Optional[str] = None,
+    llm_cache: Optional[bool] = None,
+    budget: Optional[Dict[str, Any]] = None,
+    job_id: Optional[str] = None,
+    concurrency: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """Select the best few-shot examples for the NLU parser."""
 
     _ensure_optimizer_installed()
     metric_fn = _resolve_metric(metric)
+    metric_cache_before = _metric_cache_counters()
 
     if MOCK_MODE:
         pool = example_pool
@@ -649,7 +1443,8 @@ def run_fewshot_selection(
             pool = _resolve_dataset(
                 dataset_path=dataset_path,
                 dataset_identifier=dataset_identifier,
-                dataset_limit=dataset_limit
+                dataset_limit=dataset_limit,
+                dataset_sample=dataset_sample
             )
         if not pool:
             raise ValueError('example_pool must be a non-empty list')
@@ -662,7 +1457,18 @@ def run_fewshot_selection(
     if not identifier:
         raise RuntimeError('Real few-shot selection requires an Opik dataset identifier; set `dataset_identifier` or OPIK_INTENT_DATASET_ID in the environment.')
 
-    dataset_obj = _load_opik_dataset(identifier)
+    dataset_obj = _load_materialized_dataset(identifier)
+    checkpoint = _open_checkpoint(job_id, 'run_fewshot_selection', {
+        'dataset_identifier': identifier,
+        'dataset_limit': dataset_limit,
+        'metric': metric,
+        'model': model,
+        'num_shots': num_shots,
+        'task': task
+    }, dataset_obj, 33)
+    if checkpoint is not None and checkpoint.completed:
+        return _replay_checkpoint(checkpoint)
+
     prompt_text = _resolve_fewshot_prompt(task)
     prompt_label = f'Tenax-{(task or "fewshot").replace("_", " ").title()}-FewShot'
     prompt_obj = _build_chat_prompt(prompt_text, prompt_label, model)
@@ -673,23 +1479,30 @@ def run_fewshot_selection(
         target = max(1, num_shots)
         min_examples = max_examples = target
 
+    control = _RunControl('run_fewshot_selection', budget, checkpoint, job_id)
     optimizer = FewShotOptimizer(
         model=model,
         min_examples=min_examples,
         max_examples=max_examples,
+        n_threads=control.limit_concurrency(model, concurrency, 8),
         verbose=0,
-        seed=int(os.environ.get('OPIK_OPTIMIZER_SEED', '33'))
+        seed=checkpoint.seed if checkpoint is not None else _optimizer_seed(33)
     )
+    metric_fn = control.track(metric_fn)
 
-    with _capture_stdout():
-        result = optimizer.optimize_prompt(
+    result, llm_cache_report = _run_optimizer(
+        lambda: optimizer.optimize_prompt(
             prompt=prompt_obj,
             dataset=dataset_obj,
             metric=metric_fn,
+            agent=control.agent(),
             n_samples=dataset_limit,
             max_trials=max(4, max_examples * 2),
             project_name=_resolve_project_name()
-        )
+        ),
+        llm_cache,
+        control
+    )
 
     summary = _serialize_optimizer_result(result)
     example_indices = []
@@ -700,22 +1513,194 @@ def run_fewshot_selection(
 
     if example_indices:
         try:
-            dataset_items = dataset_obj.get_items()
-            selected_examples = [
-                dataset_items[idx]
-                for idx in example_indices
-                if 0 <= idx < len(dataset_items)
-            ]
+            pool = dataset_obj.get_items()
+            selected_examples = [pool[idx] for idx in example_indices if 0 <= idx < len(pool)]
             if selected_examples:
                 summary['best_examples'] = selected_examples
                 summary['selected_example_indices'] = example_indices
         except Exception:
             pass
 
-    return {
+    return control.finish({
         'mode': 'fewshot',
-        'pool_size': _dataset_length(dataset_obj),
-        'result': summary
+        'pool_size': _dataset_length(dataset_obj, identifier),
+        'result': summary,
+        'metric_cache': _metric_cache_report(metric_cache_before),
+        'llm_cache': llm_cache_report,
+        'concurrency': _concurrency_report(model)
+    })
+
+
+_SUITE_OPTIMIZERS = {
+    'hrpo': ('run_hrpo_optimization', 'OPIK_REMINDER_DATASET_ID'),
+    'gepa': ('run_gepa_optimization', 'OPIK_TONE_DATASET_ID'),
+    'fewshot': ('run_fewshot_selection', 'OPIK_INTENT_DATASET_ID')
+}
+_SUITE_DATASET_FIELDS = ('dataset_path', 'dataset_identifier', 'dataset_limit', 'dataset_sample', 'dataset_entries')
+SUITE_START_METHOD = os.environ.get('OPIK_OPTIMIZER_SUITE_START_METHOD', 'spawn')
+
+
+def _suite_job(index: int, spec: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(spec, dict):
+        raise ValueError('Each suite spec must be a JSON object')
+    params = dict(spec)
+    optimizer = params.pop('optimizer', None)
+    if optimizer not in _SUITE_OPTIMIZERS:
+        raise ValueError(f'Suite spec {index} needs "optimizer" set to one of {sorted(_SUITE_OPTIMIZERS)}')
+    name = params.pop('name', None) or f'{optimizer}-{index + 1}'
+    function_name, dataset_env = _SUITE_OPTIMIZERS[optimizer]
+
+    if params.get('dataset_entries') is not None or params.get('example_pool') is not None:
+        dataset_key = None  # inline data is already in memory
+    elif MOCK_MODE:
+        dataset_key = json.dumps([
+            os.path.abspath(params['dataset_path']) if params.get('dataset_path') else None,
+            params.get('dataset_identifier'),
+            params.get('dataset_limit'),
+            params.get('dataset_sample')
+        ])
+    else:
+        identifier = params.get('dataset_identifier') or os.environ.get(dataset_env)
+        if not identifier:
+            raise RuntimeError(f'Suite job "{name}" needs `dataset_identifier` or {dataset_env}.')
+        params['dataset_identifier'] = identifier
+        dataset_key = json.dumps(['remote', identifier])
+    return {'name': name, 'optimizer': optimizer, 'function': function_name, 'params': params, 'dataset': dataset_key}
+
+
+def _load_suite_dataset(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if MOCK_MODE:
+        return _resolve_dataset(
+            dataset_path=params.get('dataset_path'),
+            dataset_identifier=params.get('dataset_identifier'),
+            dataset_limit=params.get('dataset_limit'),
+            dataset_sample=params.get('dataset_sample')
+        )
+    # Real runs apply ``dataset_limit`` themselves, so the full dataset is shared.
+    return _load_materialized_dataset(params['dataset_identifier']).get_items()
+
+
+def _suite_worker_init() -> None:
+    # Worker output must never reach the runner's result channel on fd 1.
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), 1)
+    sys.stdout = sys.stderr
+
+
+def _run_suite_job(
+    function_name: str,
+    params: Dict[str, Any],
+    shared: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    params = dict(params)
+    if shared is not None:
+        from opik_shared_dataset import read_shared
+
+        items = read_shared(shared)
+        if MOCK_MODE:
+            for field in _SUITE_DATASET_FIELDS:
+                params.pop(field, None)
+            params['example_pool' if function_name == 'run_fewshot_selection' else 'dataset_entries'] = items
+        else:
+            _PRELOADED_DATASETS[params['dataset_identifier']] = (items, shared.get('digest'))
+    response = globals()[function_name](**params)
+    return {'result': response, 'elapsed_seconds': round(time.perf_counter() - started, 3)}
+
+
+def run_optimizer_suite(
+    specs: List[Dict[str, Any]],
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """Run several optimizer jobs concurrently, loading each distinct dataset once.
+
+    Each spec names an ``optimizer`` (``hrpo``, ``gepa`` or ``fewshot``), an
+    optional ``name`` and the keyword arguments of that optimizer's entry
+    point. Datasets are loaded in this process, published through shared
+    memory and decoded by the worker processes; one job failing does not stop
+    the others. Progress listeners receive a ``job_finished`` event per job.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import multiprocessing
+
+    from opik_shared_dataset import SharedDatasets
+
+    if not specs:
+        raise ValueError('specs must contain at least one optimizer spec')
+    _ensure_optimizer_installed()
+    jobs = [_suite_job(index, spec) for index, spec in enumerate(specs)]
+    progress = current_reporter('run_optimizer_suite')
+    started = time.perf_counter()
+
+    with SharedDatasets() as shared:
+        handles: Dict[str, Dict[str, Any]] = {}
+        load_errors: Dict[str, str] = {}
+        dataset_report = []
+        for job in jobs:
+            key = job['dataset']
+            if key is None or key in handles or key in load_errors:
+                continue
+            load_started = time.perf_counter()
+            try:
+                handles[key] = shared.publish(_load_suite_dataset(job['params']))
+            except Exception as exc:
+                load_errors[key] = f'Dataset load failed: {exc}'
+                continue
+            dataset_report.append({
+                'dataset': json.loads(key),
+                'items': handles[key]['items'],
+                'bytes': handles[key]['size'],
+                'load_seconds': round(time.perf_counter() - load_started, 3)
+            })
+
+        # Jobs whose dataset failed to load keep this error report.
+        reports: List[Dict[str, Any]] = [
+            {'name': job['name'], 'optimizer': job['optimizer'], 'status': 'error', 'error': load_errors.get(job['dataset'])}
+            for job in jobs
+        ]
+        workers = max(1, min(len(jobs), max_workers or os.cpu_count() or 1))
+        if progress is not None:
+            progress.emit('started', jobs=len(jobs), workers=workers)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(SUITE_START_METHOD),
+            initializer=_suite_worker_init
+        ) as pool:
+            futures = {
+                pool.submit(_run_suite_job, job['function'], job['params'], handles.get(job['dataset'])): index
+                for index, job in enumerate(jobs)
+                if job['dataset'] not in load_errors
+            }
+            for future in as_completed(futures):
+                job = jobs[futures[future]]
+                report = {'name': job['name'], 'optimizer': job['optimizer']}
+                try:
+                    outcome = future.result()
+                except Exception as exc:
+                    report.update(status='error', error=str(exc))
+                else:
+                    report.update(status='ok', elapsed_seconds=outcome['elapsed_seconds'], result=outcome['result'])
+                reports[futures[future]] = report
+                if progress is not None:
+                    progress.emit(
+                        'job_finished',
+                        name=job['name'],
+                        status=report['status'],
+                        job_elapsed_seconds=report.get('elapsed_seconds')
+                    )
+
+    elapsed = time.perf_counter() - started
+    if progress is not None:
+        progress.emit('finished')
+    job_seconds = sum(report.get('elapsed_seconds', 0.0) for report in reports)
+    return {
+        'mode': 'suite',
+        'jobs': reports,
+        'datasets': dataset_report,
+        'workers': workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'job_seconds': round(job_seconds, 3),
+        'failed': sum(1 for report in reports if report['status'] != 'ok')
     }
 
 
@@ -723,5 +1708,7 @@ __all__ = [
     'run_hrpo_optimization',
     'run_gepa_optimization',
     'run_fewshot_selection',
-    'fetch_opik_dataset_entries'
+    'run_optimizer_suite',
+    'fetch_opik_dataset_entries',
+    'score_candidate_outputs'
 ]
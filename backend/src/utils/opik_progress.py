@@ -0,0 +1,156 @@
+"""Structured progress events for long optimizer runs.
+
+The runner opts a request in by installing a listener with `progress_scope`;
+the listener is stored in a context variable, so only code running in that
+request's context sees it. Optimizer entry points call `current_reporter` once
+at the start of a run: the returned `ProgressReporter` captures the listener,
+which keeps working from the optimizer's worker threads (they do not inherit
+the caller's context).
+
+The reporter hooks into the run's `RunBudget` and emits plain dicts:
+
+* ``started`` when the run begins,
+* ``trial_started`` the first time a candidate prompt is scored and
+  ``trial_finished`` (with its mean score) when the next candidate starts,
+* ``progress`` heartbeats at most every ``OPIK_OPTIMIZER_PROGRESS_INTERVAL``
+  seconds while scores come in,
+* ``seed_screening`` once racing has picked which seed prompts the optimizer
+  starts from,
+* ``finished`` (or ``failed``) at the end.
+
+Every event carries the elapsed time, evaluations so far, model calls, tokens,
+the current best candidate and ``seconds_since_improvement``, which is enough
+for a job runner to spot stalled runs and stop them.
+"""
+
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from opik_budget import RunBudget
+
+Listener = Callable[[Dict[str, Any]], None]
+
+DEFAULT_INTERVAL_SECONDS = 1.0
+
+_LISTENER: 'contextvars.ContextVar[Optional[Listener]]' = contextvars.ContextVar(
+    'opik_progress_listener', default=None
+)
+
+
+def _env_number(key: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+@contextlib.contextmanager
+def progress_scope(listener: Optional[Listener]) -> Iterator[None]:
+    """Deliver progress events of runs started inside the block to ``listener``."""
+    token = _LISTENER.set(listener)
+    try:
+        yield
+    finally:
+        _LISTENER.reset(token)
+
+
+def current_reporter(function: str, job_id: Optional[str] = None) -> Optional['ProgressReporter']:
+    listener = _LISTENER.get()
+    if listener is None:
+        return None
+    return ProgressReporter(listener, function, job_id)
+
+
+class ProgressReporter:
+    """Turns a run's budget bookkeeping into progress events."""
+
+    def __init__(
+        self,
+        listener: Listener,
+        function: str,
+        job_id: Optional[str] = None,
+        interval_seconds: Optional[float] = None
+    ):
+        self._listener = listener
+        self.function = function
+        self.job_id = job_id
+        self.interval_seconds = interval_seconds if interval_seconds is not None else _env_number(
+            'OPIK_OPTIMIZER_PROGRESS_INTERVAL', DEFAULT_INTERVAL_SECONDS
+        )
+        self._budget: Optional[RunBudget] = None
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._last_heartbeat = 0.0
+        self._evaluations = 0
+        self._candidates = 0
+        self._current: Optional[str] = None
+        self._best_score: Optional[float] = None
+        self._improved_at = self._started
+
+    def attach(self, budget: RunBudget) -> None:
+        self._budget = budget
+        budget.on_record.append(self._on_record)
+        self.emit('started')
+
+    def emit(self, event: str, **fields: Any) -> None:
+        payload: Dict[str, Any] = {'event': event, 'function': self.function}
+        if self.job_id:
+            payload['job_id'] = self.job_id
+        payload.update(self._status())
+        payload.update(fields)
+        try:
+            self._listener(payload)
+        except Exception as exc:  # pragma: no cover - progress must never break a run
+            sys.stderr.write(f'[opik] progress listener failed: {exc}\n')
+
+    def _status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        status: Dict[str, Any] = {
+            'elapsed_seconds': round(now - self._started, 3),
+            'evaluations': self._evaluations,
+            'candidates': self._candidates,
+            'seconds_since_improvement': round(now - self._improved_at, 3)
+        }
+        if self._budget is not None:
+            status['model_calls'] = self._budget.calls
+            status['tokens'] = self._budget.tokens
+            status['best'] = self._budget.best_so_far()
+        return status
+
+    def _on_record(self, budget: RunBudget, prompt: str) -> None:
+        events = []
+        with self._lock:
+            self._evaluations += 1
+            best = budget.best_so_far()
+            if best is not None and (self._best_score is None or best['score'] > self._best_score):
+                self._best_score = best['score']
+                self._improved_at = time.monotonic()
+
+            if budget.candidate_count > self._candidates:
+                if self._current is not None:
+                    finished = budget.candidate_score(self._current)
+                    events.append(('trial_finished', dict(finished, trial=self._candidates)))
+                self._candidates = budget.candidate_count
+                self._current = prompt
+                events.append(('trial_started', {'trial': self._candidates, 'prompt': prompt}))
+            elif time.monotonic() - self._last_heartbeat >= self.interval_seconds:
+                events.append(('progress', {}))
+            if events:
+                self._last_heartbeat = time.monotonic()
+        for event, fields in events:
+            self.emit(event, **fields)
+
+    def finish(self, response: Dict[str, Any]) -> None:
+        if self._budget is not None and self._current is not None:
+            finished = self._budget.candidate_score(self._current)
+            self.emit('trial_finished', **dict(finished, trial=self._candidates))
+        self.emit('finished', budget_exhausted=bool(response.get('budget_exhausted')))
+
+    def fail(self, error: BaseException) -> None:
+        self.emit('failed', error=str(error))
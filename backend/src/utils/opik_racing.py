@@ -0,0 +1,158 @@
+"""Racing (successive-halving) evaluation of prompt candidates.
+
+Instead of scoring every candidate on every dataset item, `race` scores all
+candidates on a small stratified subset, drops candidates that are clearly
+worse than the leader, and keeps doubling (``growth``) the subset for the
+survivors until it reaches the sample budget (``sample_fraction`` of the
+dataset) or only ``min_survivors`` remain. The race is a pre-screen: the
+survivors are evaluated again by whatever runs next, so racing them on the
+whole dataset would mostly pay for the same evaluations twice.
+"Clearly worse" uses Hoeffding bounds for scores in ``[0, 1]``: after ``n``
+items a candidate's true mean lies within ``sqrt(ln(2K / delta) / 2n)`` of its
+observed mean with probability ``1 - delta`` (union bound over K candidates),
+so a candidate whose upper bound is below the leader's lower bound is
+eliminated.
+
+Items are ordered so that every prefix is (approximately) stratified by
+``stratify`` -- each stratum contributes in proportion to its size -- which
+keeps the early rounds representative of the full dataset.
+"""
+
+import math
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+DEFAULT_INITIAL_ITEMS = 8
+DEFAULT_GROWTH = 2.0
+DEFAULT_DELTA = 0.05
+DEFAULT_SAMPLE_FRACTION = 0.25
+
+Evaluate = Callable[[int, Dict[str, Any]], float]
+
+
+def stratified_order(
+    items: Sequence[Dict[str, Any]],
+    stratify: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+    seed: int = 0
+) -> List[int]:
+    """Indices of ``items`` in an order whose prefixes keep stratum proportions."""
+    rng = random.Random(seed)
+    strata: Dict[Hashable, List[int]] = defaultdict(list)
+    for index, item in enumerate(items):
+        strata[stratify(item) if stratify else None].append(index)
+    for members in strata.values():
+        rng.shuffle(members)
+
+    # Give each item a fractional position (k + jitter) / stratum_size and sort:
+    # every stratum is spread evenly over the whole ordering.
+    keyed = []
+    for members in strata.values():
+        size = len(members)
+        for position, index in enumerate(members):
+            keyed.append(((position + rng.random()) / size, index))
+    keyed.sort()
+    return [index for _, index in keyed]
+
+
+def hoeffding_radius(n: int, candidates: int, delta: float) -> float:
+    if n <= 0:
+        return 1.0
+    return math.sqrt(math.log(2 * max(1, candidates) / delta) / (2 * n))
+
+
+def race(
+    candidate_count: int,
+    items: Sequence[Dict[str, Any]],
+    evaluate: Evaluate,
+    initial_items: int = DEFAULT_INITIAL_ITEMS,
+    growth: float = DEFAULT_GROWTH,
+    delta: float = DEFAULT_DELTA,
+    min_survivors: int = 1,
+    halve: bool = False,
+    stratify: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+    seed: int = 0,
+    workers: int = 1,
+    sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+    followup_items: Optional[int] = None
+) -> Dict[str, Any]:
+    """Race ``candidate_count`` candidates over ``items``.
+
+    ``evaluate(candidate_index, item)`` returns a score in ``[0, 1]``. Returns
+    the surviving candidate indices (best first), per-candidate means and the
+    number of evaluations spent versus exhaustive evaluation. With ``halve``
+    each round also keeps at most ``1 / growth`` of the candidates (classic
+    successive halving) on top of the confidence-bound eliminations.
+
+    No candidate is scored on more than ``sample_fraction`` of the items (but
+    at least ``initial_items``). ``followup_items`` is how many items each
+    survivor is evaluated on afterwards; the savings are then measured against
+    evaluating every candidate on that many items, and the survivors' follow-up
+    evaluations count as spent.
+    """
+    if candidate_count <= 0:
+        raise ValueError('race needs at least one candidate')
+    order = stratified_order(items, stratify, seed)
+    total_items = len(order)
+    sample_items = min(
+        total_items,
+        max(initial_items, int(math.ceil(total_items * min(1.0, max(0.0, sample_fraction)))))
+    )
+    alive = list(range(candidate_count))
+    sums = [0.0] * candidate_count
+    counts = [0] * candidate_count
+    eliminated: List[Dict[str, Any]] = []
+    rounds: List[Dict[str, Any]] = []
+    evaluations = 0
+    horizon = min(sample_items, max(1, initial_items))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='opik-race') as pool:
+        while True:
+            jobs = [
+                (candidate, order[position])
+                for candidate in alive
+                for position in range(counts[candidate], horizon)
+            ]
+            for (candidate, _index), score in zip(
+                jobs, pool.map(lambda job: evaluate(job[0], items[job[1]]), jobs)
+            ):
+                sums[candidate] += max(0.0, min(1.0, float(score)))
+                counts[candidate] += 1
+            evaluations += len(jobs)
+
+            radius = hoeffding_radius(horizon, candidate_count, delta)
+            means = {candidate: sums[candidate] / max(1, counts[candidate]) for candidate in alive}
+            leader_floor = max(means.values()) - radius
+            ranked = sorted(alive, key=lambda candidate: -means[candidate])
+            survivors = [candidate for candidate in ranked if means[candidate] + radius >= leader_floor]
+            if halve:
+                survivors = survivors[:max(min_survivors, int(math.ceil(len(alive) / max(growth, 1.01))))]
+            if len(survivors) < min_survivors:
+                survivors = ranked[:min_survivors]
+            for candidate in ranked:
+                if candidate not in survivors:
+                    eliminated.append({'candidate': candidate, 'items': counts[candidate], 'mean': means[candidate]})
+            rounds.append({'items': horizon, 'alive': len(alive), 'survivors': len(survivors), 'radius': radius})
+            alive = survivors
+
+            if horizon >= sample_items or len(alive) <= min_survivors:
+                break
+            horizon = min(sample_items, int(math.ceil(horizon * max(growth, 1.01))))
+
+    means = [sums[idx] / counts[idx] if counts[idx] else 0.0 for idx in range(candidate_count)]
+    followup = len(alive) * followup_items if followup_items is not None else 0
+    exhaustive = candidate_count * (followup_items if followup_items is not None else total_items)
+    return {
+        'survivors': alive,
+        'means': means,
+        'items_evaluated': counts,
+        'eliminated': eliminated,
+        'rounds': rounds,
+        'sample_items': sample_items,
+        'evaluations': evaluations,
+        'followup_evaluations': followup,
+        'exhaustive_evaluations': exhaustive,
+        # Negative when the race cost more than the candidates it removed.
+        'evaluations_saved': exhaustive - evaluations - followup
+    }
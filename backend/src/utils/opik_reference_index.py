@@ -0,0 +1,140 @@
+"""Per-item reference data prepared once per dataset for the optimizer metrics.
+
+Metrics are called for every (dataset item, candidate output) pair of every
+trial. `ReferenceIndex` parses each item once -- when its dataset is resolved
+-- into a `PreparedReference` holding the normalized expected text, its
+tokens, its hashed n-gram counts and a ``feedback_scores`` name -> value map,
+and the metrics read from that instead of re-walking the item.
+
+Keys are computed once, when a dataset is loaded through `ReferenceIndex.add`:
+each item's key is a digest of the fields the reference is built from, items
+without an ``id`` are given one derived from that digest, and the index maps
+ids to keys. A metric lookup for a loaded item (or a copy of it the optimizer
+made) is then a dict lookup by ``id``; only items the index has not loaded --
+or whose ``id`` the last load saw with different contents -- are hashed on
+lookup. Entries hold the prepared references only, never the items or the
+dicts and lists inside them. The index is bounded and forgets the least recently
+prepared items first.
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from opik_scoring import DEFAULT_DIMENSIONS, DEFAULT_NGRAM_SIZE, hashed_ngrams
+from opik_similarity import normalize
+
+DEFAULT_MAX_ITEMS = 200000
+
+
+class PreparedReference:
+    """Parsed view of one dataset item."""
+
+    __slots__ = (
+        'text', 'normalized', 'tokens', 'token_set', 'ngrams', 'feedback_scores', 'feedback_reasons', 'digest'
+    )
+
+    def __init__(self, text: str, feedback: Iterable[Any]):
+        self.text = text
+        self.normalized = normalize(text)
+        self.tokens = tuple(self.normalized.split())
+        self.token_set = frozenset(self.tokens)
+        self.ngrams = hashed_ngrams(self.normalized, DEFAULT_NGRAM_SIZE, DEFAULT_DIMENSIONS)
+        self.feedback_scores: Dict[str, float] = {}
+        self.feedback_reasons: Dict[str, str] = {}
+        for score in feedback or []:
+            if not isinstance(score, dict) or not score.get('name') or score['name'] in self.feedback_scores:
+                continue
+            name = score['name']
+            try:
+                self.feedback_scores[name] = float(score.get('value') or 0)
+            except (TypeError, ValueError):
+                self.feedback_scores[name] = 0.0
+            if score.get('reason'):
+                self.feedback_reasons[name] = score['reason']
+        # Content digest: items with the same reference and feedback score identically.
+        content = json.dumps([text, sorted(self.feedback_scores.items())], default=str)
+        self.digest = hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ReferenceIndex:
+    """Bounded map from dataset items to their `PreparedReference`."""
+
+    def __init__(self, extract_text: Callable[[Dict[str, Any]], str], max_items: int = DEFAULT_MAX_ITEMS):
+        self._extract_text = extract_text
+        self._max_items = max_items
+        self._entries: 'OrderedDict[bytes, PreparedReference]' = OrderedDict()
+        self._ids: 'OrderedDict[Any, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.prepared = 0
+        self.hits = 0
+
+    @staticmethod
+    def _content_key(item: Dict[str, Any]) -> bytes:
+        source = (item.get('expected_output'), item.get('output'), item.get('feedback_scores'))
+        content = json.dumps(source, sort_keys=True, default=str)
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+
+    def _key(self, item: Dict[str, Any]) -> bytes:
+        item_id = item.get('id')
+        if isinstance(item_id, (str, int)):
+            key = self._ids.get(item_id)
+            if key is not None:
+                return key
+        return self._content_key(item)
+
+    def _prepare(self, item: Dict[str, Any]) -> PreparedReference:
+        self.prepared += 1
+        return PreparedReference(self._extract_text(item), item.get('feedback_scores') or [])
+
+    def _lookup(self, key: bytes, item: Dict[str, Any]) -> PreparedReference:
+        with self._lock:
+            reference = self._entries.get(key)
+            if reference is not None:
+                self.hits += 1
+                return reference
+
+        reference = self._prepare(item)
+        with self._lock:
+            self._entries[key] = reference
+            while len(self._entries) > self._max_items:
+                self._entries.popitem(last=False)
+        return reference
+
+    def add(self, items: Iterable[Dict[str, Any]]) -> List[PreparedReference]:
+        """Key and prepare a freshly loaded dataset's ``items`` and return them in order.
+
+        Items without an ``id`` get one derived from their contents, so copies
+        of them are found by ``id`` later.
+        """
+        prepared = []
+        loaded: Dict[Any, bytes] = {}
+        reused = set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            key = self._content_key(item)
+            item_id = item.get('id')
+            if not isinstance(item_id, (str, int)):
+                item_id = item['id'] = str(uuid.UUID(bytes=key))
+            if loaded.setdefault(item_id, key) != key:
+                reused.add(item_id)
+            prepared.append(self._lookup(key, item))
+
+        with self._lock:
+            for item_id, key in loaded.items():
+                self._ids.pop(item_id, None)
+                if item_id not in reused:
+                    self._ids[item_id] = key
+            while len(self._ids) > self._max_items:
+                self._ids.popitem(last=False)
+        return prepared
+
+    def get(self, item: Dict[str, Any]) -> PreparedReference:
+        return self._lookup(self._key(item), item)
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {'items': len(self._entries), 'prepared': self.prepared, 'hits': self.hits}
@@ -0,0 +1,249 @@
+"""Replay `logs/opik_fallback.jsonl` records through the runner dispatch table.
+
+The Node bridge appends ``{at, function, payload, reason}`` records whenever it
+cannot reach the Python runner. This module streams that file in chunks,
+re-invokes each named logging function in parallel (optionally rate limited),
+and after every chunk persists the byte offset it reached plus the content
+hashes it replayed. An interrupted replay resumes from the checkpoint, and a
+record that was already replayed (e.g. the file was re-copied) is skipped.
+A record's hash covers its ``at`` timestamp, so two identical events logged at
+different times are both replayed.
+"""
+
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, ContextManager, Deque, Dict, List, Optional, Tuple
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_SEEN = 100000
+
+Invoke = Callable[[str, Dict[str, Any]], Tuple[Any, Optional[str]]]
+
+
+def record_hash(
+    function_name: str,
+    payload: Any,
+    at: Optional[str] = None,
+    reason: Optional[str] = None
+) -> str:
+    # ``at`` is part of the identity: the same event logged twice is two traces.
+    canonical = json.dumps(
+        {'function': function_name, 'payload': payload, 'at': at, 'reason': reason},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class _RateLimiter:
+    """Space calls evenly so at most ``rate`` start per second."""
+
+    def __init__(self, rate: Optional[float]):
+        self._interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self._interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _load_checkpoint(checkpoint_path: str, source_path: str) -> Dict[str, Any]:
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as handle:
+            checkpoint = json.load(handle)
+    except (OSError, ValueError):
+        return {'offset': 0}
+
+    if checkpoint.get('source') != os.path.abspath(source_path):
+        return {'offset': 0}
+    if checkpoint.get('offset', 0) > os.path.getsize(source_path):
+        return {'offset': 0}  # file was truncated or rotated
+    return checkpoint
+
+
+def _save_checkpoint(checkpoint_path: str, checkpoint: Dict[str, Any]) -> None:
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(checkpoint, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+class _SeenHashes:
+    """The most recent ``limit`` replayed hashes, mirrored to an append-only file.
+
+    The checkpoint offset already keeps a run from re-reading its own file;
+    these hashes only catch records copied into a fresh file, so older ones
+    are forgotten and the file is compacted once it holds twice the limit.
+    """
+
+    def __init__(self, path: str, limit: int):
+        self.path = path
+        self.limit = max(1, limit)
+        self._order: Deque[str] = collections.deque()
+        self._hashes: set = set()
+        self._lines_on_disk = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                for line in handle:
+                    if line.strip():
+                        self._lines_on_disk += 1
+                        self.add(line.strip())
+        except OSError:
+            pass
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._hashes
+
+    def add(self, digest: str) -> None:
+        if digest in self._hashes:
+            return
+        self._order.append(digest)
+        self._hashes.add(digest)
+        while len(self._order) > self.limit:
+            self._hashes.discard(self._order.popleft())
+
+    def persist(self, digests: List[str]) -> None:
+        if not digests:
+            return
+        if self._lines_on_disk + len(digests) > 2 * self.limit:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                handle.write(''.join(f'{digest}\n' for digest in self._order))
+            os.replace(tmp_path, self.path)
+            self._lines_on_disk = len(self._order)
+            return
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write('\n'.join(digests) + '\n')
+        self._lines_on_disk += len(digests)
+
+
+def _read_chunk(handle, batch_size: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Read up to ``batch_size`` complete lines; returns the records and the new offset."""
+    records = []
+    offset = handle.tell()
+    while len(records) < batch_size:
+        line = handle.readline()
+        if not line:
+            break
+        if not line.endswith(b'\n'):
+            break  # partially written tail; leave it for the next run
+        offset = handle.tell()
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            records.append({'_invalid': True})
+            continue
+        records.append(record if isinstance(record, dict) else {'_invalid': True})
+    return records, offset
+
+
+def replay_fallback_log(
+    invoke: Invoke,
+    path: str,
+    checkpoint_path: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    rate_per_second: Optional[float] = None,
+    allowed: Optional[Callable[[str], bool]] = None,
+    recorded_at: Optional[Callable[[Optional[str]], ContextManager[Any]]] = None,
+    max_seen: Optional[int] = None
+) -> Dict[str, Any]:
+    """Replay ``path`` through ``invoke`` and return counters for the run.
+
+    ``recorded_at(at)`` wraps each replayed call, so the traces it logs can be
+    stamped with the time the bridge originally recorded instead of now.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'Fallback log not found at {path}')
+
+    checkpoint_path = checkpoint_path or f'{path}.checkpoint'
+    seen_path = f'{checkpoint_path}.seen'
+    failed_path = f'{path}.failed.jsonl'
+    allowed = allowed or (lambda name: isinstance(name, str) and name.startswith('log_'))
+
+    checkpoint = _load_checkpoint(checkpoint_path, path)
+    seen = _SeenHashes(seen_path, max_seen or int(os.environ.get('OPIK_REPLAY_MAX_SEEN', DEFAULT_MAX_SEEN)))
+    limiter = _RateLimiter(rate_per_second)
+    totals = {'replayed': 0, 'duplicates': 0, 'skipped': 0, 'failed': 0}
+    started = time.monotonic()
+
+    def _replay_one(record: Dict[str, Any]) -> Optional[str]:
+        limiter.wait()
+        with recorded_at(record.get('at')) if recorded_at is not None else contextlib.nullcontext():
+            _result, error = invoke(record['function'], record.get('payload') or {})
+        return error
+
+    with open(path, 'rb') as handle, \
+            ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='opik-replay') as pool:
+        handle.seek(checkpoint.get('offset', 0))
+        while True:
+            records, offset = _read_chunk(handle, max(1, batch_size))
+
+            pending = []
+            for record in records:
+                function_name = record.get('function')
+                if record.get('_invalid') or not allowed(function_name):
+                    totals['skipped'] += 1
+                    continue
+                digest = record_hash(function_name, record.get('payload'), record.get('at'), record.get('reason'))
+                if digest in seen:
+                    totals['duplicates'] += 1
+                    continue
+                seen.add(digest)
+                pending.append((digest, record, pool.submit(_replay_one, record)))
+
+            replayed_hashes = []
+            failed_records = []
+            for digest, record, future in pending:
+                error = future.result()
+                if error is None:
+                    totals['replayed'] += 1
+                    replayed_hashes.append(digest)
+                else:
+                    totals['failed'] += 1
+                    failed_records.append({**record, 'replay_error': error})
+
+            if failed_records:
+                with open(failed_path, 'a', encoding='utf-8') as failed_handle:
+                    for record in failed_records:
+                        failed_handle.write(json.dumps(record, default=str) + '\n')
+            seen.persist(replayed_hashes)
+
+            if offset != checkpoint.get('offset'):
+                checkpoint = {
+                    'source': os.path.abspath(path),
+                    'offset': offset,
+                    'updated_at': time.time()
+                }
+                _save_checkpoint(checkpoint_path, checkpoint)
+
+            # An empty chunk means EOF (or a partially written last line).
+            if not records:
+                break
+
+    return {
+        'source': os.path.abspath(path),
+        'checkpoint': checkpoint_path,
+        'offset': checkpoint.get('offset', 0),
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+        **totals
+    }
@@ -1,6 +1,10 @@
+import importlib
 import json
+import os
 import sys
 import io
+import threading
+import time
 
 ORIGINAL_STDOUT = sys.stdout
 
@@ -17,47 +21,494 @@ class _StdoutInterceptor(io.StringIO):
 
 sys.stdout = _StdoutInterceptor()
 
-from opik_logger import *  # noqa: F401,F403
-from opik_optimizer_helpers import *  # noqa: F401,F403
+_LOGGER_MODULE = "opik_logger"
+_OPTIMIZER_MODULE = "opik_optimizer_helpers"
 
+# Function name -> module that defines it. Modules are imported on first use so
+# a logging call never pays for the optimizer stack.
+_FUNCTION_REGISTRY = {
+    "log_morning_summary": _LOGGER_MODULE,
+    "log_morning_summary_dispatch": _LOGGER_MODULE,
+    "log_reminder_generated": _LOGGER_MODULE,
+    "log_reminder_sent": _LOGGER_MODULE,
+    "log_task_completion": _LOGGER_MODULE,
+    "log_intent_parsing": _LOGGER_MODULE,
+    "log_completion_stats": _LOGGER_MODULE,
+    "log_eod_summary_draft": _LOGGER_MODULE,
+    "log_eod_summary": _LOGGER_MODULE,
+    "log_llm_call": _LOGGER_MODULE,
+    "log_agent_effectiveness": _LOGGER_MODULE,
+    "calculate_reminder_effectiveness": _LOGGER_MODULE,
+    "log_experiment_variant": _LOGGER_MODULE,
+    "log_daily_plan_trace": _LOGGER_MODULE,
+    "log_reminder_trace": _LOGGER_MODULE,
+    "log_eod_summary_trace": _LOGGER_MODULE,
+    "log_conversation_trace": _LOGGER_MODULE,
+    "trace_sink_stats": _LOGGER_MODULE,
+    "flush_traces": _LOGGER_MODULE,
+    "run_hrpo_optimization": _OPTIMIZER_MODULE,
+    "run_gepa_optimization": _OPTIMIZER_MODULE,
+    "run_fewshot_selection": _OPTIMIZER_MODULE,
+    "run_optimizer_suite": _OPTIMIZER_MODULE,
+    "fetch_opik_dataset_entries": _OPTIMIZER_MODULE,
+    "fetch_opik_metrics_snapshot": _OPTIMIZER_MODULE,
+    "score_candidate_outputs": _OPTIMIZER_MODULE,
+}
 
-def _emit_json(payload):
-    ORIGINAL_STDOUT.write(json.dumps(payload, default=str))
-    ORIGINAL_STDOUT.write('\n')
-    ORIGINAL_STDOUT.flush()
+# Functions that must not share a worker pool with trace logging. Anything not
+# listed runs in the logging lane.
+_FUNCTION_LANES = {
+    "run_hrpo_optimization": "optimizer",
+    "run_gepa_optimization": "optimizer",
+    "run_fewshot_selection": "optimizer",
+    "run_optimizer_suite": "optimizer",
+    "fetch_opik_dataset_entries": "optimizer",
+    "fetch_opik_metrics_snapshot": "metrics",
+    "score_candidate_outputs": "metrics",
+    "trace_sink_stats": "metrics",
+}
 
+# Modules imported, in order, by ``--startup-report`` to measure cold start.
+_STARTUP_REPORT_MODULES = ("opik", _LOGGER_MODULE, "opik_optimizer", _OPTIMIZER_MODULE)
 
-def main():
-    """Entry point for invoking tracked logging helpers from Node."""
+_IMPORT_TIMINGS = {}
+
+
+_IMPORT_LOCK = threading.Lock()
+
+
+def _load_module(module_name):
+    """Import ``module_name`` once, recording how long the first import took."""
+    with _IMPORT_LOCK:
+        if module_name in _IMPORT_TIMINGS:
+            return sys.modules[module_name]
+
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        _IMPORT_TIMINGS[module_name] = round((time.perf_counter() - started) * 1000, 2)
+        return module
+
+
+def _resolve_function(func_name):
+    module_name = _FUNCTION_REGISTRY.get(func_name)
+    if module_name is None:
+        return None
+    return getattr(_load_module(module_name), func_name, None)
+
+
+def _startup_report():
+    """Summarize per-import timings against ``OPIK_RUNNER_STARTUP_BUDGET_MS``."""
+    total_ms = round(sum(_IMPORT_TIMINGS.values()), 2)
+    report = {
+        "imports": [{"module": name, "ms": ms} for name, ms in _IMPORT_TIMINGS.items()],
+        "total_ms": total_ms
+    }
+
+    budget = os.environ.get("OPIK_RUNNER_STARTUP_BUDGET_MS")
+    if budget:
+        try:
+            budget_ms = float(budget)
+        except ValueError:
+            budget_ms = None
+        if budget_ms is not None:
+            report["budget_ms"] = budget_ms
+            report["within_budget"] = total_ms <= budget_ms
+
+    return report
+
+
+_EMIT_LOCK = threading.Lock()
+_LANES = None
+
+# Default for the per-request ``progress`` field; set by ``--progress``.
+_PROGRESS_DEFAULT = False
+
+
+_RESULT_CHANNEL = None
+
+
+def _result_channel():
+    global _RESULT_CHANNEL
+    if _RESULT_CHANNEL is None:
+        from opik_framing import ResultChannel
+
+        _RESULT_CHANNEL = ResultChannel(ORIGINAL_STDOUT.buffer)
+    return _RESULT_CHANNEL
+
+
+def _configure_result_channel():
+    """Apply ``--frame``, ``--encoding``, ``--compress`` and ``--result-fd`` from argv."""
+    global _RESULT_CHANNEL
+    framed = _pop_flag("frame")
+    encoding = _pop_option("encoding") or "json"
+    compress = _pop_option("compress")
+    result_fd = _pop_option("result-fd")
+    if not (framed or compress or result_fd or encoding != "json"):
+        return
+
+    from opik_framing import ResultChannel
+
+    # A dedicated descriptor keeps results apart from anything a library
+    # writes to the real stdout.
+    stream = os.fdopen(int(result_fd), "wb", buffering=0) if result_fd else ORIGINAL_STDOUT.buffer
+    _RESULT_CHANNEL = ResultChannel(stream, framed=framed, encoding=encoding, compress=compress)
+
+
+def _emit(payload):
+    channel = _result_channel()
+    with _EMIT_LOCK:
+        channel.send(payload)
+
+
+def _get_lanes():
+    """Create the lane pools on first use (after any prefork, since threads don't survive fork)."""
+    global _LANES
+    if _LANES is None:
+        from opik_lanes import LaneScheduler
+
+        _LANES = LaneScheduler()
+    return _LANES
+
+
+def _invoke(func_name, payload, progress=None):
+    """Run a registered helper and return ``(result, error)`` for the caller.
+
+    With a ``progress`` callable, optimizer runs report structured progress
+    events to it while they execute (see ``opik_progress``).
+    """
+    if not isinstance(payload, dict):
+        return None, "Payload must be a JSON object"
+
+    try:
+        target = _resolve_function(func_name)
+    except ImportError as exc:
+        return None, f"Unable to load '{func_name}': {exc}"
+
+    if target is None:
+        return None, f"Function '{func_name}' not found"
+
+    try:
+        if progress is None:
+            result = target(**payload)
+        else:
+            from opik_progress import progress_scope
+
+            with progress_scope(progress):
+                result = target(**payload)
+    except Exception as exc:  # pragma: no cover - relay error to Node caller
+        return None, str(exc)
+
+    if result is None:
+        result = {"status": "ok"}
+
+    return result, None
+
+
+def _parse_request_line(line):
+    """Decode one NDJSON request into ``(request, error_response)``."""
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as exc:
+        return None, {"id": None, "error": f"Invalid request JSON: {exc}"}
+
+    if not isinstance(request, dict):
+        return None, {"id": None, "error": "Request must be a JSON object"}
+
+    return request, None
+
+
+def _execute_request(request, emit=None):
+    request_id = request.get("id")
+    progress = None
+    if emit is not None and request.get("progress", _PROGRESS_DEFAULT):
+        progress = lambda event: emit({"id": request_id, "progress": event})
+    result, error = _invoke(request.get("function"), request.get("payload") or {}, progress)
+    if error is not None:
+        return {"id": request_id, "error": error}
+    return {"id": request_id, "result": result}
+
+
+def _answer_request(request, emit):
+    # Emitting from the lane thread means the response is written before the
+    # future completes, so a caller waiting on the futures can close safely.
+    emit(_execute_request(request, emit))
+
+
+def _serve_lines(lines, emit, max_requests=None):
+    """Dispatch NDJSON requests from ``lines`` through the execution lanes.
+
+    Responses are written with ``emit`` as each request finishes, so they may
+    arrive out of order; callers correlate them by ``id``. Requests with
+    ``"progress": true`` (the default under ``--progress``) also stream
+    ``{"id": ..., "progress": {...}}`` events before their response. A
+    saturated lane answers immediately with a ``backpressure`` block instead
+    of queueing.
+    Returns the number of requests accepted once all of them have completed.
+    """
+    from opik_lanes import LaneSaturated
+
+    lanes = _get_lanes()
+    futures = []
+    accepted = 0
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        request, error_response = _parse_request_line(line)
+        if error_response is not None:
+            emit(error_response)
+            continue
+
+        lane = _FUNCTION_LANES.get(request.get("function"), "logging")
+        try:
+            future = lanes.submit(lane, _answer_request, request, emit)
+        except LaneSaturated as exc:
+            emit({
+                "id": request.get("id"),
+                "error": str(exc),
+                "backpressure": {"lane": exc.lane, "in_flight": exc.in_flight, "capacity": exc.capacity}
+            })
+            continue
+
+        futures.append(future)
+        futures = [pending for pending in futures if not pending.done()]
+        accepted += 1
+        if max_requests is not None and accepted >= max_requests:
+            break
+
+    for future in futures:
+        future.exception()
+
+    return accepted
+
+
+def _serve(stream=None):
+    """Answer newline-delimited JSON requests until the input stream closes.
+
+    Each request looks like ``{"id": ..., "function": ..., "payload": {...}}``
+    and is answered with ``{"id": ..., "result": ...}`` or
+    ``{"id": ..., "error": ...}`` on the original stdout, one line per
+    response. Modules and Opik clients stay loaded between requests, and
+    optimizer runs execute in their own lane so logging is never queued
+    behind them.
+    """
+    _serve_lines(stream or sys.stdin, _emit)
+
+
+def _preload_modules():
+    for module_name in (_LOGGER_MODULE, _OPTIMIZER_MODULE):
+        try:
+            _load_module(module_name)
+        except ImportError as exc:
+            sys.stderr.write(f"[opik_runner] {module_name} unavailable: {exc}\n")
+    # The helpers module defers GEPA/HRPO/litellm to the first optimizer run;
+    # import them here so prefork workers share them instead of each paying.
+    helpers = sys.modules.get(_OPTIMIZER_MODULE)
+    if helpers is not None and not helpers._load_optimizer_stack():
+        sys.stderr.write(f"[opik_runner] optimizer stack unavailable: {helpers._OPTIMIZER_IMPORT_ERROR}\n")
+
+
+def _option(name, default=None):
+    """Return the value following ``--name`` in argv, or ``default``."""
+    flag = f"--{name}"
+    if flag in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(flag) + 1]
+    return default
+
+
+def _pop_flag(name):
+    """Remove ``--name`` from argv, returning whether it was present."""
+    flag = f"--{name}"
+    if flag in sys.argv[1:]:
+        sys.argv.remove(flag)
+        return True
+    return False
+
+
+def _pop_option(name):
+    """Remove ``--name value`` from argv and return ``value`` (or ``None``)."""
+    value = _option(name)
+    if value is not None:
+        index = sys.argv.index(f"--{name}")
+        del sys.argv[index:index + 2]
+    return value
+
+
+def _int_option(name, env_key):
+    value = _option(name, os.environ.get(env_key))
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _decode_json_stream(handle):
+    """Decode one JSON document from a binary stream.
+
+    With the optional ``ijson`` package installed the document is parsed
+    incrementally straight from the stream, so multi-megabyte payloads never
+    exist as one big string. Otherwise the raw bytes are read once and handed
+    to ``json.loads`` without an intermediate text copy.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is None:
+        return json.loads(handle.read())
+
+    try:
+        return next(ijson.items(handle, "", use_float=True))
+    except StopIteration:
+        raise ValueError("empty JSON document") from None
+    except ijson.JSONError as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def _read_json_argument(argument):
+    """Decode an inline JSON argument, ``-`` for stdin or ``@path`` for a file."""
+    if argument == "-":
+        return _decode_json_stream(sys.stdin.buffer)
+    if argument.startswith("@"):
+        with open(argument[1:], "rb") as handle:
+            return _decode_json_stream(handle)
+    return json.loads(argument)
+
+
+def _run_batch(calls):
+    """Execute ``[{function, payload}, ...]`` in order, collecting per-call outcomes."""
+    results = []
+    for call in calls:
+        if not isinstance(call, dict):
+            results.append({"function": None, "error": "Batch entries must be JSON objects"})
+            continue
+
+        func_name = call.get("function")
+        progress = None
+        if call.get("progress", _PROGRESS_DEFAULT):
+            progress = lambda event, name=func_name: _emit({"function": name, "progress": event})
+        result, error = _invoke(func_name, call.get("payload") or {}, progress)
+        if error is not None:
+            results.append({"function": func_name, "error": error})
+        else:
+            results.append({"function": func_name, "result": result})
+
+    return {"results": results}
+
+
+def _dispatch_cli():
     if len(sys.argv) < 2:
-        _emit_json({"error": "Function name required"})
+        _emit({"error": "Function name required"})
+        return
+
+    if sys.argv[1] == "--serve":
+        _serve()
+        return
+
+    if sys.argv[1] == "--prefork":
+        from opik_server import serve_prefork
+
+        socket_path = _option("socket", os.environ.get("OPIK_RUNNER_SOCKET"))
+        if not socket_path:
+            _emit({"error": "--prefork requires --socket <path> or OPIK_RUNNER_SOCKET"})
+            return
+        serve_prefork(
+            _serve_lines,
+            _preload_modules,
+            socket_path,
+            workers=_int_option("workers", "OPIK_RUNNER_WORKERS"),
+            max_requests=_int_option("max-requests", "OPIK_RUNNER_MAX_REQUESTS")
+        )
+        return
+
+    if sys.argv[1] == "--replay":
+        from opik_replay import replay_fallback_log
+
+        if len(sys.argv) < 3:
+            _emit({"error": "--replay requires the path to opik_fallback.jsonl"})
+            return
+        rate = _option("rate")
+        try:
+            summary = replay_fallback_log(
+                _invoke,
+                sys.argv[2],
+                checkpoint_path=_option("checkpoint"),
+                batch_size=_int_option("batch-size", "OPIK_REPLAY_BATCH_SIZE") or 200,
+                workers=_int_option("workers", "OPIK_REPLAY_WORKERS") or 4,
+                rate_per_second=float(rate) if rate else None,
+                allowed=lambda name: _FUNCTION_LANES.get(name, "logging") == "logging"
+                and name in _FUNCTION_REGISTRY,
+                recorded_at=_load_module(_LOGGER_MODULE).recorded_at
+            )
+        except (OSError, ValueError) as exc:
+            _emit({"error": f"Replay failed: {exc}"})
+            return
+        flushed, _ = _invoke("flush_traces", {"timeout": 30})
+        summary["flushed"] = bool(flushed and flushed.get("flushed"))
+        _emit(summary)
+        return
+
+    if sys.argv[1] == "--batch":
+        try:
+            calls = _read_json_argument(sys.argv[2] if len(sys.argv) > 2 else "-")
+        except (OSError, ValueError) as exc:
+            _emit({"error": f"Invalid batch input: {exc}"})
+            return
+        if not isinstance(calls, list):
+            _emit({"error": "Batch input must be a JSON array of {function, payload} calls"})
+            return
+        _emit(_run_batch(calls))
         return
 
     func_name = sys.argv[1]
     payload = {}
 
+    # Large payloads (inline datasets, example pools) arrive as "-" (stdin) or
+    # "@path" instead of argv, which is size-limited by the OS.
     if len(sys.argv) > 2 and sys.argv[2]:
         try:
-            payload = json.loads(sys.argv[2])
-        except json.JSONDecodeError as exc:
-            _emit_json({"error": f"Invalid payload JSON: {exc}"})
+            payload = _read_json_argument(sys.argv[2])
+        except (OSError, ValueError) as exc:
+            _emit({"error": f"Invalid payload JSON: {exc}"})
             return
 
-    target = globals().get(func_name)
-    if target is None:
-        _emit_json({"error": f"Function '{func_name}' not found"})
+    progress = (lambda event: _emit({"progress": event})) if _PROGRESS_DEFAULT else None
+    result, error = _invoke(func_name, payload, progress)
+    if error is not None:
+        _emit({"error": error})
         return
 
+    _emit(result)
+
+
+def main():
+    """Entry point for invoking tracked logging helpers from Node."""
+    global _PROGRESS_DEFAULT
+    _PROGRESS_DEFAULT = _pop_flag("progress")
     try:
-        result = target(**payload)
-    except Exception as exc:  # pragma: no cover - relay error to Node caller
-        _emit_json({"error": str(exc)})
+        _configure_result_channel()
+    except (OSError, ValueError, RuntimeError) as exc:
+        _emit({"error": f"Invalid result channel options: {exc}"})
         return
 
-    if result is None:
-        result = {"status": "ok"}
+    startup_report = _pop_flag("startup-report")
+    if startup_report:
+        if len(sys.argv) < 2:
+            for module_name in _STARTUP_REPORT_MODULES:
+                try:
+                    _load_module(module_name)
+                except ImportError as exc:
+                    sys.stderr.write(f"[opik_runner] {module_name} unavailable: {exc}\n")
+            _emit(_startup_report())
+            return
 
-    _emit_json(result)
+    try:
+        _dispatch_cli()
+    finally:
+        if startup_report:
+            sys.stderr.write(json.dumps({"startup_report": _startup_report()}) + "\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+"""Batch scoring of candidate outputs against every reference in a dataset.
+
+`score_matrix` returns a ``len(candidates) x len(references)`` matrix in one
+pass. The vector methods hash character n-grams of each text into a fixed
+number of buckets and compare the resulting count vectors:
+
+* ``cosine``  -- cosine similarity of the n-gram count vectors
+* ``jaccard`` -- Jaccard overlap of the n-gram sets
+
+With NumPy installed these are two matrix products over the whole batch;
+without it a sparse pure-Python path produces the same numbers. The pairwise
+scorers from `opik_similarity` (``indel``, ``levenshtein``, ``token``,
+``ngram``) are also accepted and evaluated pair by pair. An optional
+``length_penalty`` multiplies every score by ``(shorter / longer) **
+length_penalty`` so candidates much longer or shorter than the reference rank
+lower.
+"""
+
+import math
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from opik_similarity import SCORERS, normalize, scorer_name_for
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+VECTOR_METHODS = ('cosine', 'jaccard')
+DEFAULT_NGRAM_SIZE = 3
+DEFAULT_DIMENSIONS = 1 << 12
+
+
+def hashed_ngrams(text: str, size: int, dimensions: int) -> Dict[int, int]:
+    padded = f' {text} '
+    if len(padded) < size:
+        grams = [padded]
+    else:
+        grams = [padded[idx:idx + size] for idx in range(len(padded) - size + 1)]
+    counts: Dict[int, int] = {}
+    for gram in grams:
+        bucket = zlib.crc32(gram.encode('utf-8')) % dimensions
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def _text_vectors(texts: Sequence[Any], size: int, dimensions: int) -> List[Dict[int, int]]:
+    """Hashed n-gram counts per text, reusing a prepared reference's ``ngrams`` when it matches."""
+    vectors = []
+    for text in texts:
+        cached = getattr(text, 'ngrams', None)
+        if cached is not None and size == DEFAULT_NGRAM_SIZE and dimensions == DEFAULT_DIMENSIONS:
+            vectors.append(cached)
+        else:
+            vectors.append(hashed_ngrams(_normalized(text), size, dimensions))
+    return vectors
+
+
+def _normalized(text: Any) -> str:
+    prepared = getattr(text, 'normalized', None)
+    return prepared if prepared is not None else normalize(text)
+
+
+def _vector_matrix_numpy(
+    left_vectors: List[Dict[int, int]],
+    right_vectors: List[Dict[int, int]],
+    method: str,
+    dimensions: int
+) -> Any:
+    def _encode(vectors: List[Dict[int, int]]) -> Any:
+        matrix = np.zeros((len(vectors), dimensions), dtype=np.float32)
+        for row, counts in enumerate(vectors):
+            matrix[row, list(counts.keys())] = list(counts.values())
+        return matrix
+
+    left, right = _encode(left_vectors), _encode(right_vectors)
+    if method == 'cosine':
+        left_norm = np.linalg.norm(left, axis=1, keepdims=True)
+        right_norm = np.linalg.norm(right, axis=1, keepdims=True)
+        left = np.divide(left, left_norm, out=np.zeros_like(left), where=left_norm > 0)
+        right = np.divide(right, right_norm, out=np.zeros_like(right), where=right_norm > 0)
+        return left @ right.T
+
+    left = (left > 0).astype(np.float32)
+    right = (right > 0).astype(np.float32)
+    intersection = left @ right.T
+    union = left.sum(axis=1)[:, None] + right.sum(axis=1)[None, :] - intersection
+    return np.divide(intersection, union, out=np.ones_like(intersection), where=union > 0)
+
+
+def _vector_matrix_python(left: List[Dict[int, int]], right: List[Dict[int, int]], method: str) -> List[List[float]]:
+    if method == 'cosine':
+        right_norms = [math.sqrt(sum(v * v for v in vec.values())) for vec in right]
+        rows = []
+        for vec in left:
+            norm = math.sqrt(sum(v * v for v in vec.values()))
+            row = []
+            for other, other_norm in zip(right, right_norms):
+                if not norm or not other_norm:
+                    row.append(0.0)
+                    continue
+                dot = sum(count * other.get(bucket, 0) for bucket, count in vec.items())
+                row.append(dot / (norm * other_norm))
+            rows.append(row)
+        return rows
+
+    left_sets = [set(vec) for vec in left]
+    right_sets = [set(vec) for vec in right]
+    rows = []
+    for buckets in left_sets:
+        row = []
+        for other in right_sets:
+            union = len(buckets | other)
+            row.append(len(buckets & other) / union if union else 1.0)
+        rows.append(row)
+    return rows
+
+
+def _set_jaccard(left: frozenset, right: frozenset) -> float:
+    union = len(left | right)
+    return len(left & right) / union if union else 1.0
+
+
+def _length_factors(candidates: Sequence[str], references: Sequence[str], exponent: float) -> List[List[float]]:
+    factors = []
+    for candidate in candidates:
+        row = []
+        for reference in references:
+            longest = max(len(candidate), len(reference))
+            row.append((min(len(candidate), len(reference)) / longest) ** exponent if longest else 1.0)
+        factors.append(row)
+    return factors
+
+
+def score_matrix(
+    candidates: Sequence[str],
+    references: Sequence[Any],
+    method: str = 'cosine',
+    ngram_size: int = DEFAULT_NGRAM_SIZE,
+    dimensions: int = DEFAULT_DIMENSIONS,
+    length_penalty: float = 0.0
+) -> Any:
+    """Score every candidate against every reference.
+
+    Returns a NumPy array when NumPy is installed and nested lists otherwise;
+    both index as ``matrix[candidate][reference]``. ``method`` may also be a
+    metric name such as ``levenshtein_distance``. ``references`` may be plain
+    strings or prepared references (see `opik_reference_index`), whose cached
+    normalized text and n-gram counts are used as-is.
+    """
+    if method not in VECTOR_METHODS and method not in SCORERS:
+        method = scorer_name_for(method)
+    candidates = [normalize(text) for text in candidates]
+
+    if method in VECTOR_METHODS:
+        left = _text_vectors(candidates, ngram_size, dimensions)
+        right = _text_vectors(references, ngram_size, dimensions)
+        if np is not None:
+            matrix = _vector_matrix_numpy(left, right, method, dimensions)
+        else:
+            matrix = _vector_matrix_python(left, right, method)
+    elif method == 'token':
+        left_sets = [frozenset(candidate.split()) for candidate in candidates]
+        right_sets = [getattr(ref, 'token_set', None) or frozenset(_normalized(ref).split()) for ref in references]
+        matrix = [[_set_jaccard(tokens, other) for other in right_sets] for tokens in left_sets]
+    else:
+        scorer = SCORERS[method]
+        matrix = [
+            [scorer(candidate, _normalized(reference)) for reference in references]
+            for candidate in candidates
+        ]
+    if np is not None and not hasattr(matrix, 'shape'):
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(len(candidates), len(references))
+
+    references = [_normalized(text) for text in references]
+
+    if length_penalty:
+        factors = _length_factors(candidates, references, length_penalty)
+        if np is not None:
+            matrix = matrix * np.asarray(factors, dtype=np.float32).reshape(len(candidates), len(references))
+        else:
+            matrix = [[score * factor for score, factor in zip(row, frow)] for row, frow in zip(matrix, factors)]
+    return matrix
+
+
+def score_pair(
+    candidate: str,
+    reference: Any,
+    method: str = 'cosine',
+    ngram_size: int = DEFAULT_NGRAM_SIZE,
+    dimensions: int = DEFAULT_DIMENSIONS,
+    length_penalty: float = 0.0
+) -> float:
+    """Score one candidate against one reference, with the same options as `score_matrix`.
+
+    Scores the pair directly (vector methods on the sparse n-gram counts)
+    rather than building a 1 x 1 matrix and its dense ``dimensions``-wide rows.
+    """
+    if method not in VECTOR_METHODS and method not in SCORERS:
+        method = scorer_name_for(method)
+    candidate = normalize(candidate)
+
+    if method in VECTOR_METHODS:
+        left = _text_vectors([candidate], ngram_size, dimensions)
+        right = _text_vectors([reference], ngram_size, dimensions)
+        score = _vector_matrix_python(left, right, method)[0][0]
+    elif method == 'token':
+        tokens = getattr(reference, 'token_set', None) or frozenset(_normalized(reference).split())
+        score = _set_jaccard(frozenset(candidate.split()), tokens)
+    else:
+        score = SCORERS[method](candidate, _normalized(reference))
+
+    if length_penalty:
+        score *= _length_factors([candidate], [_normalized(reference)], length_penalty)[0][0]
+    return float(score)
+
+
+def rank_candidates(matrix: Any, weights: Optional[Sequence[float]] = None) -> List[Tuple[int, float]]:
+    """Return ``(candidate_index, mean_score)`` pairs, best first."""
+    if np is not None:
+        array = np.asarray(matrix, dtype=np.float64)
+        if array.size == 0:
+            return [(idx, 0.0) for idx in range(array.shape[0])] if array.ndim == 2 else []
+        means = np.average(array, axis=1, weights=weights)
+        order = np.argsort(-means, kind='stable')
+        return [(int(idx), float(means[idx])) for idx in order]
+
+    means = []
+    for idx, row in enumerate(matrix):
+        if not row:
+            means.append((idx, 0.0))
+            continue
+        row_weights = weights or [1.0] * len(row)
+        means.append((idx, sum(s * w for s, w in zip(row, row_weights)) / sum(row_weights)))
+    return sorted(means, key=lambda pair: -pair[1])
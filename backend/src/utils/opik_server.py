@@ -0,0 +1,238 @@
+"""Prefork worker pool that serves opik_runner requests over a Unix socket.
+
+The parent imports the logging and optimizer modules once, then forks workers
+that inherit those pages copy-on-write. Workers accept connections on a shared
+listening socket and speak the same NDJSON protocol (and execution lanes) as
+``opik_runner --serve``, after a first ``{"workers": N}`` line giving the pool
+size. Opik clients are created lazily, so every worker opens its own
+connections after the fork instead of sharing the parent's sockets.
+"""
+
+import atexit
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+DEFAULT_MAX_REQUESTS = 1000
+DEFAULT_STOP_TIMEOUT = 10.0
+DEFAULT_RESPAWN_BACKOFF = 0.1
+DEFAULT_MAX_RESPAWN_BACKOFF = 30.0
+
+
+def _env_number(key: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+def _default_worker_count() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def _bind_socket(socket_path: str) -> socket.socket:
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    listener.listen(128)
+    return listener
+
+
+def _worker_loop(
+    listener: socket.socket,
+    serve_lines: Callable[..., int],
+    max_requests: int,
+    worker_count: int
+) -> None:
+    """Serve connections until ``max_requests`` requests have been answered or SIGTERM arrives."""
+    state: Dict[str, Any] = {'stopping': False, 'conn': None}
+
+    def _stop(_signum, _frame):
+        # Idle in accept(): leave right away. Mid-connection: stop reading so
+        # in-flight requests finish, then leave. Either way the caller's
+        # finally block runs the atexit flush of traces and the spool.
+        state['stopping'] = True
+        conn = state['conn']
+        if conn is None:
+            raise SystemExit(0)
+        try:
+            conn.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    handled = 0
+
+    while handled < max_requests and not state['stopping']:
+        conn, _ = listener.accept()
+        state['conn'] = conn
+        write_lock = threading.Lock()
+
+        def _emit(payload: Dict[str, Any]) -> None:
+            data = (json.dumps(payload, default=str) + '\n').encode('utf-8')
+            with write_lock:
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    pass  # client went away; nothing left to answer
+
+        # A worker owns its connection until the client closes it, so clients
+        # learn the pool size up front and keep at most that many connections.
+        _emit({'workers': worker_count})
+        # Stops reading once the budget is used up and returns after in-flight
+        # requests finish; closing the connection lets the client reconnect to
+        # a fresh worker. ``closing`` tells the client that every request it
+        # has not been answered for was never read, so it is safe to resend.
+        with conn, conn.makefile('r', encoding='utf-8') as reader:
+            handled += serve_lines(reader, _emit, max_requests - handled)
+            _emit({'closing': True})
+        state['conn'] = None
+
+
+def _spawn_worker(
+    listener: socket.socket,
+    serve_lines: Callable[..., int],
+    max_requests: int,
+    worker_count: int
+) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    exit_code = 0
+    try:
+        _worker_loop(listener, serve_lines, max_requests, worker_count)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    except Exception as exc:  # pragma: no cover - keep the pool alive
+        sys.stderr.write(f'[opik_server] worker {os.getpid()} crashed: {exc}\n')
+        exit_code = 1
+    finally:
+        # os._exit skips atexit, so flush buffered traces explicitly first.
+        atexit._run_exitfuncs()
+        sys.stderr.flush()
+        os._exit(exit_code)
+
+
+def _next_backoff(current: float, status: int) -> float:
+    """Delay before replacing a worker: doubles while workers keep crashing."""
+    if os.waitstatus_to_exitcode(status) == 0:
+        return 0.0  # recycled after ``max_requests``
+    ceiling = _env_number('OPIK_SERVER_MAX_RESPAWN_BACKOFF', DEFAULT_MAX_RESPAWN_BACKOFF)
+    return min(ceiling, current * 2 if current else DEFAULT_RESPAWN_BACKOFF)
+
+
+def _reap_until(children: Set[int], deadline: Optional[float]) -> bool:
+    """Reap exiting workers; returns False if some are still alive at ``deadline``."""
+    while children:
+        try:
+            pid, _status = os.waitpid(-1, os.WNOHANG if deadline is not None else 0)
+        except ChildProcessError:
+            children.clear()
+            break
+        if pid:
+            children.discard(pid)
+            continue
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def serve_prefork(
+    serve_lines: Callable[..., int],
+    preload: Callable[[], None],
+    socket_path: str,
+    workers: Optional[int] = None,
+    max_requests: Optional[int] = None
+) -> None:
+    """Run the prefork pool until SIGTERM/SIGINT, recycling workers after ``max_requests``.
+
+    On shutdown workers get SIGTERM and ``OPIK_SERVER_STOP_TIMEOUT`` seconds to
+    finish in-flight requests and flush their traces before they are killed.
+    """
+    if not hasattr(os, 'fork'):
+        raise RuntimeError('Prefork mode requires a platform with os.fork (Linux/macOS)')
+
+    worker_count = workers if isinstance(workers, int) and workers > 0 else _default_worker_count()
+    request_limit = max_requests if isinstance(max_requests, int) and max_requests > 0 else DEFAULT_MAX_REQUESTS
+
+    preload()
+    listener = _bind_socket(socket_path)
+
+    # Move everything imported so far out of the collector's generations so the
+    # children don't dirty shared pages when the GC walks them.
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    children = set()
+    stopping = False
+    kill_deadline = 0.0
+    backoff = 0.0
+
+    def _stop(_signum, _frame):
+        nonlocal stopping, kill_deadline
+        if not stopping:
+            kill_deadline = time.monotonic() + _env_number('OPIK_SERVER_STOP_TIMEOUT', DEFAULT_STOP_TIMEOUT)
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                children.discard(pid)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    try:
+        for _ in range(worker_count):
+            children.add(_spawn_worker(listener, serve_lines, request_limit, worker_count))
+
+        sys.stderr.write(
+            f'[opik_server] listening on {socket_path} with {worker_count} workers '
+            f'(recycle after {request_limit} requests)\n'
+        )
+        sys.stderr.flush()
+
+        while children:
+            if stopping:
+                # Workers flush traces on SIGTERM; give them until the deadline.
+                if not _reap_until(children, kill_deadline):
+                    for pid in list(children):
+                        try:
+                            os.kill(pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            children.discard(pid)
+                    _reap_until(children, None)
+                break
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            children.discard(pid)
+            # A worker that crashes on startup would otherwise be respawned in
+            # a tight loop; wait (interruptibly) before replacing it.
+            backoff = _next_backoff(backoff, status)
+            resume_at = time.monotonic() + backoff
+            while not stopping and time.monotonic() < resume_at:
+                time.sleep(min(0.05, backoff))
+            if not stopping:
+                children.add(_spawn_worker(listener, serve_lines, request_limit, worker_count))
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,55 @@
+"""Dataset items shared with worker processes through shared memory.
+
+`run_optimizer_suite` loads every distinct dataset once in the parent and
+publishes it here as one JSON-encoded ``multiprocessing.shared_memory`` block.
+Workers receive only the small handle (segment name and size) and decode the
+items straight from the mapped buffer, so neither the download nor the
+parent-to-worker pickling is repeated per optimizer job.
+"""
+
+import hashlib
+import json
+from multiprocessing import shared_memory
+from typing import Any, Dict, List
+
+
+class SharedDatasets:
+    """Owner of the shared-memory segments published for one suite run."""
+
+    def __init__(self):
+        self._segments: List[shared_memory.SharedMemory] = []
+
+    def publish(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        data = json.dumps(items, default=str, separators=(',', ':')).encode('utf-8')
+        segment = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        segment.buf[:len(data)] = data
+        self._segments.append(segment)
+        # Same encoding as the dataset cache, so this is its content digest.
+        digest = hashlib.sha256(data).hexdigest()
+        return {'name': segment.name, 'size': len(data), 'items': len(items), 'digest': digest}
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:  # pragma: no cover - already removed
+                pass
+        self._segments = []
+
+    def __enter__(self) -> 'SharedDatasets':
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+
+def read_shared(handle: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Decode the items behind a handle returned by `SharedDatasets.publish`."""
+    # Workers share the parent's resource tracker, and the parent unlinks the
+    # segment once the suite is done, so attaching needs no extra bookkeeping.
+    segment = shared_memory.SharedMemory(name=handle['name'])
+    try:
+        return json.loads(bytes(segment.buf[:handle['size']]))
+    finally:
+        segment.close()
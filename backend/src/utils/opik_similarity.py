@@ -0,0 +1,237 @@
+"""Text similarity scorers used by the optimizer's lexical metrics.
+
+Every scorer takes two strings and returns a similarity in ``[0, 1]``:
+
+* ``indel``       -- ``2 * LCS / (len(a) + len(b))``, the same ratio
+                     ``difflib.SequenceMatcher`` approximates, computed with a
+                     bit-parallel LCS in O(len(a) * len(b) / wordsize)
+* ``levenshtein`` -- ``1 - distance / max(len(a), len(b))`` using Myers'
+                     bit-parallel edit distance
+* ``token``       -- Jaccard overlap of whitespace tokens
+* ``ngram``       -- Dice overlap of character trigrams
+
+When the optional ``rapidfuzz`` package is installed its C implementations are
+used for the edit-distance scorers. Each scorer accepts ``min_score`` and
+returns 0.0 without doing the full computation when a cheap length-based upper
+bound already rules the pair out; `rank` uses the same bounds to skip
+candidates that cannot beat the current best.
+"""
+
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from rapidfuzz.distance import Indel as _rf_indel, Levenshtein as _rf_levenshtein
+except ImportError:  # pragma: no cover - optional accelerator
+    _rf_indel = None
+    _rf_levenshtein = None
+
+Scorer = Callable[..., float]
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase and collapse whitespace."""
+    if not text:
+        return ''
+    return _WHITESPACE.sub(' ', text.lower()).strip()
+
+
+def _char_masks(text: str) -> Dict[str, int]:
+    masks: Dict[str, int] = {}
+    for position, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def lcs_length(a: str, b: str) -> int:
+    """Length of the longest common subsequence (bit-parallel, Hyyrö 2004)."""
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return 0
+    masks = _char_masks(a)
+    full = (1 << len(a)) - 1
+    row = full
+    for char in b:
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(a) - bin(row).count('1')
+
+
+def levenshtein_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Edit distance between ``a`` and ``b`` (Myers' bit-parallel algorithm).
+
+    With ``max_distance`` set, any result above it is reported as
+    ``max_distance + 1`` and obviously distant pairs skip the computation.
+    """
+    if max_distance is not None and abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if _rf_levenshtein is not None:
+        distance = _rf_levenshtein.distance(a, b, score_cutoff=max_distance)
+        return distance if max_distance is None or distance <= max_distance else max_distance + 1
+
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    masks = _char_masks(a)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    positive, negative, score = full, 0, len(a)
+    for char in b:
+        eq = masks.get(char, 0)
+        xv = eq | negative
+        xh = (((eq & positive) + positive) ^ positive) | eq
+        horizontal_pos = negative | (~(xh | positive) & full)
+        horizontal_neg = positive & xh
+        if horizontal_pos & last:
+            score += 1
+        elif horizontal_neg & last:
+            score -= 1
+        horizontal_pos = ((horizontal_pos << 1) | 1) & full
+        horizontal_neg = (horizontal_neg << 1) & full
+        positive = horizontal_neg | (~(xv | horizontal_pos) & full)
+        negative = horizontal_pos & xv
+
+    if max_distance is not None and score > max_distance:
+        return max_distance + 1
+    return score
+
+
+def indel_similarity(a: str, b: str, min_score: float = 0.0) -> float:
+    total = len(a) + len(b)
+    if not total:
+        return 1.0
+    if min_score and 2 * min(len(a), len(b)) / total < min_score:
+        return 0.0
+    if _rf_indel is not None:
+        score = _rf_indel.normalized_similarity(a, b)
+    else:
+        score = 2 * lcs_length(a, b) / total
+    return score if score >= min_score else 0.0
+
+
+def levenshtein_similarity(a: str, b: str, min_score: float = 0.0) -> float:
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    max_distance = int((1.0 - min_score) * longest) if min_score else None
+    distance = levenshtein_distance(a, b, max_distance)
+    score = 1.0 - distance / longest
+    return score if score >= min_score else 0.0
+
+
+def _ngrams(text: str, size: int) -> Counter:
+    padded = f' {text} '
+    if len(padded) < size:
+        return Counter([padded])
+    return Counter(padded[idx:idx + size] for idx in range(len(padded) - size + 1))
+
+
+def token_similarity(a: str, b: str, min_score: float = 0.0) -> float:
+    left, right = set(a.split()), set(b.split())
+    if not left and not right:
+        return 1.0
+    if min_score and min(len(left), len(right)) / max(len(left), len(right)) < min_score:
+        return 0.0
+    score = len(left & right) / len(left | right)
+    return score if score >= min_score else 0.0
+
+
+def ngram_similarity(a: str, b: str, min_score: float = 0.0, size: int = 3) -> float:
+    if not a and not b:
+        return 1.0
+    # n-gram counts of the padded strings are len + 3 - size; Dice is bounded by their ratio.
+    count_a, count_b = max(1, len(a) + 3 - size), max(1, len(b) + 3 - size)
+    if min_score and 2 * min(count_a, count_b) / (count_a + count_b) < min_score:
+        return 0.0
+    left, right = _ngrams(a, size), _ngrams(b, size)
+    overlap = sum((left & right).values())
+    score = 2 * overlap / (sum(left.values()) + sum(right.values()))
+    return score if score >= min_score else 0.0
+
+
+def upper_bound(scorer_name: str, a: str, b: str) -> float:
+    """Cheap upper bound of ``get_scorer(scorer_name)(a, b)`` from lengths only."""
+    if scorer_name == 'token':
+        left, right = len(set(a.split())), len(set(b.split()))
+        return min(left, right) / max(left, right) if max(left, right) else 1.0
+    longest, shortest = max(len(a), len(b)), min(len(a), len(b))
+    if not longest:
+        return 1.0
+    if scorer_name == 'levenshtein':
+        return shortest / longest
+    return 2 * shortest / (longest + shortest)
+
+
+SCORERS: Dict[str, Scorer] = {
+    'indel': indel_similarity,
+    'levenshtein': levenshtein_similarity,
+    'token': token_similarity,
+    'ngram': ngram_similarity
+}
+
+# Metric names accepted by _resolve_metric, mapped to a scorer (``cosine`` and
+# ``jaccard`` are the hashed n-gram vector methods in opik_scoring).
+METRIC_ALIASES: Dict[str, str] = {
+    'lexical_similarity': 'indel',
+    'indel_similarity': 'indel',
+    'levenshtein': 'levenshtein',
+    'levenshtein_distance': 'levenshtein',
+    'levenshtein_similarity': 'levenshtein',
+    'edit_distance': 'levenshtein',
+    'token_similarity': 'token',
+    'token_jaccard': 'token',
+    'jaccard': 'token',
+    'ngram_similarity': 'ngram',
+    'char_ngram': 'ngram',
+    'trigram': 'ngram',
+    'cosine': 'cosine',
+    'ngram_cosine': 'cosine',
+    'ngram_jaccard': 'jaccard'
+}
+
+
+def scorer_name_for(metric_name: Optional[str]) -> str:
+    """Scorer used for ``metric_name``; unknown names fall back to ``indel``."""
+    return METRIC_ALIASES.get((metric_name or '').strip().lower(), 'indel')
+
+
+def get_scorer(name: str) -> Scorer:
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise ValueError(f'Unknown similarity scorer "{name}"; use one of {sorted(SCORERS)}') from None
+
+
+def rank(
+    query: str,
+    candidates: Iterable[str],
+    scorer_name: str = 'indel',
+    limit: int = 1,
+    min_score: float = 0.0
+) -> List[Tuple[int, float]]:
+    """Return the ``limit`` best ``(index, score)`` pairs for ``query``.
+
+    Candidates whose upper bound cannot beat the current ``limit``-th score are
+    skipped without being scored.
+    """
+    scorer = get_scorer(scorer_name)
+    query = normalize(query)
+    best: List[Tuple[int, float]] = []
+    for index, candidate in enumerate(candidates):
+        candidate = normalize(candidate)
+        floor = best[-1][1] if len(best) >= limit else min_score
+        if upper_bound(scorer_name, query, candidate) < max(floor, min_score):
+            continue
+        score = scorer(query, candidate, min_score=max(floor, min_score))
+        if score < min_score or (len(best) >= limit and score <= floor):
+            continue
+        best.append((index, score))
+        best.sort(key=lambda pair: -pair[1])
+        del best[limit:]
+    return best
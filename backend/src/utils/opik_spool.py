@@ -0,0 +1,360 @@
+"""Durable on-disk spool that traces pass through before reaching Opik.
+
+Traces are appended to segment files as checksummed records, one write and one
+fsync per batch. A background shipper claims sealed segments, sends their
+records to Opik in order, remembers its progress in an ``.ack`` file and
+deletes the segment once every record has been acknowledged. Logging latency
+therefore only depends on the local disk, and an Opik outage just lets
+segments pile up until ``max_bytes`` is reached, after which the oldest
+segments are discarded.
+
+Segment lifecycle::
+
+    <ns>-<pid>.open   -> being appended to by process <pid>
+    <ns>-<pid>.seg    -> sealed, waiting for a shipper
+    <ns>-<pid>.seg.<shipper-pid>.claim (+ .ack) -> being shipped
+
+Claims are taken with an atomic rename, so several processes (e.g. prefork
+workers) can share one spool directory without double-shipping.
+"""
+
+import atexit
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_HEADER = struct.Struct('>II')  # payload length, crc32
+
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_SEAL_SECONDS = 1.0
+DEFAULT_SHIP_BATCH = 200
+DEFAULT_EXIT_DRAIN_SECONDS = 2.0
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    payload = json.dumps(record, default=str, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def iter_records(path: str, offset: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield ``(end_offset, record)`` pairs, stopping at the first torn or corrupt record."""
+    with open(path, 'rb') as handle:
+        handle.seek(offset)
+        position = offset
+        while True:
+            header = handle.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, checksum = _HEADER.unpack(header)
+            payload = handle.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                sys.stderr.write(f'[opik] spool segment {os.path.basename(path)} is corrupt at byte {position}\n')
+                return
+            position += _HEADER.size + length
+            try:
+                yield position, json.loads(payload)
+            except ValueError:
+                continue
+
+
+class TraceSpool:
+    """Append-only segment spool with a background shipper."""
+
+    def __init__(
+        self,
+        directory: str,
+        ship: Callable[[List[Dict[str, Any]]], None],
+        segment_bytes: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        seal_seconds: Optional[float] = None,
+        fsync: Optional[bool] = None
+    ):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._ship = ship
+        self.segment_bytes = segment_bytes or int(_env_float('OPIK_TRACE_SPOOL_SEGMENT_BYTES', DEFAULT_SEGMENT_BYTES))
+        self.max_bytes = max_bytes or int(_env_float('OPIK_TRACE_SPOOL_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.seal_seconds = seal_seconds if seal_seconds is not None else _env_float(
+            'OPIK_TRACE_SPOOL_SEAL_SECONDS', DEFAULT_SEAL_SECONDS
+        )
+        self.fsync = fsync if fsync is not None else os.environ.get('OPIK_TRACE_SPOOL_FSYNC', 'true').lower() != 'false'
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._handle = None
+        self._active_path: Optional[str] = None
+        self._active_opened = 0.0
+        self._active_bytes = 0
+        self._owner_pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.appended = 0
+        self.shipped = 0
+        self.discarded = 0
+        self.ship_failures = 0
+        self.last_error: Optional[str] = None
+
+        self._recover_orphans()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------ writer
+
+    def append(self, batch: List[Dict[str, Any]]) -> None:
+        """Durably append ``batch`` (one write + one fsync) and wake the shipper."""
+        if not batch:
+            return
+        data = b''.join(encode_record(record) for record in batch)
+
+        with self._lock:
+            self._reset_after_fork()
+            if self._handle is None or self._active_bytes >= self.segment_bytes:
+                self._rotate_locked()
+            self._handle.write(data)
+            self._handle.flush()
+            if self.fsync:
+                os.fsync(self._handle.fileno())
+            self._active_bytes += len(data)
+            self.appended += len(batch)
+
+        self._ensure_shipper()
+        self._wake.set()
+
+    def _reset_after_fork(self) -> None:
+        pid = os.getpid()
+        if self._owner_pid == pid:
+            return
+        # A forked child must not append to the parent's open segment.
+        self._handle = None
+        self._active_path = None
+        self._active_bytes = 0
+        self._thread = None
+        self._owner_pid = pid
+
+    def _rotate_locked(self) -> None:
+        self._seal_locked()
+        name = f'{time.time_ns():020d}-{os.getpid()}.open'
+        self._active_path = os.path.join(self.directory, name)
+        self._handle = open(self._active_path, 'ab')
+        self._active_opened = time.monotonic()
+        self._active_bytes = 0
+
+    def _seal_locked(self) -> None:
+        if self._handle is None:
+            return
+        self._handle.close()
+        self._handle = None
+        if self._active_bytes:
+            os.replace(self._active_path, self._active_path[:-len('.open')] + '.seg')
+        else:
+            os.unlink(self._active_path)
+        self._active_path = None
+        self._active_bytes = 0
+
+    def _seal_if_idle(self) -> None:
+        with self._lock:
+            if self._owner_pid != os.getpid() or self._handle is None or not self._active_bytes:
+                return
+            if time.monotonic() - self._active_opened >= self.seal_seconds:
+                self._seal_locked()
+
+    # ----------------------------------------------------------------- shipper
+
+    def _recover_orphans(self) -> None:
+        """Seal ``.open`` segments and release claims left behind by dead processes."""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith('.open'):
+                    pid = int(name[:-len('.open')].rsplit('-', 1)[1])
+                    if not _pid_alive(pid):
+                        os.replace(path, path[:-len('.open')] + '.seg')
+                elif name.endswith('.claim'):
+                    pid = int(name.rsplit('.', 2)[1])
+                    if not _pid_alive(pid):
+                        original = name.rsplit('.', 2)[0]
+                        os.replace(path, os.path.join(self.directory, original))
+                        if os.path.exists(path + '.ack'):
+                            os.replace(path + '.ack', os.path.join(self.directory, original + '.ack'))
+            except (ValueError, IndexError, OSError):
+                continue
+
+    def _ensure_shipper(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._ship_loop, name='opik-trace-spool', daemon=True)
+        self._thread.start()
+
+    def _sealed_segments(self) -> List[str]:
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.seg'))
+        except OSError:
+            return []
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _claim(self, path: str) -> Optional[str]:
+        claimed = f'{path}.{os.getpid()}.claim'
+        try:
+            os.replace(path, claimed)
+        except FileNotFoundError:
+            return None  # another shipper got there first
+        if os.path.exists(path + '.ack'):
+            os.replace(path + '.ack', claimed + '.ack')
+        return claimed
+
+    def _release(self, claimed: str) -> None:
+        original = claimed.rsplit('.', 2)[0]
+        try:
+            os.replace(claimed, original)
+            if os.path.exists(claimed + '.ack'):
+                os.replace(claimed + '.ack', original + '.ack')
+        except OSError:
+            pass
+
+    @staticmethod
+    def _read_ack(claimed: str) -> int:
+        try:
+            with open(claimed + '.ack', 'r', encoding='utf-8') as handle:
+                return int(handle.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def _write_ack(claimed: str, offset: int) -> None:
+        tmp_path = claimed + '.ack.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            handle.write(str(offset))
+        os.replace(tmp_path, claimed + '.ack')
+
+    def _ship_segment(self, claimed: str) -> None:
+        offset = self._read_ack(claimed)
+        batch: List[Dict[str, Any]] = []
+        for end_offset, record in iter_records(claimed, offset):
+            batch.append(record)
+            if len(batch) >= DEFAULT_SHIP_BATCH:
+                self._ship(batch)
+                self.shipped += len(batch)
+                self._write_ack(claimed, end_offset)
+                batch = []
+            offset = end_offset
+        if batch:
+            self._ship(batch)
+            self.shipped += len(batch)
+
+        os.unlink(claimed)
+        if os.path.exists(claimed + '.ack'):
+            os.unlink(claimed + '.ack')
+
+    def _enforce_disk_budget(self) -> None:
+        segments = self._sealed_segments()
+        sizes = []
+        for path in segments:
+            try:
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                sizes.append(0)
+        total = sum(sizes)
+        for path, size in zip(segments, sizes):
+            if total <= self.max_bytes:
+                return
+            claimed = self._claim(path)
+            if claimed is None:
+                continue
+            dropped = sum(1 for _ in iter_records(claimed, self._read_ack(claimed)))
+            for target in (claimed, claimed + '.ack'):
+                if os.path.exists(target):
+                    os.unlink(target)
+            self.discarded += dropped
+            total -= size
+            sys.stderr.write(f'[opik] spool over {self.max_bytes} bytes; discarded {dropped} traces\n')
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Ship every sealed segment now; returns False on a ship failure or timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            if self._owner_pid == os.getpid():
+                self._seal_locked()
+        for path in self._sealed_segments():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            claimed = self._claim(path)
+            if claimed is None:
+                continue
+            try:
+                self._ship_segment(claimed)
+            except Exception as exc:  # pragma: no cover - keep data on disk for retry
+                self.ship_failures += 1
+                self.last_error = str(exc)
+                self._release(claimed)
+                return False
+        return True
+
+    def _ship_loop(self) -> None:
+        backoff = 0.5
+        while not self._closed:
+            self._wake.wait(self.seal_seconds or DEFAULT_SEAL_SECONDS)
+            self._wake.clear()
+            self._seal_if_idle()
+            self._enforce_disk_budget()
+            if self.drain():
+                backoff = 0.5
+                continue
+            # Backend is slow or down: leave segments on disk and retry later.
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        try:
+            self.drain(_env_float('OPIK_TRACE_SPOOL_EXIT_DRAIN_SECONDS', DEFAULT_EXIT_DRAIN_SECONDS))
+        except Exception:  # pragma: no cover - spool stays on disk for the next process
+            pass
+        self._closed = True
+        with self._lock:
+            if self._owner_pid == os.getpid():
+                self._seal_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self._sealed_segments()
+        pending_bytes = 0
+        for path in segments:
+            try:
+                pending_bytes += os.path.getsize(path)
+            except OSError:
+                continue
+        return {
+            'directory': self.directory,
+            'segments': len(segments),
+            'pending_bytes': pending_bytes,
+            'appended': self.appended,
+            'shipped': self.shipped,
+            'discarded': self.discarded,
+            'ship_failures': self.ship_failures,
+            'last_error': self.last_error
+        }
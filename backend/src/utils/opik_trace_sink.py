@@ -0,0 +1,182 @@
+"""Bounded, batching trace buffer shared by the Opik logging modules.
+
+Callers hand traces to `TraceSink.submit`, which only enqueues and returns. A
+daemon thread groups queued traces into batches (by size or time window) and
+passes each batch to the ``ship`` callable. The queue is bounded; when it is
+full new traces are dropped and counted rather than blocking the caller.
+"""
+
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 0.25
+DEFAULT_MAX_QUEUE = 10000
+
+
+def _env_number(key: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+class TraceSink:
+    """Queue traces and ship them from a background thread in batches."""
+
+    def __init__(
+        self,
+        ship: Callable[[List[Dict[str, Any]]], None],
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        name: str = 'opik-trace-sink'
+    ):
+        self._ship = ship
+        self.batch_size = batch_size or int(_env_number('OPIK_TRACE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+        self.flush_interval = flush_interval or _env_number('OPIK_TRACE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self._queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(
+            maxsize=max_queue or int(_env_number('OPIK_TRACE_MAX_QUEUE', DEFAULT_MAX_QUEUE))
+        )
+        self._name = name
+        self._lock = threading.Condition()
+        self._flush_requested = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        self._closed = False
+        self._atexit_registered = False
+        self._unshipped = 0
+        self.submitted = 0
+        self.dropped = 0
+        self.shipped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, trace: Dict[str, Any]) -> bool:
+        """Enqueue ``trace`` without blocking; returns False when it was dropped."""
+        if self._closed:
+            self.dropped += 1
+            return False
+
+        self._ensure_thread()
+        with self._lock:
+            try:
+                self._queue.put_nowait(trace)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self._unshipped += 1
+            self.submitted += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Ship everything queued so far; returns False if ``timeout`` expired first."""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain_inline()
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._flush_requested.set()
+        with self._lock:
+            while self._unshipped > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self._queue.qsize(),
+            'submitted': self.submitted,
+            'shipped': self.shipped,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval
+        }
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._owner_pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._owner_pid == pid and self._thread.is_alive():
+                return
+            # Threads don't survive fork, so a forked worker starts its own flusher.
+            self._owner_pid = pid
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._flush_requested.is_set():
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _ship_batch(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self._ship(batch)
+            self.shipped += len(batch)
+            self.batches += 1
+        except Exception as exc:  # pragma: no cover - never let tracing break the caller
+            self.failed += len(batch)
+            sys.stderr.write(f'[opik] trace batch of {len(batch)} failed: {exc}\n')
+        finally:
+            with self._lock:
+                self._unshipped -= len(batch)
+                if self._unshipped <= 0:
+                    self._flush_requested.clear()
+                self._lock.notify_all()
+
+    def _drain_inline(self) -> None:
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._ship_batch(batch)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._ship_batch(batch)
@@ -6,15 +6,73 @@ Provides Python-based Opik tracing that Node.js backend can call via child_proce
 import os
 import sys
 import json
+import threading
 from datetime import datetime
-from opik import track, Opik
+from opik import track
 from opik.integrations.openai import track_openai
 
-# Initialize Opik client
-client = Opik(project_name="Tenax", workspace="Tenax")
+from opik_clients import get_client
+from opik_trace_sink import TraceSink
 
-# Track OpenAI calls automatically
-track_openai()
+_openai_tracked = False
+_openai_lock = threading.Lock()
+_trace_sink = None
+
+
+def _ensure_openai_tracked():
+    """Turn on OpenAI call tracking the first time the wrapper API is used.
+
+    Runs on the caller's thread, before any OpenAI call the action makes, rather
+    than when the trace sink first ships a batch in the background.
+    """
+    global _openai_tracked
+    if _openai_tracked:
+        return
+    with _openai_lock:
+        if _openai_tracked:
+            return
+        try:
+            # Track OpenAI calls automatically
+            track_openai()
+        except Exception as exc:
+            # Tracing must never break the action being logged.
+            sys.stderr.write(f"[opik_wrapper] OpenAI tracking unavailable: {exc}\n")
+        _openai_tracked = True
+
+
+def _get_client():
+    """Return the shared Opik client for the Tenax project."""
+    return get_client("Tenax", "Tenax")
+
+
+def _ship_actions(batch):
+    """Record each queued agent action as an Opik trace, then wait for the upload."""
+    client = _get_client()
+    for action in batch:
+        metadata = dict(action.get("metadata") or {})
+        metadata.update(status=action.get("status"), timestamp=action.get("timestamp"))
+        error_info = None
+        if action.get("error"):
+            error_info = {"exception_type": "AgentActionError", "message": str(action["error"]), "traceback": ""}
+        client.trace(
+            name=action.get("action"),
+            start_time=datetime.fromisoformat(action["timestamp"]),
+            input=action.get("input"),
+            output=action.get("output"),
+            metadata=metadata,
+            project_name="Tenax",
+            error_info=error_info
+        )
+    if not client.flush():
+        raise RuntimeError(f"Opik did not accept {len(batch)} agent-action traces")
+
+
+def _get_trace_sink():
+    """Batch agent-action traces so each upload carries many of them."""
+    global _trace_sink
+    if _trace_sink is None:
+        _trace_sink = TraceSink(_ship_actions, name='opik-agent-action-sink')
+    return _trace_sink
 
 @track(name="agent_action", project_name="Tenax")
 def log_agent_action(action_name, metadata, input_data, output_data, status="success", error=None):
@@ -29,6 +87,7 @@ def log_agent_action(action_name, metadata, input_data, output_data, status="suc
         status: success/error
         error: Error message if failed
     """
+    _ensure_openai_tracked()
     trace_data = {
         "action": action_name,
         "timestamp": datetime.now().isoformat(),
@@ -41,8 +100,8 @@ def log_agent_action(action_name, metadata, input_data, output_data, status="suc
     if error:
         trace_data["error"] = error
     
-    # Log to Opik
-    client.log_traces([trace_data])
+    # Queue for Opik; the sink ships batches in the background and on exit
+    _get_trace_sink().submit(trace_data)
     
     return trace_data
 
@@ -52,6 +111,7 @@ def evaluate_message_quality(message, context):
     Evaluate message quality using LLM-as-Judge
     Will be implemented in Phase 2
     """
+    _ensure_openai_tracked()
     # Placeholder for Phase 2
     return {
         "tone_score": None,
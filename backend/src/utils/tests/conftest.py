@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The helper modules import each other as flat siblings (that is how the
+# runner executes them), so the tests put this directory on the path too.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,202 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason='the bridge needs node')
+
+_UTILS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A stand-in for ``opik_runner.py --serve``: answers with its pid and dies on
+# the ``crash`` function.
+_SERVE_RUNNER = textwrap.dedent('''
+    import json, os, sys
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request['function'] == 'crash':
+            os._exit(1)
+        print(json.dumps({'id': request['id'], 'result': {'pid': os.getpid()}}), flush=True)
+''')
+
+# A runner that exits before reading anything, like one failing at import.
+_DEAF_RUNNER = 'import sys\nsys.exit(1)\n'
+
+
+# Streams two progress lines before the answer when asked to, one-shot (the
+# ``--progress`` flag) and under ``--serve`` (the request's ``progress`` field).
+_PROGRESS_RUNNER = textwrap.dedent('''
+    import json, sys
+
+    def progress(event, **route):
+        print(json.dumps({**route, 'progress': {'event': event}}), flush=True)
+
+    if sys.argv[1:] == ['--serve']:
+        for line in sys.stdin:
+            request = json.loads(line)
+            if request.get('progress'):
+                progress('started', id=request['id'])
+                progress('finished', id=request['id'])
+            print(json.dumps({'id': request['id'], 'result': {'asked': bool(request.get('progress'))}}), flush=True)
+    else:
+        asked = '--progress' in sys.argv
+        if asked:
+            progress('started')
+            progress('finished')
+        print(json.dumps({'asked': asked}), flush=True)
+''')
+
+
+def _drive(tmp_path, runner, body, persistent=False):
+    """Run ``body`` (async JS using ``bridge``) and return what it passes to ``done``."""
+    runner_path = tmp_path / 'runner.py'
+    runner_path.write_text(runner)
+    script = textwrap.dedent('''
+        const bridge = require({bridge});
+        bridge.runnerPath = {runner};
+        bridge.fallbackPath = {fallback};
+        bridge.persistent = {persistent};
+        const done = (value) => {{
+          console.log('RESULT ' + JSON.stringify(value));
+          process.exit(0);  // a live daemon would keep node running
+        }};
+        (async () => {{
+        {body}
+        }})();
+    ''').format(
+        bridge=json.dumps(os.path.join(_UTILS, 'opikBridge.js')), runner=json.dumps(str(runner_path)),
+        fallback=json.dumps(str(tmp_path / 'fallback.jsonl')), persistent=json.dumps(persistent), body=body
+    )
+    completed = subprocess.run(
+        ['node', '-e', script], capture_output=True, text=True, timeout=60,
+        env={**os.environ, 'OPIK_PYTHON_BIN': sys.executable}
+    )
+    assert completed.returncode == 0, completed.stderr
+    [result] = [line[len('RESULT '):] for line in completed.stdout.splitlines() if line.startswith('RESULT ')]
+    return json.loads(result)
+
+
+def _fallback_functions(tmp_path):
+    with open(tmp_path / 'fallback.jsonl') as handle:
+        return [json.loads(line)['function'] for line in handle]
+
+
+def test_daemon_is_restarted_after_it_dies(tmp_path):
+    result = _drive(tmp_path, _SERVE_RUNNER, '''
+        const first = await bridge.invoke('echo', {});
+        const crashed = await bridge.invoke('crash', {});
+        const second = await bridge.invoke('echo', {});
+        done({ first, crashed, second });
+    ''', persistent=True)
+
+    assert result['crashed'] is None
+    assert result['first']['pid'] != result['second']['pid']
+    assert _fallback_functions(tmp_path) == ['crash']
+
+
+def test_daemon_that_never_reads_does_not_crash_the_host(tmp_path):
+    result = _drive(tmp_path, _DEAF_RUNNER, '''
+        const big = 'x'.repeat(1 << 20);
+        const results = [];
+        for (let i = 0; i < 3; i += 1) {
+          results.push(await bridge.invoke('log_reminder_sent', { big }));
+        }
+        done(results);
+    ''', persistent=True)
+
+    assert result == [None, None, None]
+    assert _fallback_functions(tmp_path) == ['log_reminder_sent'] * 3
+
+
+def test_one_shot_runner_that_never_reads_falls_back(tmp_path):
+    result = _drive(tmp_path, _DEAF_RUNNER, '''
+        bridge.argvPayloadLimit = 10;  // send the payload on stdin
+        done(await bridge.invoke('log_reminder_sent', { big: 'x'.repeat(1 << 20) }));
+    ''')
+
+    assert result is None
+    assert _fallback_functions(tmp_path) == ['log_reminder_sent']
+
+
+def test_batch_whose_runner_fails_at_import_falls_back(tmp_path):
+    result = _drive(tmp_path, 'raise ImportError("opik is not installed")\n', '''
+        const big = 'x'.repeat(1 << 20);
+        done(await bridge.invokeBatch([
+          { function: 'log_reminder_sent', payload: { big } },
+          { function: 'log_task_completion', payload: { big } }
+        ]));
+    ''')
+
+    assert result is None
+    assert _fallback_functions(tmp_path) == ['log_reminder_sent', 'log_task_completion']
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='prefork needs os.fork')
+def test_socket_connections_never_outnumber_the_workers(tmp_path):
+    sock = str(tmp_path / 'runner.sock')
+    server_script = textwrap.dedent('''
+        import json, os, sys
+        sys.path.insert(0, {utils!r})
+        from opik_server import serve_prefork
+
+        def serve_lines(lines, emit, max_requests=None):
+            handled = 0
+            for line in lines:
+                emit({{'id': json.loads(line)['id'], 'result': {{'pid': os.getpid()}}}})
+                handled += 1
+            return handled
+
+        serve_prefork(serve_lines, lambda: None, {sock!r}, workers=1)
+    ''').format(utils=_UTILS, sock=sock)
+    server = subprocess.Popen([sys.executable, '-c', server_script])
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(sock):
+            assert time.monotonic() < deadline, 'the server did not start'
+            time.sleep(0.05)
+        # Asks for four connections to a one-worker pool: every call must
+        # still be answered, by that one worker.
+        result = _drive(tmp_path, _SERVE_RUNNER, '''
+            bridge.socketPath = %s;
+            bridge.socketConnections = 4;
+            const first = await bridge.invoke('echo', {});
+            const rest = await Promise.all([1, 2, 3, 4, 5].map(() => bridge.invoke('echo', {})));
+            done([first, ...rest].map((answer) => answer && answer.pid));
+        ''' % json.dumps(sock), persistent=True)
+    finally:
+        server.terminate()
+        server.wait(timeout=15)
+
+    assert len(result) == 6
+    assert None not in result
+    assert len(set(result)) == 1
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_progress_lines_go_to_on_progress_not_the_result(tmp_path, persistent):
+    result = _drive(tmp_path, _PROGRESS_RUNNER, '''
+        bridge.framedResults = false;
+        const quiet = await bridge.invoke('run_gepa_optimization', {});
+        const updates = [];
+        const heard = [];
+        const reported = await bridge.invoke('run_gepa_optimization', {}, {
+          onProgress: (update) => updates.push(update)
+        });
+        bridge.on('progress', (update) => heard.push(update.event.event));
+        const listened = await bridge.invoke('run_gepa_optimization', {});
+        done({ quiet, reported, updates, listened, heard });
+    ''', persistent=persistent)
+
+    assert result['quiet'] == {'asked': False}
+    assert result['reported'] == {'asked': True}
+    assert result['updates'] == [
+        {'function': 'run_gepa_optimization', 'event': {'event': 'started'}},
+        {'function': 'run_gepa_optimization', 'event': {'event': 'finished'}},
+    ]
+    # A 'progress' listener alone also asks the runner for events.
+    assert result['listened'] == {'asked': True}
+    assert result['heard'] == ['started', 'finished']
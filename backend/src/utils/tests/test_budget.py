@@ -0,0 +1,173 @@
+import time
+
+import pytest
+
+from opik_budget import BudgetExhausted, RunBudget, evaluating, mark_candidate
+
+
+def _completion(**kwargs):
+    return {'usage': {'total_tokens': 10}, 'messages': kwargs.get('messages')}
+
+
+def _call(budget, prompt='system prompt'):
+    messages = [{'role': 'system', 'content': prompt}, {'role': 'user', 'content': 'hi'}]
+    return budget.guard(budget.meter(_completion))(model='m', messages=messages)
+
+
+def test_call_and_token_caps_stop_the_next_call():
+    budget = RunBudget(max_calls=2)
+    _call(budget)
+    _call(budget)
+    with pytest.raises(BudgetExhausted) as excinfo:
+        _call(budget)
+    assert excinfo.value.reason == 'max_calls'
+    assert budget.report()['model_calls'] == 2
+
+    tokens = RunBudget(max_tokens=15)
+    _call(tokens)
+    _call(tokens)
+    with pytest.raises(BudgetExhausted):
+        _call(tokens)
+    assert tokens.exhausted_reason == 'max_tokens'
+
+
+def test_wall_time_cap():
+    budget = RunBudget(max_seconds=0.01)
+    time.sleep(0.02)
+    with pytest.raises(BudgetExhausted):
+        _call(budget)
+    assert budget.calls == 0
+
+
+def test_cache_hits_are_guarded_but_not_metered():
+    budget = RunBudget(max_calls=5)
+    cached = budget.guard(lambda **kwargs: {'usage': {'total_tokens': 99}})
+    cached(model='m', messages=[])
+    assert budget.calls == 0 and budget.tokens == 0
+
+
+def test_metric_scores_are_attributed_to_the_named_candidate():
+    budget = RunBudget()
+    metric = budget.track_metric(lambda item, output: 0.5 if 'good' in output else 0.1)
+
+    with evaluating('prompt A'):
+        metric({}, 'good answer')
+    with evaluating('prompt B'):
+        # A reflection call made in between does not move the credit.
+        _call(budget, 'reflect on prompt B')
+        metric({}, 'bad answer')
+    mark_candidate('prompt A')
+    _call(budget, 'mutate prompt A')
+    metric({}, 'bad answer')
+    mark_candidate(None)
+    metric({}, 'unattributed answer')
+
+    best = budget.best_so_far()
+    assert best == {'prompt': 'prompt A', 'score': 0.3, 'evaluations': 2, 'candidates_scored': 2}
+
+
+def test_async_calls_are_guarded_and_metered():
+    import asyncio
+
+    budget = RunBudget(max_calls=2)
+
+    async def _acompletion(**kwargs):
+        return {'usage': {'total_tokens': 10}}
+
+    call = budget.guard(budget.meter(_acompletion))
+
+    async def _run():
+        await call(model='m', messages=[])
+        await call(model='m', messages=[])
+        with pytest.raises(BudgetExhausted):
+            await call(model='m', messages=[])
+
+    asyncio.run(_run())
+    assert (budget.calls, budget.tokens) == (2, 20)
+
+
+def test_plateau_stops_the_run():
+    budget = RunBudget(plateau_patience=2)
+    for prompt, score in [('a', 0.9), ('b', 0.5), ('c', 0.5), ('d', 0.5)]:
+        budget.record(prompt, score)
+    with pytest.raises(BudgetExhausted) as excinfo:
+        budget.check()
+    assert excinfo.value.reason == 'plateau'
+
+
+def test_from_options_reads_env_defaults(monkeypatch):
+    monkeypatch.delenv('OPIK_OPTIMIZER_MAX_SECONDS', raising=False)
+    monkeypatch.delenv('OPIK_OPTIMIZER_MAX_TOKENS', raising=False)
+    monkeypatch.delenv('OPIK_OPTIMIZER_PLATEAU_PATIENCE', raising=False)
+    monkeypatch.delenv('OPIK_OPTIMIZER_MAX_CALLS', raising=False)
+    assert RunBudget.from_options({}) is None
+
+    monkeypatch.setenv('OPIK_OPTIMIZER_MAX_CALLS', '7')
+    budget = RunBudget.from_options({'max_seconds': 30})
+    assert (budget.max_calls, budget.max_seconds) == (7, 30)
+
+
+def test_restore_starts_fresh_caps_unless_spend_carries_over():
+    first = RunBudget(max_calls=2)
+    _call(first, 'prompt A')
+    _call(first, 'prompt A')
+    first.record('prompt A', 0.8)
+    snapshot = first.snapshot()
+
+    resumed = RunBudget(max_calls=2)
+    resumed.restore(snapshot)
+    _call(resumed)  # the earlier attempt's calls do not use up the new cap
+    assert resumed.best_so_far()['prompt'] == 'prompt A'
+    assert resumed.report()['previous_attempts'] == {'model_calls': 2, 'tokens': 20}
+    assert resumed.snapshot()['calls'] == 3
+
+    carried = RunBudget(max_calls=2)
+    carried.restore(snapshot, carry_spend=True)
+    with pytest.raises(BudgetExhausted) as excinfo:
+        _call(carried)
+    assert excinfo.value.reason == 'max_calls'
+
+
+def test_checkpoint_attach_passes_carry_spend(tmp_path):
+    from opik_checkpoint import JobCheckpoint
+
+    first = JobCheckpoint.open(str(tmp_path), 'job', 'run_x', {'a': 1}, 'v1', 42)
+    budget = RunBudget(max_calls=1)
+    first.attach(budget)
+    _call(budget)
+    first.finish({}, budget, 'interrupted')
+
+    fresh = RunBudget(max_calls=1)
+    JobCheckpoint.open(str(tmp_path), 'job', 'run_x', {'a': 1}, 'v1', 42).attach(fresh)
+    fresh.check()
+
+    carried = RunBudget(max_calls=1)
+    JobCheckpoint.open(str(tmp_path), 'job', 'run_x', {'a': 1}, 'v1', 42).attach(carried, carry_spend=True)
+    with pytest.raises(BudgetExhausted):
+        carried.check()
+
+
+def test_optimizer_agent_names_the_candidate_it_runs(monkeypatch):
+    import contextvars
+
+    import opik_optimizer_helpers as helpers
+
+    if not helpers._load_optimizer_stack():
+        pytest.skip('opik_optimizer is not installed')
+    from opik_optimizer.agents import LiteLLMAgent
+
+    monkeypatch.setattr(LiteLLMAgent, 'invoke_agent', lambda self, prompts, item, *args, **kwargs: item['answer'])
+    budget = RunBudget()
+    metric = budget.track_metric(lambda item, output: 1.0 if output == 'done' else 0.0)
+    agent = helpers._candidate_agent()
+
+    def _evaluate(prompt, item):
+        # What an optimizer's evaluation task does: run the candidate, then score it.
+        output = agent.invoke_agent({'candidate': helpers._build_chat_prompt(prompt, 'candidate', 'm')}, item)
+        return metric(item, output)
+
+    for prompt, answer in [('prompt A', 'done'), ('prompt B', 'no'), ('prompt A', 'done')]:
+        contextvars.copy_context().run(_evaluate, prompt, {'answer': answer})
+
+    assert budget.candidate_score('prompt A')['evaluations'] == 2
+    assert budget.best_so_far()['prompt'] == 'prompt A'
@@ -0,0 +1,27 @@
+import pytest
+
+import opik_clients
+
+opik = pytest.importorskip('opik')
+
+
+class _Client:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+def test_clients_are_shared_per_api_key(monkeypatch):
+    monkeypatch.setattr(opik, 'Opik', _Client)
+    monkeypatch.setattr(opik_clients, '_clients', {})
+    monkeypatch.delenv('OPIK_HOST', raising=False)
+
+    default = opik_clients.get_client('Tenax', 'Tenax')
+    first = opik_clients.get_client('Tenax', 'Tenax', api_key='key-one')
+    second = opik_clients.get_client('Tenax', 'Tenax', api_key='key-two')
+
+    assert opik_clients.get_client('Tenax', 'Tenax') is default
+    assert opik_clients.get_client('Tenax', 'Tenax', api_key='key-one') is first
+    assert len({id(default), id(first), id(second)}) == 3
+    assert (first.kwargs['api_key'], second.kwargs['api_key']) == ('key-one', 'key-two')
+    # The registry keeps a digest of the key, not the key.
+    assert not any('key-one' in key for key in opik_clients._clients)
@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+
+import opik_concurrency
+from opik_concurrency import ConcurrencyController, ModelLimiter, TokenBucket, resolve_settings
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__('rate limited')
+        self.response = type('Response', (), {'status_code': 429, 'headers': {}})()
+        if retry_after is not None:
+            self.response.headers['retry-after'] = str(retry_after)
+
+
+class _Provider:
+    """Stub model that throttles whenever more than ``capacity`` calls overlap."""
+
+    def __init__(self, capacity, latency=0.01):
+        self.capacity = capacity
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            over = self.active > self.capacity
+            if over:
+                self.throttled += 1
+        try:
+            if over:
+                raise RateLimitError(retry_after=0.01)
+            time.sleep(self.latency)
+            return {'model': kwargs.get('model')}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _settings(**overrides):
+    return dict(resolve_settings({'max_in_flight': 16, 'initial_in_flight': 16, 'max_retries': 20}), **overrides)
+
+
+def test_aimd_window_backs_off_and_every_call_eventually_succeeds():
+    provider = _Provider(capacity=4)
+    limiter = ModelLimiter('stub', _settings())
+    results = []
+
+    def _worker():
+        for _ in range(10):
+            results.append(limiter.call(provider, model='stub'))
+
+    threads = [threading.Thread(target=_worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    stats = limiter.stats()
+    assert len(results) == 160
+    assert provider.throttled > 0
+    assert stats['throttled'] == provider.throttled
+    assert stats['retries'] == provider.throttled
+    assert stats['limit'] < 16
+
+
+def test_throttle_halves_and_success_grows_the_window():
+    limiter = ModelLimiter('stub', _settings(initial_in_flight=8))
+    limiter.acquire()
+    limiter.release(None, throttled=True)
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 5
+
+
+def test_retries_are_capped(monkeypatch):
+    monkeypatch.setattr(opik_concurrency.time, 'sleep', lambda _seconds: None)
+    limiter = ModelLimiter('stub', _settings(max_retries=2))
+    attempts = []
+
+    def _always_throttled(**_kwargs):
+        attempts.append(1)
+        raise RateLimitError()
+
+    with pytest.raises(RateLimitError):
+        limiter.call(_always_throttled, model='stub')
+    assert len(attempts) == 3
+
+
+def test_other_errors_are_not_retried():
+    limiter = ModelLimiter('stub', _settings())
+
+    def _broken(**_kwargs):
+        raise ValueError('bad request')
+
+    with pytest.raises(ValueError):
+        limiter.call(_broken, model='stub')
+    assert limiter.stats()['retries'] == 0
+    assert limiter.in_flight == 0
+
+
+def test_token_bucket_holds_the_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.18
+
+
+def test_controller_keeps_one_limiter_per_model():
+    controller = ConcurrencyController()
+    limited = controller.wrap(lambda **kwargs: kwargs['model'])
+
+    assert limited(model='a') == 'a'
+    assert limited(model='b') == 'b'
+    assert set(controller.stats()) == {'a', 'b'}
+    assert controller.limiter('a') is controller.limiter('a')
+
+
+def test_async_calls_share_the_window_and_retry_throttles():
+    import asyncio
+
+    controller = ConcurrencyController()
+    controller.limiter('stub', _settings(max_in_flight=2, initial_in_flight=2, max_retries=5))
+    state = {'active': 0, 'peak': 0, 'throttles': 1}
+
+    async def _acompletion(**kwargs):
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        try:
+            await asyncio.sleep(0.01)
+            if state['throttles']:
+                state['throttles'] -= 1
+                raise RateLimitError(retry_after=0.01)
+            return kwargs['model']
+        finally:
+            state['active'] -= 1
+
+    limited = controller.wrap(_acompletion)
+
+    async def _run():
+        return await asyncio.gather(*[limited(model='stub') for _ in range(8)])
+
+    assert asyncio.run(_run()) == ['stub'] * 8
+    assert state['peak'] <= 2
+    stats = controller.stats()['stub']
+    assert (stats['throttled'], stats['retries']) == (1, 1)
+
+
+def test_concurrent_jobs_get_the_strictest_settings_until_they_finish():
+    controller = ConcurrencyController()
+    relaxed = _settings(max_in_flight=16, requests_per_second=None)
+    strict = _settings(max_in_flight=4, initial_in_flight=4, requests_per_second=5.0)
+
+    limiter = controller.limiter('gpt', relaxed, job='relaxed-job')
+    controller.limiter('gpt', strict, job='strict-job')
+    # The relaxed job registering again does not undo the strict job's limits.
+    controller.limiter('gpt', relaxed, job='relaxed-job')
+    assert (limiter.max_in_flight, limiter.settings['requests_per_second']) == (4, 5.0)
+    assert limiter.limit <= 4
+
+    controller.unregister('gpt', 'strict-job')
+    assert (limiter.max_in_flight, limiter.settings['requests_per_second']) == (16, None)
+    controller.unregister('gpt', 'relaxed-job')
+    assert limiter.settings == resolve_settings()
@@ -0,0 +1,128 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from opik_dataset_cache import DatasetCache
+
+
+class _Remote:
+    """Stand-in backend: counts downloads and fingerprint checks, can go offline."""
+
+    def __init__(self, items, fingerprint='v1'):
+        self.items = items
+        self.fingerprint_value = fingerprint
+        self.offline = False
+        self.downloads = 0
+        self.checks = 0
+
+    def download(self):
+        if self.offline:
+            raise ConnectionError('backend unreachable')
+        self.downloads += 1
+        return [dict(item) for item in self.items]
+
+    def fingerprint(self):
+        if self.offline:
+            raise ConnectionError('backend unreachable')
+        self.checks += 1
+        return self.fingerprint_value
+
+    def fetch(self, cache, identifier='reminders', limit=None):
+        return cache.fetch(identifier, limit, self.download, self.fingerprint)
+
+
+def _items(count, tag='done'):
+    return [{'id': f'item-{n}', 'expected_output': f'{tag} {n}'} for n in range(count)]
+
+
+def _expire(cache, identifier='reminders'):
+    index = cache._read_index()
+    for entry in index.values():
+        if entry['identifier'] == identifier:
+            entry['fetched_at'] -= cache.ttl_seconds + 1
+    cache._write_index(index)
+
+
+def test_fresh_entries_are_served_without_asking_the_backend(tmp_path):
+    cache, remote = DatasetCache(str(tmp_path), ttl_seconds=60), _Remote(_items(4))
+
+    assert remote.fetch(cache) == _items(4)
+    assert remote.fetch(cache) == _items(4)
+    # A cached full download also serves smaller limits.
+    assert remote.fetch(cache, limit=2) == _items(2)
+    assert (remote.downloads, remote.checks) == (1, 1)
+
+
+def test_stale_entries_are_revalidated_by_fingerprint(tmp_path):
+    cache, remote = DatasetCache(str(tmp_path), ttl_seconds=60), _Remote(_items(4))
+    remote.fetch(cache)
+    _expire(cache)
+
+    assert remote.fetch(cache) == _items(4)
+    assert remote.downloads == 1
+    assert cache.is_fresh(cache.lookup('reminders'))
+
+
+def test_a_new_dataset_version_is_downloaded_again(tmp_path):
+    cache, remote = DatasetCache(str(tmp_path), ttl_seconds=60), _Remote(_items(4))
+    remote.fetch(cache)
+    first_digest = cache.lookup('reminders')['digest']
+    _expire(cache)
+    remote.items, remote.fingerprint_value = _items(5, tag='redone'), 'v2'
+
+    assert remote.fetch(cache) == _items(5, tag='redone')
+    entry = cache.lookup('reminders')
+    assert remote.downloads == 2
+    assert (entry['fingerprint'], entry['count']) == ('v2', 5)
+    assert entry['digest'] != first_digest
+
+
+def test_stale_entries_are_served_while_the_backend_is_offline(tmp_path, capsys):
+    cache, remote = DatasetCache(str(tmp_path), ttl_seconds=60), _Remote(_items(4))
+    remote.fetch(cache)
+    _expire(cache)
+    remote.offline = True
+
+    assert remote.fetch(cache) == _items(4)
+    assert 'serving cached dataset' in capsys.readouterr().err
+
+    # Nothing cached yet for this dataset: the failure surfaces.
+    with pytest.raises(ConnectionError):
+        remote.fetch(cache, identifier='other')
+
+
+def test_eviction_drops_least_recently_used_entries_by_bytes(tmp_path):
+    cache = DatasetCache(str(tmp_path), ttl_seconds=60)
+    entries = {name: cache.store(name, None, _items(20, tag=name)) for name in ('a', 'b', 'c')}
+    cache.max_bytes = entries['a']['size'] * 2 + entries['a']['size'] // 2
+    cache.load(entries['a'])  # 'a' is now more recent than 'b'
+
+    cache.store('d', None, _items(20, tag='d'))
+
+    assert cache.lookup('b') is None
+    assert not os.path.exists(cache._object_path(entries['b']['digest']))
+    assert {name for name in 'acd' if cache.lookup(name)} == {'a', 'd'}
+    total = sum(entry['size'] for entry in cache._read_index().values())
+    assert total <= cache.max_bytes
+
+
+def test_processes_sharing_a_cache_keep_each_others_entries(tmp_path):
+    utils = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = textwrap.dedent(f'''
+        import sys
+        sys.path.insert(0, {utils!r})
+        from opik_dataset_cache import DatasetCache
+        cache = DatasetCache({str(tmp_path)!r})
+        for n in range(40):
+            cache.store(f'{{sys.argv[1]}}-{{n}}', None, [{{'n': n}}])
+    ''')
+    writers = [subprocess.Popen([sys.executable, '-c', script, str(worker)]) for worker in range(4)]
+    assert [writer.wait(timeout=60) for writer in writers] == [0] * 4
+
+    with open(tmp_path / 'index.json', encoding='utf-8') as handle:
+        index = json.load(handle)
+    assert len(index) == 4 * 40
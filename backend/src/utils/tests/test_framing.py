@@ -0,0 +1,54 @@
+import io
+import json
+
+import pytest
+
+import opik_framing
+from opik_framing import FLAG_ZLIB, FRAME_HEADER, ResultChannel, encode_frame, read_frame
+
+_LARGE = {'result': {'scores': [[round(i * 0.001, 3)] * 50 for i in range(100)]}, 'id': 7}
+
+
+@pytest.mark.parametrize('compress', [None, 'zlib'])
+def test_json_frames_round_trip(compress):
+    stream = io.BytesIO()
+    channel = ResultChannel(stream, framed=True, compress=compress)
+    channel.send({'id': 1, 'result': 'small'})
+    channel.send(_LARGE)
+
+    stream.seek(0)
+    assert read_frame(stream) == {'id': 1, 'result': 'small'}
+    assert read_frame(stream) == _LARGE
+    assert read_frame(stream) is None
+
+
+def test_only_large_payloads_are_compressed():
+    small = encode_frame({'id': 1}, compress='zlib')
+    large = encode_frame(_LARGE, compress='zlib')
+
+    assert not FRAME_HEADER.unpack(small[:FRAME_HEADER.size])[1] & FLAG_ZLIB
+    length, flags = FRAME_HEADER.unpack(large[:FRAME_HEADER.size])
+    assert flags & FLAG_ZLIB
+    assert length == len(large) - FRAME_HEADER.size < len(json.dumps(_LARGE))
+
+
+def test_msgpack_frames_round_trip():
+    if opik_framing.msgpack is None:
+        pytest.skip('msgpack is not installed')
+    stream = io.BytesIO(encode_frame(_LARGE, encoding='msgpack', compress='zlib'))
+    assert read_frame(stream) == _LARGE
+
+
+def test_truncated_frame_is_an_error():
+    frame = encode_frame(_LARGE)
+    with pytest.raises(ValueError):
+        read_frame(io.BytesIO(frame[:-1]))
+
+
+def test_line_mode_stays_plain_json():
+    stream = io.BytesIO()
+    ResultChannel(stream).send({'id': 2, 'result': [1, 2]})
+
+    assert stream.getvalue() == b'{"id": 2, "result": [1, 2]}\n'
+    with pytest.raises(ValueError):
+        ResultChannel(io.BytesIO(), compress='zlib')
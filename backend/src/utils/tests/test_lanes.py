@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from opik_lanes import LaneSaturated, LaneScheduler, parse_lane_limits
+
+
+def test_parse_lane_limits_overrides_defaults():
+    limits = parse_lane_limits('optimizer=2:4, metrics=3, bogus, logging=x:1')
+
+    assert limits['optimizer'] == (2, 4)
+    assert limits['metrics'] == (3, 64)
+    assert limits['logging'] == (4, 1000)
+
+
+def test_saturated_lane_rejects_instead_of_queueing():
+    scheduler = LaneScheduler({'logging': (1, 1), 'optimizer': (1, 1)})
+    release = threading.Event()
+    try:
+        running = scheduler.submit('optimizer', release.wait, 5)
+        queued = scheduler.submit('optimizer', release.wait, 5)
+        with pytest.raises(LaneSaturated) as excinfo:
+            scheduler.submit('optimizer', release.wait, 5)
+        assert (excinfo.value.lane, excinfo.value.in_flight, excinfo.value.capacity) == ('optimizer', 2, 2)
+
+        # A saturated optimizer lane does not hold up logging.
+        assert scheduler.submit('logging', lambda: 'logged').result(timeout=5) == 'logged'
+    finally:
+        release.set()
+    assert running.result(timeout=5) and queued.result(timeout=5)
+
+    stats = scheduler.stats()['optimizer']
+    assert stats['rejected'] == 1
+    assert stats['completed'] == 2
+    assert scheduler.submit('optimizer', lambda: 'again').result(timeout=5) == 'again'
+    scheduler.shutdown()
+
+
+def test_unknown_lane_falls_back_to_logging():
+    scheduler = LaneScheduler({'logging': (1, 0)})
+    assert scheduler.submit('nope', lambda: 1).result(timeout=5) == 1
+    assert scheduler.stats()['logging']['completed'] == 1
+    scheduler.shutdown()
@@ -0,0 +1,155 @@
+import threading
+from concurrent import futures
+
+import pytest
+
+from opik_budget import BudgetExhausted, RunBudget
+from opik_llm_cache import LLMResponseCache, cached_completions, in_scope
+
+litellm = pytest.importorskip('litellm')
+
+
+def _stub(label):
+    def _completion(**kwargs):
+        return {'model': kwargs.get('model'), 'label': label, 'usage': {'total_tokens': 3}}
+
+    return _completion
+
+
+def _ask(prompt):
+    return litellm.completion(model='stub', messages=[{'role': 'user', 'content': prompt}])
+
+
+def test_cache_replays_answered_requests(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'llm.sqlite'))
+    calls = []
+
+    def _completion(**kwargs):
+        calls.append(kwargs)
+        return f'answer-{len(calls)}'
+
+    with cached_completions(cache, _completion):
+        first = _ask('hello')
+        second = _ask('hello')
+
+    assert first == second == 'answer-1'
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_concurrent_scopes_keep_their_own_budgets():
+    original = litellm.completion
+    budgets = {'a': RunBudget(max_calls=1), 'b': RunBudget(max_calls=10)}
+    outcomes = {}
+    a_inside = threading.Event()
+    b_done = threading.Event()
+
+    def _run(name, prompts, hold=None, wait=None):
+        budget = budgets[name]
+        with cached_completions(None, _stub(name), outer=budget.guard, inner=budget.meter):
+            if hold is not None:
+                hold.set()
+            if wait is not None:
+                wait.wait(5)
+            answers = []
+            with futures.ThreadPoolExecutor(max_workers=2) as pool:
+                for future in [pool.submit(in_scope(_ask), prompt) for prompt in prompts]:
+                    try:
+                        answers.append(future.result()['label'])
+                    except BudgetExhausted as exc:
+                        answers.append(exc.reason)
+            outcomes[name] = answers
+        if name == 'b':
+            b_done.set()
+
+    thread_a = threading.Thread(target=_run, args=('a', ['a1']), kwargs={'hold': a_inside, 'wait': b_done})
+    thread_a.start()
+    a_inside.wait(5)
+    _run('b', ['b1', 'b2', 'b3'])
+    thread_a.join(5)
+
+    assert outcomes['b'] == ['b', 'b', 'b']
+    assert outcomes['a'] == ['a']
+    assert budgets['a'].calls == 1
+    assert budgets['b'].calls == 3
+    assert litellm.completion is original
+
+
+def test_calls_outside_any_scope_use_the_original_completion(monkeypatch):
+    monkeypatch.setattr(litellm, 'completion', _stub('plain'))
+    budget = RunBudget(max_calls=5)
+    seen = {}
+
+    with cached_completions(None, _stub('scoped'), inner=budget.meter):
+        worker = threading.Thread(target=lambda: seen.update(answer=_ask('x')['label']))
+        worker.start()
+        worker.join()
+        seen['scoped'] = _ask('y')['label']
+
+    assert seen == {'answer': 'plain', 'scoped': 'scoped'}
+    assert budget.calls == 1
+
+
+def test_only_optimizer_executors_inherit_the_scope(monkeypatch):
+    from opik.evaluation.engine.evaluation_tasks_executor import StreamingExecutor
+
+    monkeypatch.setattr(litellm, 'completion', _stub('plain'))
+    original_submit = StreamingExecutor.submit
+
+    with cached_completions(None, _stub('scoped')):
+        with StreamingExecutor(workers=2, verbose=0) as executor:
+            for prompt in ('a', 'b'):
+                executor.submit(lambda prompt=prompt: _ask(prompt)['label'])
+            evaluated = executor.get_results()
+        with futures.ThreadPoolExecutor(max_workers=1) as pool:
+            unrelated = pool.submit(lambda: _ask('c')['label']).result()
+
+    assert evaluated == ['scoped', 'scoped']
+    assert unrelated == 'plain'
+    assert StreamingExecutor.submit is original_submit
+    assert futures.ThreadPoolExecutor.submit.__name__ == 'submit'
+
+
+def test_async_completions_use_the_cache(tmp_path):
+    import asyncio
+
+    cache = LLMResponseCache(str(tmp_path / 'llm.sqlite'))
+    calls = []
+    original = litellm.acompletion
+
+    async def _acompletion(**kwargs):
+        calls.append(kwargs)
+        return f'answer-{len(calls)}'
+
+    async def _ask_twice():
+        messages = [{'role': 'user', 'content': 'why did it fail?'}]
+        first = await litellm.acompletion(model='stub', messages=messages)
+        second = await litellm.acompletion(model='stub', messages=messages)
+        return first, second
+
+    with cached_completions(cache, _acompletion):
+        first, second = asyncio.run(_ask_twice())
+
+    assert first == second == 'answer-1'
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+    assert litellm.acompletion is original
+
+
+def test_async_completions_are_charged_to_the_scope_budget():
+    import asyncio
+
+    budget = RunBudget(max_calls=1)
+
+    async def _acompletion(**kwargs):
+        return {'usage': {'total_tokens': 4}}
+
+    async def _ask_twice():
+        await litellm.acompletion(model='stub', messages=[{'role': 'user', 'content': 'a'}])
+        await litellm.acompletion(model='stub', messages=[{'role': 'user', 'content': 'b'}])
+
+    with cached_completions(None, _acompletion, outer=budget.guard, inner=budget.meter):
+        with pytest.raises(BudgetExhausted):
+            asyncio.run(_ask_twice())
+
+    assert (budget.calls, budget.tokens) == (1, 4)
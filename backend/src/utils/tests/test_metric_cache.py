@@ -0,0 +1,63 @@
+import opik_optimizer_helpers as helpers
+from opik_metric_cache import MetricMemo, memo_key
+
+
+def test_memo_counts_hits_and_misses_and_stays_bounded():
+    memo = MetricMemo(max_entries=2)
+
+    assert memo.get('a') == (False, None)
+    memo.put('a', 0.5)
+    memo.put('b', 0.25)
+    assert memo.get('a') == (True, 0.5)
+    memo.put('c', 1.0)  # evicts 'b', the least recently used
+
+    assert memo.get('b') == (False, None)
+    assert memo.stats() == {'entries': 2, 'hits': 1, 'misses': 2, 'path': None}
+
+
+def test_memo_keys_do_not_collide_across_field_boundaries():
+    keys = {
+        memo_key('rouge', 'ab', 'c'),
+        memo_key('rouge', 'a', 'bc'),
+        memo_key('rougea', 'b', 'c'),
+        memo_key('bleu', 'ab', 'c'),
+        memo_key('rouge', 'ab', 'c '),
+    }
+    assert len(keys) == 5
+    assert memo_key('rouge', 'ab', 'c') == memo_key('rouge', 'ab', 'c')
+
+
+def test_scores_persist_for_the_next_process(tmp_path):
+    path = str(tmp_path / 'memo.sqlite')
+    writer = MetricMemo(path=path)
+    writer.put('key', {'value': 0.75, 'reason': 'close'})
+    writer.flush()
+
+    reader = MetricMemo(path=path)
+    assert reader.get('key') == (True, {'value': 0.75, 'reason': 'close'})
+
+
+def _item(text, **extra):
+    return {'expected_output': {'output': {'generated_text': text}}, **extra}
+
+
+def test_same_output_is_scored_per_reference(monkeypatch):
+    monkeypatch.setattr(helpers, 'METRIC_CACHE_ENABLED', True)
+    monkeypatch.setattr(helpers, '_metric_memo', MetricMemo())
+    calls = []
+
+    def exact_match(dataset_item, llm_output, **_kwargs):
+        calls.append(llm_output)
+        return 1.0 if helpers._extract_expected_text(dataset_item) == llm_output else 0.0
+
+    metric = helpers._memoized_metric(exact_match)
+
+    assert metric(_item('call mom'), 'call mom') == 1.0
+    assert metric(_item('call dad'), 'call mom') == 0.0
+    # Repeats -- including a copy under another id -- come from the memo.
+    assert metric(_item('call mom'), 'call mom') == 1.0
+    assert metric(_item('call mom', id='other'), 'call mom') == 1.0
+    assert metric(_item('call dad'), 'call mom') == 0.0
+
+    assert calls == ['call mom', 'call mom']
+    assert helpers._metric_memo.stats()['hits'] == 3
@@ -0,0 +1,156 @@
+import json
+import mmap
+import random
+import sys
+
+import opik
+import pytest
+
+import opik_optimizer_helpers as helpers
+
+
+class _CountingDataset(opik.Dataset):
+    """SDK dataset whose backend download is replaced by a counted in-memory list."""
+
+    def __init__(self, items):
+        super().__init__(name='reminders', description=None, rest_client=None, dataset_items_count=len(items))
+        self._rows = items
+        self.downloads = 0
+
+    def get_items(self, nb_samples=None):
+        self.downloads += 1
+        return [dict(item) for item in self._rows[:nb_samples]]
+
+
+@pytest.fixture
+def remote_dataset(monkeypatch):
+    dataset = _CountingDataset([
+        {'id': f'item-{index}', 'input': f'task {index}', 'expected_output': f'done {index}'}
+        for index in range(5)
+    ])
+    monkeypatch.setattr(helpers, '_load_opik_dataset', lambda _identifier: dataset)
+    monkeypatch.setattr(helpers, 'DATASET_CACHE_ENABLED', False)
+    monkeypatch.setattr(helpers, '_dataset_cache', None)
+    return dataset
+
+
+def test_materialized_dataset_is_an_opik_dataset_fetched_once(remote_dataset):
+    dataset = helpers._load_materialized_dataset('reminders')
+
+    assert dataset is remote_dataset
+    assert isinstance(dataset, opik.Dataset)
+    assert len(dataset.get_items()) == 5
+    assert dataset.get_items(2) == [dataset.get_items()[0], dataset.get_items()[1]]
+    streamed = list(dataset.__internal_api__stream_items_as_dataclasses__(dataset_item_ids=['item-3']))
+    assert [item.id for item in streamed] == ['item-3']
+    assert streamed[0].get_content() == {'input': 'task 3', 'expected_output': 'done 3'}
+    assert helpers._dataset_length(dataset) == 5
+    assert remote_dataset.downloads == 1
+
+
+def test_optimize_prompt_receives_an_opik_dataset(remote_dataset, monkeypatch):
+    if not helpers._load_optimizer_stack():
+        pytest.skip('opik_optimizer is not installed')
+    seen = {}
+
+    class _RecordingOptimizer:
+        def __init__(self, **_kwargs):
+            pass
+
+        def optimize_prompt(self, prompt, dataset, metric, **_kwargs):
+            seen['dataset'] = dataset
+            dataset.get_items()
+            list(dataset.__internal_api__stream_items_as_dataclasses__(nb_samples=3))
+            return {'score': 1.0}
+
+    monkeypatch.setattr(helpers, 'MOCK_MODE', False)
+    monkeypatch.setattr(helpers, 'HRPOptimizer', _RecordingOptimizer)
+
+    response = helpers.run_hrpo_optimization(
+        'Remind me', dataset_identifier='reminders', metric='completion_rate', llm_cache=False
+    )
+
+    assert isinstance(seen['dataset'], opik.Dataset)
+    assert response['dataset_size'] == 5
+    assert remote_dataset.downloads == 1
+
+
+def test_dataset_version_reuses_the_cache_digest(remote_dataset, monkeypatch, tmp_path):
+    from opik_dataset_cache import DatasetCache, content_digest
+
+    cache = DatasetCache(str(tmp_path))
+    monkeypatch.setattr(helpers, 'DATASET_CACHE_ENABLED', True)
+    monkeypatch.setattr(helpers, '_dataset_cache', cache)
+    monkeypatch.setattr(helpers, 'content_digest', lambda _items: pytest.fail('items were re-hashed'))
+
+    dataset = helpers._load_materialized_dataset('reminders')
+    version = helpers._dataset_version(dataset)
+
+    assert version == cache.lookup('reminders')['digest']
+    assert version == content_digest(remote_dataset.get_items())
+    assert helpers._dataset_version(dataset) == version
+
+
+def _write_jsonl(path, entries, trailing_newline=True):
+    text = '\n'.join(json.dumps(entry) for entry in entries)
+    path.write_text(text + ('\n' if trailing_newline else ''), encoding='utf-8')
+    return str(path)
+
+
+def test_local_jsonl_head_and_limit(tmp_path, monkeypatch):
+    monkeypatch.delenv('OPIK_DATASET_SAMPLE', raising=False)
+    entries = [{'input': f'task {n}'} for n in range(10)]
+    path = _write_jsonl(tmp_path / 'data.jsonl', entries, trailing_newline=False)
+
+    assert helpers._load_local_entries(path) == entries
+    assert helpers._load_local_entries(path, limit=3) == entries[:3]
+    assert helpers._load_local_entries(path, limit=0) == entries
+    assert helpers._load_local_entries(path, limit=50) == entries
+    with pytest.raises(ValueError):
+        helpers._load_local_entries(path, limit=3, sample='random')
+
+
+def test_local_json_list_and_entries_object(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'ijson', None)  # the json.load fallback
+    entries = [{'input': f'task {n}'} for n in range(5)]
+    (tmp_path / 'list.json').write_text(json.dumps(entries), encoding='utf-8')
+    (tmp_path / 'wrapped.json').write_text(json.dumps({'entries': entries}), encoding='utf-8')
+
+    assert helpers._load_local_entries(str(tmp_path / 'list.json'), limit=2) == entries[:2]
+    assert helpers._load_local_entries(str(tmp_path / 'wrapped.json')) == entries
+
+
+def test_reservoir_sampling_is_seeded_and_uniform(tmp_path, monkeypatch):
+    entries = [{'n': n} for n in range(200)]
+    path = _write_jsonl(tmp_path / 'data.jsonl', entries)
+    monkeypatch.setenv('OPIK_OPTIMIZER_SEED', '7')
+
+    first = helpers._load_local_entries(path, limit=20, sample='reservoir')
+    assert helpers._load_local_entries(path, limit=20, sample='reservoir') == first
+    assert len(first) == 20 and len({entry['n'] for entry in first}) == 20
+    assert first != entries[:20]
+    monkeypatch.setenv('OPIK_OPTIMIZER_SEED', '8')
+    assert helpers._load_local_entries(path, limit=20, sample='reservoir') != first
+
+    # Every position is picked about limit / total of the time.
+    picks = [0] * 100
+    for seed in range(400):
+        for item in helpers._reservoir_sample(random.Random(seed), 10, iter(range(100))):
+            picks[item] += 1
+    assert min(picks) > 15 and max(picks) < 70  # expected 40 each
+
+
+def test_jsonl_lines_straddling_mmap_pages_are_read_whole(tmp_path):
+    page = mmap.PAGESIZE
+    # Pad each entry so line breaks fall just before, on and just after page boundaries.
+    entries = []
+    for n, width in enumerate([page - 20, page - 1, page, page + 1, 3 * page + 7]):
+        entries.append({'n': n, 'pad': 'x' * (width - len(json.dumps({'n': n, 'pad': ''})))})
+    path = tmp_path / 'pages.jsonl'
+    path.write_bytes(b'\n\n'.join(json.dumps(entry).encode('utf-8') for entry in entries) + b'\n')
+
+    assert helpers._load_local_entries(str(path)) == entries
+    assert [len(line) for line in helpers._iter_jsonl_lines(str(path))][:4] == [page - 20, page - 1, page, page + 1]
+    assert helpers._load_local_entries(str(path), limit=2) == entries[:2]
+    (tmp_path / 'empty.jsonl').write_bytes(b'')
+    assert helpers._load_local_entries(str(tmp_path / 'empty.jsonl')) == []
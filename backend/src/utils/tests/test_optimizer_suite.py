@@ -0,0 +1,64 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import opik_optimizer_helpers as helpers
+from opik_progress import progress_scope
+
+pytestmark = pytest.mark.skipif(
+    'fork' not in multiprocessing.get_all_start_methods(),
+    reason='the stub optimizer reaches the workers through fork'
+)
+
+
+def _stub_optimizer(prompt, dataset_entries=None, metric='completion_rate', **_params):
+    if prompt == 'explode':
+        raise RuntimeError('optimizer blew up')
+    return {'mode': 'stub', 'pid': os.getpid(), 'items': len(dataset_entries), 'prompt': prompt}
+
+
+@pytest.fixture
+def stub_suite(monkeypatch, tmp_path):
+    if not helpers._load_optimizer_stack():
+        pytest.skip('opik_optimizer is not installed')
+    monkeypatch.setattr(helpers, 'MOCK_MODE', True)
+    monkeypatch.setattr(helpers, 'SUITE_START_METHOD', 'fork')
+    monkeypatch.setattr(helpers, 'run_hrpo_optimization', _stub_optimizer)
+    dataset = tmp_path / 'reminders.jsonl'
+    dataset.write_text(''.join(json.dumps({'input': f'task {n}'}) + '\n' for n in range(6)))
+    return str(dataset)
+
+
+def test_suite_runs_jobs_in_workers_and_loads_each_dataset_once(stub_suite, tmp_path):
+    events = []
+    specs = [
+        {'optimizer': 'hrpo', 'name': 'a', 'prompt': 'p1', 'dataset_path': stub_suite},
+        {'optimizer': 'hrpo', 'name': 'b', 'prompt': 'p2', 'dataset_path': stub_suite},
+        {'optimizer': 'hrpo', 'name': 'inline', 'prompt': 'p3', 'dataset_entries': [{'input': 'x'}]},
+        {'optimizer': 'hrpo', 'name': 'boom', 'prompt': 'explode', 'dataset_path': stub_suite},
+        {'optimizer': 'hrpo', 'name': 'missing', 'prompt': 'p4', 'dataset_path': str(tmp_path / 'nope.jsonl')},
+    ]
+
+    with progress_scope(events.append):
+        response = helpers.run_optimizer_suite(specs, max_workers=2)
+
+    jobs = {job['name']: job for job in response['jobs']}
+    assert [job['name'] for job in response['jobs']] == ['a', 'b', 'inline', 'boom', 'missing']
+    assert jobs['a']['result']['items'] == jobs['b']['result']['items'] == 6
+    assert jobs['inline']['result']['items'] == 1
+    assert os.getpid() not in {jobs[name]['result']['pid'] for name in ('a', 'b', 'inline')}
+    assert jobs['boom'] == {'name': 'boom', 'optimizer': 'hrpo', 'status': 'error', 'error': 'optimizer blew up'}
+    assert jobs['missing']['status'] == 'error' and 'Dataset load failed' in jobs['missing']['error']
+    assert response['failed'] == 2
+    assert len(response['datasets']) == 1 and response['datasets'][0]['items'] == 6
+
+    finished = [event['name'] for event in events if event['event'] == 'job_finished']
+    assert sorted(finished) == ['a', 'b', 'boom', 'inline']
+    assert events[0]['event'] == 'started' and events[-1]['event'] == 'finished'
+
+
+def test_suite_rejects_unknown_optimizers(stub_suite):
+    with pytest.raises(ValueError):
+        helpers.run_optimizer_suite([{'optimizer': 'simulated-annealing'}])
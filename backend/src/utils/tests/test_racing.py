@@ -0,0 +1,80 @@
+import random
+from collections import Counter
+
+import pytest
+
+from opik_budget import RunBudget
+from opik_llm_cache import cached_completions
+from opik_racing import race, stratified_order
+
+pytest.importorskip('litellm')
+
+
+def _items(count):
+    return [{'input': f'task {index}', 'kind': 'long' if index % 4 == 0 else 'short'} for index in range(count)]
+
+
+def _noisy(means, seed=7):
+    rng = random.Random(seed)
+    return lambda candidate, _item: 1.0 if rng.random() < means[candidate] else 0.0
+
+
+def test_stratified_prefixes_keep_proportions():
+    items = _items(400)
+    order = stratified_order(items, stratify=lambda item: item['kind'], seed=3)
+    assert sorted(order) == list(range(400))
+    prefix = Counter(items[index]['kind'] for index in order[:40])
+    assert 8 <= prefix['long'] <= 12
+
+
+def test_race_stops_at_the_sample_budget():
+    items = _items(400)
+    report = race(4, items, _noisy([0.9, 0.85, 0.2, 0.1]), initial_items=8, sample_fraction=0.25)
+
+    assert report['sample_items'] == 100
+    assert max(report['items_evaluated']) <= 100
+    assert report['rounds'][-1]['items'] <= 100
+    assert set(report['survivors']) <= {0, 1}
+    assert report['evaluations'] == sum(report['items_evaluated'])
+
+
+def test_savings_count_the_followup_evaluations():
+    items = _items(200)
+    report = race(5, items, _noisy([0.95, 0.1, 0.1, 0.1, 0.1]), initial_items=16, followup_items=200)
+
+    survivors = len(report['survivors'])
+    assert report['followup_evaluations'] == survivors * 200
+    assert report['exhaustive_evaluations'] == 5 * 200
+    assert report['evaluations_saved'] == 5 * 200 - report['evaluations'] - survivors * 200
+
+    # Nobody eliminated: the race is pure overhead and says so.
+    tie = race(2, items, lambda _candidate, _item: 0.5, initial_items=16, followup_items=200)
+    assert sorted(tie['survivors']) == [0, 1]
+    assert tie['evaluations_saved'] == -tie['evaluations']
+
+
+def test_seed_screening_calls_the_model_through_the_run_scope():
+    import opik_optimizer_helpers as helpers
+
+    seen = []
+
+    def _completion(**kwargs):
+        system = kwargs['messages'][0]['content']
+        seen.append(system)
+        answer = 'done' if system == 'good prompt' else 'no'
+        return {'choices': [{'message': {'content': answer}}], 'usage': {'total_tokens': 2}}
+
+    budget = RunBudget()
+    metric = budget.track_metric(lambda _item, output: 1.0 if output == 'done' else 0.0)
+    with cached_completions(None, _completion, outer=budget.guard, inner=budget.meter):
+        report = helpers._screen_seed_prompts(
+            ['good prompt', 'bad prompt'], _items(64), 'stub-model', metric,
+            {'initial_items': 8, 'sample_fraction': 0.5}, seed=1, workers=4
+        )
+
+    assert report['survivors'] == [0]
+    assert budget.calls == len(seen) == report['evaluations']
+    assert budget.best_so_far()['prompt'] == 'good prompt'
+    # Only the seeds were raced, so the report claims no run-wide savings.
+    assert report['seeds_dropped'] == 1
+    assert 'evaluations_saved' not in report
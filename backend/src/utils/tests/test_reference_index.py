@@ -0,0 +1,58 @@
+import sys
+
+from opik_reference_index import ReferenceIndex
+
+
+def _text(item):
+    return (item.get('expected_output') or {}).get('output', {}).get('generated_text', '')
+
+
+def _item(text, **extra):
+    return {'expected_output': {'output': {'generated_text': text}}, **extra}
+
+
+def test_items_without_ids_are_keyed_by_content_and_not_retained():
+    index = ReferenceIndex(_text)
+    item = _item('call mom at 5pm')
+    refs = sys.getrefcount(item)
+
+    first = index.get(item)
+    assert sys.getrefcount(item) == refs
+    assert index.get(_item('call mom at 5pm')) is first
+    assert index.get(_item('buy milk')) is not first
+    assert index.stats() == {'items': 2, 'prepared': 2, 'hits': 1}
+
+
+def test_loaded_items_are_found_by_id_without_rehashing(monkeypatch):
+    index = ReferenceIndex(_text)
+    with_id, without_id = _item('call mom', id='item-1'), _item('buy milk')
+    first, second = index.add([with_id, without_id])
+    assert without_id['id']
+
+    def _no_hashing(_item):
+        raise AssertionError('loaded items must not be hashed again')
+
+    monkeypatch.setattr(index, '_content_key', _no_hashing)
+    # The optimizer hands metrics copies of the loaded items.
+    assert index.get(dict(with_id)) is first
+    assert index.get(dict(without_id)) is second
+    assert index.stats()['hits'] == 2
+
+
+def test_reused_ids_are_reprepared_when_the_content_changed():
+    index = ReferenceIndex(_text)
+    [first] = index.add([_item('call mom', id='item-1')])
+    [changed] = index.add([_item('call dad', id='item-1')])
+    assert changed is not first
+    assert index.get(_item('call dad', id='item-1')) is changed
+
+    # One load reusing an id for different items: lookups fall back to content.
+    mom, dad = index.add([_item('call mom', id='item-2'), _item('call dad', id='item-2')])
+    assert index.get(_item('call mom', id='item-2')) is mom
+    assert index.get(_item('call dad', id='item-2')) is dad
+
+
+def test_index_is_bounded():
+    index = ReferenceIndex(_text, max_items=3)
+    index.add([_item(f'text {n}') for n in range(10)])
+    assert index.stats()['items'] == 3
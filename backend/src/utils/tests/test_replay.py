@@ -0,0 +1,97 @@
+import contextlib
+import json
+from datetime import datetime, timezone
+
+from opik_replay import replay_fallback_log
+
+
+def _write_log(path, records):
+    with open(path, 'a', encoding='utf-8') as handle:
+        for record in records:
+            handle.write(json.dumps(record) + '\n')
+
+
+def _event(at, user='u1', reason='write EPIPE'):
+    return {'at': at, 'function': 'log_reminder_sent', 'payload': {'user_id': user}, 'reason': reason}
+
+
+class _Invoke:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, function_name, payload):
+        self.calls.append((function_name, payload))
+        return {'ok': True}, None
+
+
+def test_identical_events_at_different_times_are_both_replayed(tmp_path):
+    log = tmp_path / 'opik_fallback.jsonl'
+    first = _event('2026-10-17T00:30:02.813Z')
+    _write_log(log, [first, first, _event('2026-10-17T00:31:00.000Z')])
+    invoke = _Invoke()
+
+    summary = replay_fallback_log(invoke, str(log))
+
+    assert summary['replayed'] == 2
+    assert summary['duplicates'] == 1
+    assert len(invoke.calls) == 2
+
+
+def test_resume_and_recopied_file_skip_replayed_records(tmp_path):
+    log = tmp_path / 'opik_fallback.jsonl'
+    checkpoint = str(tmp_path / 'replay.checkpoint')
+    _write_log(log, [_event('2026-10-17T00:30:00Z'), _event('2026-10-17T00:30:01Z')])
+    invoke = _Invoke()
+    replay_fallback_log(invoke, str(log), checkpoint_path=checkpoint)
+
+    _write_log(log, [_event('2026-10-17T00:30:02Z')])
+    resumed = replay_fallback_log(invoke, str(log), checkpoint_path=checkpoint)
+    assert resumed['replayed'] == 1
+
+    copy = tmp_path / 'copy.jsonl'
+    copy.write_bytes(log.read_bytes())
+    recopied = replay_fallback_log(invoke, str(copy), checkpoint_path=checkpoint)
+    assert recopied['replayed'] == 0
+    assert recopied['duplicates'] == 3
+    assert len(invoke.calls) == 3
+
+
+def test_seen_hashes_are_bounded(tmp_path):
+    log = tmp_path / 'opik_fallback.jsonl'
+    checkpoint = str(tmp_path / 'replay.checkpoint')
+    _write_log(log, [_event(f'2026-10-17T00:30:{second:02d}Z') for second in range(10)])
+
+    replay_fallback_log(_Invoke(), str(log), checkpoint_path=checkpoint, batch_size=2, max_seen=3)
+
+    with open(checkpoint + '.seen', encoding='utf-8') as handle:
+        assert len(handle.read().split()) <= 6
+
+
+def test_recorded_at_wraps_each_replayed_call(tmp_path):
+    log = tmp_path / 'opik_fallback.jsonl'
+    _write_log(log, [_event('2026-10-17T00:30:02.813Z')])
+    stamps = []
+
+    @contextlib.contextmanager
+    def recorded_at(at):
+        stamps.append(at)
+        yield
+
+    replay_fallback_log(_Invoke(), str(log), recorded_at=recorded_at)
+
+    assert stamps == ['2026-10-17T00:30:02.813Z']
+
+
+def test_logger_stamps_replayed_traces_with_the_original_time(monkeypatch):
+    import opik_logger
+
+    submitted = []
+    monkeypatch.setattr(opik_logger, '_submit_trace', submitted.append)
+
+    with opik_logger.recorded_at('2026-10-17T00:30:02.813Z'):
+        opik_logger.log_reminder_sent('u1', 't1', 'Pay rent', 'soft', 'hello')
+    opik_logger.log_reminder_sent('u1', 't1', 'Pay rent', 'soft', 'hello')
+
+    expected = datetime(2026, 10, 17, 0, 30, 2, 813000, tzinfo=timezone.utc)
+    assert submitted[0]['start_time'] == submitted[0]['end_time'] == expected
+    assert submitted[1]['start_time'] != expected
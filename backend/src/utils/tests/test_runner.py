@@ -0,0 +1,187 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+# Drives ``opik_runner.py --serve`` with stand-in helpers registered under the
+# logging lane, so the protocol is exercised without Opik or the optimizers.
+_HELPERS = textwrap.dedent('''
+    import threading
+
+    fast_done = threading.Event()
+
+    def slow_call(label):
+        fast_done.wait(10)
+        return {'label': label}
+
+    def fast_call(label):
+        fast_done.set()
+        return {'label': label}
+
+    def reporting_call(label):
+        from opik_progress import current_reporter
+        reporter = current_reporter('reporting_call')
+        if reporter is not None:
+            reporter.emit('started')
+        return {'label': label, 'reported': reporter is not None}
+''')
+
+_DRIVER = textwrap.dedent('''
+    import sys
+    sys.path[:0] = [{utils!r}, {helpers!r}]
+    sys.argv = ['opik_runner.py'] + {argv!r}
+    import opik_runner
+    opik_runner._FUNCTION_REGISTRY.update(
+        slow_call='stand_in_helpers', fast_call='stand_in_helpers', reporting_call='stand_in_helpers'
+    )
+    opik_runner.main()
+''')
+
+
+def _run(tmp_path, lines, argv=('--serve',)):
+    (tmp_path / 'stand_in_helpers.py').write_text(_HELPERS)
+    utils = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = _DRIVER.format(utils=utils, helpers=str(tmp_path), argv=list(argv))
+    completed = subprocess.run(
+        [sys.executable, '-c', script], input=''.join(f'{line}\n' for line in lines),
+        capture_output=True, text=True, timeout=60
+    )
+    assert completed.returncode == 0, completed.stderr
+    return [json.loads(line) for line in completed.stdout.splitlines() if line.strip()]
+
+
+def test_serve_answers_out_of_order_by_id(tmp_path):
+    responses = _run(tmp_path, [
+        json.dumps({'id': 1, 'function': 'slow_call', 'payload': {'label': 'slow'}}),
+        json.dumps({'id': 2, 'function': 'fast_call', 'payload': {'label': 'fast'}}),
+    ])
+
+    assert [response['id'] for response in responses] == [2, 1]
+    assert {response['id']: response['result']['label'] for response in responses} == {1: 'slow', 2: 'fast'}
+
+
+def test_serve_reports_bad_requests_and_keeps_going(tmp_path):
+    responses = _run(tmp_path, [
+        '{"id": 1, "function":',
+        json.dumps(['not', 'an', 'object']),
+        json.dumps({'id': 3, 'function': 'no_such_function', 'payload': {}}),
+        json.dumps({'id': 4, 'function': 'fast_call', 'payload': {'label': 'still served'}}),
+    ])
+    by_id = {}
+    for response in responses:
+        by_id.setdefault(response['id'], []).append(response)
+
+    invalid_json, not_an_object = by_id[None]
+    assert invalid_json['error'].startswith('Invalid request JSON')
+    assert not_an_object['error'] == 'Request must be a JSON object'
+    assert by_id[3] == [{'id': 3, 'error': "Function 'no_such_function' not found"}]
+    assert by_id[4] == [{'id': 4, 'result': {'label': 'still served'}}]
+
+
+def test_progress_flag_streams_events_before_the_answer(tmp_path):
+    payload = json.dumps({'label': 'run'})
+
+    quiet = _run(tmp_path, [], argv=('reporting_call', payload))
+    assert quiet == [{'label': 'run', 'reported': False}]
+
+    event, answer = _run(tmp_path, [], argv=('--progress', 'reporting_call', payload))
+    assert event['progress']['event'] == 'started'
+    assert event['progress']['function'] == 'reporting_call'
+    assert answer == {'label': 'run', 'reported': True}
+
+
+def test_serve_streams_progress_per_request(tmp_path):
+    responses = _run(tmp_path, [
+        json.dumps({'id': 1, 'function': 'reporting_call', 'payload': {'label': 'quiet'}}),
+        json.dumps({'id': 2, 'function': 'reporting_call', 'payload': {'label': 'loud'}, 'progress': True}),
+    ])
+    by_id = {}
+    for response in responses:
+        by_id.setdefault(response['id'], []).append(response)
+
+    assert by_id[1] == [{'id': 1, 'result': {'label': 'quiet', 'reported': False}}]
+    event, answer = by_id[2]
+    assert event['progress']['event'] == 'started'
+    assert answer == {'id': 2, 'result': {'label': 'loud', 'reported': True}}
+
+    # ``--progress`` turns it on for requests that do not say otherwise.
+    [event, answer] = _run(tmp_path, [
+        json.dumps({'id': 3, 'function': 'reporting_call', 'payload': {'label': 'loud'}}),
+    ], argv=('--progress', '--serve'))
+    assert event['id'] == 3 and 'progress' in event
+    assert answer['result']['reported'] is True
+
+
+def test_registry_imports_a_function_module_on_first_use():
+    utils = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = textwrap.dedent(f'''
+        import json, sys
+        sys.path.insert(0, {utils!r})
+        import opik_runner
+        loaded = lambda: [name for name in ('opik_logger', 'opik_optimizer_helpers') if name in sys.modules]
+        before = loaded()
+        log_call = opik_runner._resolve_function('log_reminder_sent')
+        after_logging = loaded()
+        sys.stderr.write(json.dumps({{
+            'before': before,
+            'after_logging': after_logging,
+            'resolved': log_call.__module__,
+            'unknown': opik_runner._resolve_function('no_such_function'),
+            'timed': sorted(opik_runner._IMPORT_TIMINGS),
+            'registry': opik_runner._FUNCTION_REGISTRY,
+            'lanes': opik_runner._FUNCTION_LANES,
+        }}))
+    ''')
+    completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=120)
+
+    assert completed.returncode == 0, completed.stderr
+    report = json.loads(completed.stderr.strip().splitlines()[-1])
+    registry, lanes = report.pop('registry'), report.pop('lanes')
+    assert report == {
+        'before': [],
+        'after_logging': ['opik_logger'],
+        'resolved': 'opik_logger',
+        'unknown': None,
+        'timed': ['opik_logger'],
+    }
+
+    # Lanes name registered functions only, and no optimizer run shares the
+    # logging lane.
+    assert set(lanes) <= set(registry)
+    optimizer_functions = {name for name, module in registry.items() if module == 'opik_optimizer_helpers'}
+    assert optimizer_functions <= set(lanes)
+    assert set(lanes.values()) == {'optimizer', 'metrics'}
+
+
+def test_startup_report_schema(tmp_path, monkeypatch):
+    monkeypatch.setenv('OPIK_RUNNER_STARTUP_BUDGET_MS', '600000')
+
+    [report] = _run(tmp_path, [], argv=('--startup-report',))
+
+    assert set(report) == {'imports', 'total_ms', 'budget_ms', 'within_budget'}
+    modules = [entry['module'] for entry in report['imports']]
+    assert modules[:2] == ['opik', 'opik_logger']
+    assert set(modules) <= {'opik', 'opik_logger', 'opik_optimizer', 'opik_optimizer_helpers'}
+    assert all(isinstance(entry['ms'], float) and entry['ms'] >= 0 for entry in report['imports'])
+    assert report['total_ms'] == pytest.approx(sum(entry['ms'] for entry in report['imports']), abs=0.05)
+    assert (report['budget_ms'], report['within_budget']) == (600000.0, True)
+
+
+def test_preload_imports_the_optimizer_stack():
+    pytest.importorskip('opik_optimizer')
+    utils = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = textwrap.dedent(f'''
+        import sys
+        sys.path.insert(0, {utils!r})
+        import opik_runner
+        opik_runner._preload_modules()
+        helpers = sys.modules['opik_optimizer_helpers']
+        sys.stderr.write(repr((helpers.OPTIMIZER_AVAILABLE, 'opik_optimizer' in sys.modules)))
+    ''')
+    completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=120)
+
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stderr.strip().endswith('(True, True)')
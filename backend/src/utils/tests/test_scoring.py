@@ -0,0 +1,26 @@
+import pytest
+
+import opik_scoring
+from opik_scoring import score_matrix, score_pair
+
+_CANDIDATES = ['Remind me to call mom at 5pm', 'call mom', '', 'Buy milk and eggs tomorrow']
+_REFERENCES = ['Reminder: call Mom at 5 PM', 'buy eggs', '']
+
+
+@pytest.mark.parametrize('method', ['cosine', 'jaccard', 'token', 'indel', 'levenshtein_distance'])
+@pytest.mark.parametrize('length_penalty', [0.0, 1.0])
+def test_score_pair_matches_the_matrix(method, length_penalty):
+    matrix = score_matrix(_CANDIDATES, _REFERENCES, method, length_penalty=length_penalty)
+    for row, candidate in enumerate(_CANDIDATES):
+        for column, reference in enumerate(_REFERENCES):
+            assert score_pair(candidate, reference, method, length_penalty=length_penalty) == pytest.approx(
+                float(matrix[row][column]), abs=1e-6
+            )
+
+
+def test_score_pair_skips_the_dense_matrix(monkeypatch):
+    def _dense(*_args, **_kwargs):
+        raise AssertionError('score_pair built a dense matrix')
+
+    monkeypatch.setattr(opik_scoring, '_vector_matrix_numpy', _dense)
+    assert score_pair('call mom', 'call mom', 'cosine') == pytest.approx(1.0)
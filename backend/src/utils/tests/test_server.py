@@ -0,0 +1,105 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='prefork needs os.fork')
+
+_SERVER = textwrap.dedent('''
+    import atexit, json, os, sys
+    sys.path.insert(0, {utils!r})
+    from opik_server import serve_prefork
+
+    def preload():
+        # Stands in for the trace sink/spool flush registered at import time.
+        atexit.register(lambda: open(os.path.join({marks!r}, str(os.getpid())), 'w').close())
+
+    def serve_lines(lines, emit, max_requests=None):
+        handled = 0
+        for line in lines:
+            emit({{'id': json.loads(line)['id'], 'pid': os.getpid()}})
+            handled += 1
+            if handled >= max_requests:
+                break
+        return handled
+
+    serve_prefork(serve_lines, preload, {sock!r}, workers=2, max_requests={max_requests})
+''')
+
+
+def _wait_for(path, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, f'{path} did not appear'
+        time.sleep(0.05)
+
+
+def test_sigterm_lets_workers_flush_before_exiting(tmp_path):
+    marks = tmp_path / 'marks'
+    marks.mkdir()
+    sock = str(tmp_path / 'runner.sock')
+    utils = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = _SERVER.format(utils=utils, marks=str(marks), sock=sock, max_requests=100)
+    server = subprocess.Popen([sys.executable, '-c', script])
+    try:
+        _wait_for(sock)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(sock)
+        client.sendall(b'{"id": 1}\n')
+        reader = client.makefile('r')
+        assert json.loads(reader.readline()) == {'workers': 2}
+        reply = json.loads(reader.readline())
+        assert reply['id'] == 1
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+        client.close()
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+    # Both workers (the busy one and the idle one) ran their atexit flush.
+    workers = {int(name) for name in os.listdir(marks)} - {server.pid}
+    assert reply['pid'] in workers
+    assert len(workers) == 2
+
+
+def test_recycling_worker_announces_that_the_rest_was_unread(tmp_path):
+    marks = tmp_path / 'marks'
+    marks.mkdir()
+    sock = str(tmp_path / 'runner.sock')
+    utils = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = _SERVER.format(utils=utils, marks=str(marks), sock=sock, max_requests=1)
+    server = subprocess.Popen([sys.executable, '-c', script])
+    try:
+        _wait_for(sock)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(sock)
+        client.sendall(b'{"id": 1}\n{"id": 2}\n')
+        replies = [json.loads(line) for line in client.makefile('r')]
+        client.close()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=15)
+
+    assert replies[0] == {'workers': 2}
+    assert [reply.get('id') for reply in replies[1:]] == [1, None]
+    assert replies[-1] == {'closing': True}
+
+
+def test_respawn_backoff_grows_on_crashes_and_resets_on_recycle(monkeypatch):
+    import opik_server
+
+    monkeypatch.setenv('OPIK_SERVER_MAX_RESPAWN_BACKOFF', '0.5')
+    crashed = 1 << 8  # wait status of a worker that exited with code 1
+    delays = [0.0]
+    for _ in range(5):
+        delays.append(opik_server._next_backoff(delays[-1], crashed))
+    assert delays == [0.0, 0.1, 0.2, 0.4, 0.5, 0.5]
+    assert opik_server._next_backoff(0.5, 0) == 0.0
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+import opik_similarity
+from opik_similarity import (
+    indel_similarity,
+    lcs_length,
+    levenshtein_distance,
+    levenshtein_similarity,
+    rank,
+    upper_bound
+)
+
+
+def _lcs_dp(a, b):
+    row = [0] * (len(b) + 1)
+    for char_a in a:
+        previous = 0
+        for j, char_b in enumerate(b, 1):
+            current = row[j]
+            row[j] = previous + 1 if char_a == char_b else max(row[j], row[j - 1])
+            previous = current
+    return row[-1]
+
+
+def _levenshtein_dp(a, b):
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, char_b in enumerate(b, 1):
+            current = row[j]
+            row[j] = min(row[j] + 1, row[j - 1] + 1, previous + (char_a != char_b))
+            previous = current
+    return row[-1]
+
+
+def _pairs(count=300, seed=7):
+    rng = random.Random(seed)
+    alphabet = 'abcde fgh'
+    pairs = [('', ''), ('', 'abc'), ('abc', ''), ('same text', 'same text')]
+    for _ in range(count):
+        # Lengths straddle the 64-bit word boundary on purpose.
+        a = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 90)))
+        b = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 90)))
+        pairs.append((a, b))
+    return pairs
+
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    monkeypatch.setattr(opik_similarity, '_rf_indel', None)
+    monkeypatch.setattr(opik_similarity, '_rf_levenshtein', None)
+
+
+@pytest.mark.parametrize('a,b', _pairs())
+def test_bit_parallel_lcs_matches_dynamic_programming(a, b):
+    assert lcs_length(a, b) == _lcs_dp(a, b)
+
+
+@pytest.mark.parametrize('a,b', _pairs())
+def test_bit_parallel_levenshtein_matches_dynamic_programming(pure_python, a, b):
+    expected = _levenshtein_dp(a, b)
+    assert levenshtein_distance(a, b) == expected
+    assert levenshtein_distance(a, b, max_distance=5) == min(expected, 6)
+
+
+@pytest.mark.parametrize('a,b', _pairs(100, seed=11))
+def test_similarities_respect_their_upper_bounds(pure_python, a, b):
+    total, longest = len(a) + len(b), max(len(a), len(b))
+    indel = 2 * _lcs_dp(a, b) / total if total else 1.0
+    levenshtein = 1 - _levenshtein_dp(a, b) / longest if longest else 1.0
+
+    assert indel_similarity(a, b) == pytest.approx(indel)
+    assert levenshtein_similarity(a, b) == pytest.approx(levenshtein)
+    assert indel <= upper_bound('indel', a, b) + 1e-9
+    assert levenshtein <= upper_bound('levenshtein', a, b) + 1e-9
+    # A cutoff only ever turns scores below it into 0.0.
+    assert indel_similarity(a, b, min_score=0.6) in (0.0, pytest.approx(indel))
+
+
+def test_rank_prunes_without_changing_the_winner(pure_python):
+    rng = random.Random(3)
+    candidates = [''.join(rng.choice('abc ') for _ in range(rng.randint(1, 60))) for _ in range(200)]
+    query = candidates[42]
+    brute = sorted(
+        ((index, indel_similarity(opik_similarity.normalize(query), opik_similarity.normalize(text)))
+         for index, text in enumerate(candidates)),
+        key=lambda pair: -pair[1]
+    )
+
+    best = rank(query, candidates, 'indel', limit=3)
+
+    assert [score for _, score in best] == pytest.approx([score for _, score in brute[:3]])
+    assert best[0] == (42, 1.0)
@@ -0,0 +1,212 @@
+import gzip
+import http.server
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+from opik import id_helpers
+
+import opik_spool
+from opik_spool import TraceSpool, encode_record
+
+
+class _Shipper:
+    def __init__(self, fail_on=()):
+        self.batches = []
+        self.fail_on = set(fail_on)
+        self.attempts = 0
+
+    def __call__(self, batch):
+        self.attempts += 1
+        if self.attempts in self.fail_on:
+            raise RuntimeError('backend unavailable')
+        self.batches.append([record['n'] for record in batch])
+
+
+def _dead_pid():
+    child = subprocess.Popen([sys.executable, '-c', 'pass'])
+    child.wait()
+    return child.pid
+
+
+def _spool(tmp_path, ship):
+    spool = TraceSpool(str(tmp_path), ship, seal_seconds=3600, fsync=False)
+    spool._ensure_shipper = lambda: None  # drive shipping from the test
+    return spool
+
+
+def test_append_then_drain_ships_in_order_and_removes_segment(tmp_path):
+    ship = _Shipper()
+    spool = _spool(tmp_path, ship)
+    spool.append([{'n': 1}, {'n': 2}])
+    spool.append([{'n': 3}])
+
+    assert spool.drain()
+    assert ship.batches == [[1, 2, 3]]
+    assert os.listdir(tmp_path) == []
+    assert spool.stats()['shipped'] == 3
+
+
+def test_failed_ship_keeps_segment_for_retry(tmp_path):
+    ship = _Shipper(fail_on={1})
+    spool = _spool(tmp_path, ship)
+    spool.append([{'n': 1}, {'n': 2}])
+
+    assert not spool.drain()
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.seg')]
+    assert spool.stats()['ship_failures'] == 1
+
+    assert spool.drain()
+    assert ship.batches == [[1, 2]]
+    assert os.listdir(tmp_path) == []
+
+
+def test_ack_resumes_after_the_last_delivered_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(opik_spool, 'DEFAULT_SHIP_BATCH', 2)
+    ship = _Shipper(fail_on={2})
+    spool = _spool(tmp_path, ship)
+    spool.append([{'n': n} for n in range(1, 6)])
+
+    assert not spool.drain()
+    assert spool.drain()
+    assert ship.batches == [[1, 2], [3, 4], [5]]
+
+
+def test_segments_of_dead_processes_are_recovered(tmp_path):
+    pid = _dead_pid()
+    with open(tmp_path / f'{1:020d}-{pid}.open', 'wb') as handle:
+        handle.write(encode_record({'n': 1}))
+    with open(tmp_path / f'{2:020d}-{pid}.seg.{pid}.claim', 'wb') as handle:
+        handle.write(encode_record({'n': 2}) + encode_record({'n': 3}))
+    with open(tmp_path / f'{2:020d}-{pid}.seg.{pid}.claim.ack', 'w') as handle:
+        handle.write(str(len(encode_record({'n': 2}))))
+    # A torn tail (crash mid-write) is ignored rather than shipped.
+    with open(tmp_path / f'{1:020d}-{pid}.open', 'ab') as handle:
+        handle.write(encode_record({'n': 9})[:-3])
+
+    ship = _Shipper()
+    spool = _spool(tmp_path, ship)
+
+    assert spool.drain()
+    assert ship.batches == [[1], [3]]
+    assert os.listdir(tmp_path) == []
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+class _TraceStore(http.server.BaseHTTPRequestHandler):
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        self.received.append((self.path, json.loads(body)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_undelivered_traces_stay_in_the_spool(tmp_path, monkeypatch):
+    opik = pytest.importorskip('opik')
+    import opik_logger
+
+    port = _free_port()
+    client = opik.Opik(
+        host=f'http://127.0.0.1:{port}/api', project_name='Tenax', workspace='Tenax', api_key='test'
+    )
+    monkeypatch.setattr(opik_logger, '_get_client', lambda: client)
+    monkeypatch.setattr(opik_logger, 'TRACE_SHIP_TIMEOUT', 2)
+    spool = _spool(tmp_path, opik_logger._ship_traces)
+    spool.append([{
+        'id': id_helpers.generate_id(), 'name': 'reminder', 'project_name': 'Tenax',
+        'input': {'task': 'call mom'}, 'output': 3, 'start_time': '2026-01-01T10:00:00'
+    }])
+
+    # Nothing listens on the port: the batch must not count as shipped.
+    assert not spool.drain()
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.seg')]
+    assert spool.stats()['ship_failures'] == 1
+    assert spool.stats()['shipped'] == 0
+
+    _TraceStore.received = []
+    server = http.server.HTTPServer(('127.0.0.1', port), _TraceStore)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert spool.drain()
+    finally:
+        server.shutdown()
+        server.server_close()
+    [(path, body)] = _TraceStore.received
+    assert path.endswith('/traces/batch')
+    assert body['traces'][0]['output'] == {'output': 3}
+    assert os.listdir(tmp_path) == []
+
+
+def test_traces_refused_by_the_sink_go_to_the_spool(tmp_path, monkeypatch):
+    import opik_logger
+    from opik_trace_sink import TraceSink
+
+    sink = TraceSink(lambda batch: None)
+    sink.close()
+    ship = _Shipper()
+    spool = _spool(tmp_path, ship)
+    monkeypatch.setattr(opik_logger, '_trace_sink', sink)
+    monkeypatch.setattr(opik_logger, '_trace_spool', spool)
+    monkeypatch.setattr(opik_logger, '_overflow', {'spooled': 0, 'lost': 0})
+
+    opik_logger._submit_trace({'n': 7, 'name': 'reminder'})
+
+    assert spool.drain()
+    assert ship.batches == [[7]]
+    assert opik_logger.trace_sink_stats()['overflow'] == {'spooled': 1, 'lost': 0}
+
+
+def test_failed_logger_calls_are_traced_with_their_error(tmp_path, monkeypatch):
+    opik = pytest.importorskip('opik')
+    import opik_logger
+
+    submitted = []
+    monkeypatch.setattr(opik_logger, 'TRACE_BUFFERED', True)
+    monkeypatch.setattr(opik_logger, '_submit_trace', submitted.append)
+
+    @opik_logger._traced('failing_log')
+    def failing_log(user_id, task):
+        raise ValueError(f'no task {task} for {user_id}')
+
+    with pytest.raises(ValueError):
+        failing_log('u1', task='t9')
+
+    [trace] = submitted
+    assert trace['input'] == {'user_id': 'u1', 'task': 't9'}
+    assert 'output' not in trace
+    assert trace['error_info']['exception_type'] == 'ValueError'
+    assert trace['error_info']['message'] == 'no task t9 for u1'
+    assert 'raise ValueError' in trace['error_info']['traceback']
+
+    # The error reaches Opik with the trace.
+    port = _free_port()
+    client = opik.Opik(
+        host=f'http://127.0.0.1:{port}/api', project_name='Tenax', workspace='Tenax', api_key='test'
+    )
+    monkeypatch.setattr(opik_logger, '_get_client', lambda: client)
+    _TraceStore.received = []
+    server = http.server.HTTPServer(('127.0.0.1', port), _TraceStore)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        opik_logger._ship_traces(submitted)
+    finally:
+        server.shutdown()
+        server.server_close()
+    [(_path, body)] = _TraceStore.received
+    assert body['traces'][0]['error_info']['exception_type'] == 'ValueError'
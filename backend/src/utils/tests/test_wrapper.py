@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+opik_wrapper = pytest.importorskip('opik_wrapper')
+
+
+class _Sink:
+    def __init__(self):
+        self.traces = []
+
+    def submit(self, trace):
+        self.traces.append(trace)
+
+
+def test_openai_tracking_starts_on_the_first_action(monkeypatch):
+    calls = []
+    sink = _Sink()
+    monkeypatch.setattr(opik_wrapper, '_openai_tracked', False)
+    monkeypatch.setattr(opik_wrapper, 'track_openai', lambda: calls.append(threading.get_ident()))
+    monkeypatch.setattr(opik_wrapper, '_get_trace_sink', lambda: sink)
+    log_action = getattr(opik_wrapper.log_agent_action, '__wrapped__', opik_wrapper.log_agent_action)
+
+    log_action('morning_summary', {}, {}, {})
+    log_action('morning_summary', {}, {}, {})
+
+    # Tracking is on before the sink ships anything, on the caller's thread, once.
+    assert calls == [threading.get_ident()]
+    assert len(sink.traces) == 2
+
+
+def test_tracking_failure_does_not_break_logging(monkeypatch):
+    def _fail():
+        raise TypeError('track_openai() missing openai_client')
+
+    sink = _Sink()
+    monkeypatch.setattr(opik_wrapper, '_openai_tracked', False)
+    monkeypatch.setattr(opik_wrapper, 'track_openai', _fail)
+    monkeypatch.setattr(opik_wrapper, '_get_trace_sink', lambda: sink)
+    log_action = getattr(opik_wrapper.log_agent_action, '__wrapped__', opik_wrapper.log_agent_action)
+
+    assert log_action('morning_summary', {}, {}, {})['status'] == 'success'
+    assert sink.traces
+
+
+def test_actions_ship_through_the_opik_client_api(monkeypatch):
+    opik = pytest.importorskip('opik')
+    from unittest import mock
+
+    # An autospec client rejects anything the real Opik class does not offer.
+    client = mock.create_autospec(opik.Opik, instance=True)
+    client.flush.return_value = True
+    monkeypatch.setattr(opik_wrapper, '_get_client', lambda: client)
+    action = {
+        'action': 'send_reminder', 'timestamp': '2026-01-01T10:00:00', 'metadata': {'user_id': 7},
+        'input': {'task': 'call mom'}, 'output': {'sent': False}, 'status': 'error', 'error': 'twilio down'
+    }
+
+    opik_wrapper._ship_actions([action])
+
+    [call] = client.trace.call_args_list
+    assert call.kwargs['name'] == 'send_reminder'
+    assert call.kwargs['metadata'] == {'user_id': 7, 'status': 'error', 'timestamp': '2026-01-01T10:00:00'}
+    assert call.kwargs['error_info']['message'] == 'twilio down'
+    client.flush.assert_called_once_with()
+
+    client.flush.return_value = False
+    with pytest.raises(RuntimeError):
+        opik_wrapper._ship_actions([action])